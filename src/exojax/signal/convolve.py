@@ -17,8 +17,35 @@ def convolve_same(input_signal, kernel):
     filter_length = len(kernel)
     fft_length = input_length + filter_length - 1
     convolved_signal = jnp.fft.irfft(
-        jnp.fft.rfft(input_signal, n=fft_length) * jnp.fft.rfft(kernel, n=fft_length))
+        jnp.fft.rfft(input_signal, n=fft_length) * jnp.fft.rfft(kernel, n=fft_length),
+        n=fft_length)
     n = int((filter_length - 1) / 2) 
-    convolved_signal = convolved_signal[n:-n]
+    convolved_signal = convolved_signal[n:n + input_length]
     return convolved_signal
 
+
+
+def convolve_same_batch(input_signals, kernels):
+    """convolve same for multiple signals at once (batched rfft)
+
+    Args:
+        input_signals (2D array): original input signals (Nsignal, input_length)
+        kernels (1D or 2D array): convolution kernel shared by the signals (filter_length) or kernels for each signal (Nsignal, filter_length)
+
+    Returns:
+        2D array: convolved signals (Nsignal, input_length)
+
+    Note:
+        The FFT of a shared kernel is computed only once.
+    """
+    input_length = jnp.shape(input_signals)[-1]
+    filter_length = jnp.shape(kernels)[-1]
+    fft_length = input_length + filter_length - 1
+    convolved_signals = jnp.fft.irfft(
+        jnp.fft.rfft(input_signals, n=fft_length, axis=-1)
+        * jnp.fft.rfft(kernels, n=fft_length, axis=-1),
+        n=fft_length,
+        axis=-1,
+    )
+    n = int((filter_length - 1) / 2)
+    return convolved_signals[..., n : n + input_length]
@@ -1,9 +1,8 @@
 import numpy as np
 import jax.numpy as jnp
-from jax.lax import scan
 from jax.numpy import index_exp
-from jax.lax import dynamic_update_slice
 from jax import jit
+from jax import vmap
 from functools import partial
 from scipy.fft import next_fast_len
 from scipy.special import lambertw
@@ -148,7 +147,8 @@ def olaconv(input_matrix_zeropad, fir_filter_zeropad, ndiv, div_length,
     ftilde = jnp.fft.rfft(fir_filter_zeropad)
     xtilde = jnp.fft.rfft(input_matrix_zeropad, axis=1)
     ytilde = xtilde * ftilde[jnp.newaxis, :]
-    ftarr = jnp.fft.irfft(ytilde, axis=1)
+    fft_length = _fft_length(div_length, filter_length)
+    ftarr = jnp.fft.irfft(ytilde, n=fft_length, axis=1)
     output_length = _output_length(ndiv, div_length, filter_length)
     fftval = overlap_and_add(ftarr, output_length, div_length)
     return fftval
@@ -164,18 +164,19 @@ def overlap_and_add(ftarr, output_length, div_length):
         
     Returns:
         overlapped and added vector
+
+    Notes:
+        Each filtered block (fft_length) is split into nshift = ceil(fft_length/div_length) pieces of div_length (usually head and tail, nshift=2).
+        The k-th pieces of all the blocks are shifted by k blocks and added, which is O(nshift x output_length) and fully vectorized.
     """
-    def fir_filter(y_and_idiv, ft):
-        y, idiv = y_and_idiv
-        yzero = jnp.zeros(output_length)
-        y = y + dynamic_update_slice(yzero, ft, (idiv * div_length, ))
-        idiv += 1
-        return (y, idiv), None
-
-    y = jnp.zeros(output_length)
-    fftval_and_nscan, _ = scan(fir_filter, (y, 0), ftarr)
-    fftval, nscan = fftval_and_nscan
-    return fftval
+    ndiv, fft_length = jnp.shape(ftarr)
+    nshift = -(-fft_length // div_length)
+    pieces = jnp.pad(ftarr, ((0, 0), (0, nshift * div_length - fft_length)))
+    pieces = pieces.reshape((ndiv, nshift, div_length))
+    y = jnp.zeros((ndiv + nshift - 1, div_length))
+    for k in range(nshift):
+        y = y.at[k : k + ndiv].add(pieces[:, k, :])
+    return y.reshape(-1)[:output_length]
 
 
 def np_olaconv(input_matrix, fir_filter):
@@ -205,3 +206,29 @@ def np_olaconv(input_matrix, fir_filter):
         y[int(idiv * div_length):int(idiv * div_length +
                                      fft_length)] += ftarr[idiv, :]
     return y
+
+
+def olaconv_same_batch(folded_inputs, fir_filters):
+    """Overlap and Add convolve with the same-length output for multiple inputs at once
+
+    Args:
+        folded_inputs (3D array): inputs folded to (Nsignal, ndiv, div_length) form
+        fir_filters (1D or 2D array): real FIR filter shared by the inputs (filter_length) or filters for each input (Nsignal, filter_length). The length should be odd.
+
+    Returns:
+        2D array: convolved signals (Nsignal, ndiv*div_length)
+
+    Note:
+        The FFT of a shared filter is computed only once.
+    """
+    filter_length = jnp.shape(fir_filters)[-1]
+    edge = int((filter_length - 1) / 2)
+
+    def olaconv_same(folded_input, fir_filter):
+        ndiv, div_length, filter_length = ola_lengths(folded_input, fir_filter)
+        input_zeropad, fir_filter_zeropad = generate_zeropad(folded_input, fir_filter)
+        ola = olaconv(input_zeropad, fir_filter_zeropad, ndiv, div_length, filter_length)
+        return ola[edge:-edge]
+
+    filter_axis = 0 if jnp.ndim(fir_filters) == 2 else None
+    return vmap(olaconv_same, (0, filter_axis))(folded_inputs, fir_filters)
@@ -4,7 +4,9 @@
 * MdbHit is the MDB for HITRAN or HITEMP
 """
 from os.path import exists
+import json
 import numpy as np
+import jax
 import jax.numpy as jnp
 import pathlib
 import vaex
@@ -13,6 +15,8 @@ from exojax.spec.hitran import line_strength_numpy
 from exojax.spec.hitran import gamma_natural as gn
 from exojax.utils.constants import Tref_original
 from exojax.utils.molname import e2s
+from exojax.utils.interp import cubic_loglog_uniform_table
+from exojax.utils.interp import interp_uniform
 from exojax.spec import hitranapi
 from exojax.spec.hitranapi import molecid_hitran
 from exojax.spec.molinfo import isotope_molmass
@@ -28,10 +32,336 @@ from radis.db.classes import get_molecule
 from radis.levels.partfunc import PartFuncTIPS
 import warnings
 
-__all__ = ["MdbExomol", "MdbHitemp", "MdbHitran"]
+__all__ = ["MdbExomol", "MdbHitemp", "MdbHitran", "MdbSnapshot"]
 
 
-class MdbExomol(CapiMdbExomol):
+class MdbLineArrays:
+    """common interface of the activated line arrays of mdb (MdbExomol, MdbHitemp, MdbHitran)
+
+    Notes:
+        When gpu_transfer="lazy", the line arrays are kept in the host memory (ndarray) after the activation.
+        They are transfered to the device when an opa that consumes them in JAX (OpaDirect, OpaModit) is initialized,
+        through require_device(), or when to_device() is called explicitly. OpaPremodit uses the host arrays only.
+        release_host() removes the host copies that have an identical device copy, and resident_bytes() reports the memory use of each field.
+        After the release, use the device copies dev_nu_lines and logsij0 instead of nu_lines and line_strength_ref.
+        Opa that needs the host arrays in the initialization (e.g. OpaPremodit) should be initialized before the release.
+
+    Examples:
+
+        >>> mdb = api.MdbExomol(emf, nus, gpu_transfer="lazy")
+        >>> opa = OpaModit(mdb, nus) # transfers the fields used by MODIT
+        >>> mdb.release_host() # releases the DataFrame and the host duplicates of the device arrays
+        >>> mdb.resident_bytes()
+
+    Notes:
+        save_snapshot() stores the activated arrays as .npy files, which can be memory-mapped by MdbSnapshot.load().
+        The partition function grid (T_gQT, gQT) is resampled to a uniform temperature grid (spacing QT_table_dT)
+        by partition_function_table(), so that QT_interp and qr_interp use index+lerp instead of a search.
+    """
+
+    _device_fields = []  # default of device_fields()
+    snapshot_extra_fields = []  # arrays saved in snapshot other than device_fields
+    snapshot_meta_keys = []  # scalar attributes saved in snapshot
+    QT_table_dT = 1.0  # temperature spacing (K) of the partition function table
+
+    def partition_function_table(self):
+        """partition function table on the uniform temperature grid
+
+        Notes:
+            The table is computed from (T_gQT, gQT) by a cubic spline in log Q vs log T, and is cached until gQT is replaced.
+            The tabulated values are kept exactly at the original temperature nodes on the uniform grid.
+            The cache holds the ndarray and is converted to jnp.array at each call, so that the first call within jit does not leave a tracer in the cache.
+
+        Returns:
+            float, float, nd array: T0 (K), dT (K), Q table [Nt] (ExoMol) or [Nisotope, Nt] (HITRAN/HITEMP)
+        """
+        cache = getattr(self, "_QT_table_cache", None)
+        if cache is None or cache[0] is not self.gQT:
+            T0, dT, table = cubic_loglog_uniform_table(
+                self.T_gQT, self.gQT, dx=self.QT_table_dT
+            )
+            self._QT_table_cache = (self.gQT, (T0, dT, table))
+        T0, dT, table = self._QT_table_cache[1]
+        return T0, dT, jnp.asarray(table)
+
+    def device_fields(self):
+        """names of the line arrays that can be transfered to the device
+
+        Notes:
+            The default is self._device_fields. MdbExomol and MdbHitemp/MdbHitran override this method.
+
+        Returns:
+            list: field names
+        """
+        return list(self._device_fields)
+
+    def to_device(self, fields=None):
+        """transfers the line arrays to the device (jnp.array)
+
+        Notes:
+            "nu_lines" is kept in the host memory and its device copy is stored in dev_nu_lines.
+            The other fields are replaced by jnp.array.
+
+        Args:
+            fields (list, optional): field names to be transfered. Defaults to None (all of self.device_fields()).
+
+        Raises:
+            ValueError: unknown field name
+        """
+        if fields is None:
+            fields = self.device_fields()
+        for field in fields:
+            if field not in self.device_fields():
+                raise ValueError("Unknown device field: " + str(field))
+            if field == "nu_lines":
+                self.dev_nu_lines = jnp.array(self.nu_lines)
+            elif field in ["jlower", "jupper"]:
+                setattr(self, field, jnp.array(getattr(self, field), dtype=int))
+            else:
+                setattr(self, field, jnp.array(getattr(self, field)))
+
+    def on_device(self, fields):
+        """checks if the fields have been transfered to the device
+
+        Args:
+            fields (list): field names. "nu_lines" is regarded as transfered when dev_nu_lines is a device array.
+
+        Returns:
+            bool: True if all of the fields are device arrays
+        """
+        for field in fields:
+            if field == "nu_lines":
+                field = "dev_nu_lines"
+            if not _is_device_array(self.__dict__.get(field)):
+                return False
+        return True
+
+    def require_device(self, fields):
+        """transfers the fields still in the host memory to the device when gpu_transfer="lazy"
+
+        Notes:
+            This is called by opa that consumes the line arrays in JAX. Nothing is done unless gpu_transfer="lazy".
+
+        Args:
+            fields (list): field names used by the consumer
+        """
+        if self.gpu_transfer != "lazy":
+            return
+        fields = [field for field in fields if not self.on_device([field])]
+        if len(fields) > 0:
+            self.to_device(fields)
+
+    def __getattr__(self, name):
+        """raises AttributeError with the device field to be used, for the host fields released by release_host()
+
+        Notes:
+            This is called only when name is not found in the instance.
+
+        Args:
+            name: attribute name
+
+        Raises:
+            AttributeError: name is not available
+        """
+        device_copy = {"nu_lines": "dev_nu_lines", "line_strength_ref": "logsij0"}
+        if name in device_copy and device_copy[name] in self.__dict__:
+            msg = (
+                name
+                + " was released by release_host(). Use "
+                + device_copy[name]
+                + " (device array) instead."
+            )
+            raise AttributeError(msg)
+        raise AttributeError(
+            type(self).__name__ + " object has no attribute " + repr(name)
+        )
+
+    def _host_duplicates(self):
+        """host fields that have an identical copy in the device
+
+        Returns:
+            list: field names
+        """
+        duplicates = []
+        pairs = [("nu_lines", "dev_nu_lines"), ("line_strength_ref", "logsij0")]
+        for host_field, device_field in pairs:
+            host = self.__dict__.get(host_field)
+            device = self.__dict__.get(device_field)
+            if (
+                host is not None
+                and not _is_device_array(host)
+                and _is_device_array(device)
+                and device.dtype == np.asarray(host).dtype
+            ):
+                duplicates.append(host_field)
+        return duplicates
+
+    def release_host(self, fields=None):
+        """releases the host (ndarray) copies of the fields
+
+        Notes:
+            If fields is None, the inherited DataFrame (self.df) and the host copies that have an identical device copy are released,
+            i.e. nu_lines when dev_nu_lines exists and line_strength_ref when logsij0 is a device array, both in the same dtype.
+            After the release, nu_lines and line_strength_ref raise AttributeError, so use dev_nu_lines and logsij0 instead.
+            OpaModit and OpaDirect use the device copies, but the initialization of opa needs the host arrays, i.e. initialize opa before the release.
+            The host copies are not released when the device copies are in a lower precision (e.g. float32 without jax_enable_x64).
+            Other line arrays can be released explicitly by fields when mdb is not used by opa anymore, e.g. after the initialization of OpaPremodit.
+
+        Args:
+            fields (list, optional): field names to be released. Defaults to None (["df"] and the host duplicates).
+        """
+        if fields is None:
+            fields = ["df"] + self._host_duplicates()
+        for field in fields:
+            if hasattr(self, field) and not _is_device_array(getattr(self, field)):
+                delattr(self, field)
+
+    def resident_bytes(self, print_summary=False):
+        """resident bytes of the line arrays in the host and device memory
+
+        Args:
+            print_summary (bool, optional): if True, prints the table. Defaults to False.
+
+        Returns:
+            dict: {field: {"host": bytes, "device": bytes}}
+        """
+        fields = self.device_fields() + ["dev_nu_lines", "line_strength_ref"]
+        resident = {}
+        for field in dict.fromkeys(fields):
+            if field not in self.__dict__:
+                continue
+            arr = self.__dict__[field]
+            nbytes = int(getattr(arr, "nbytes", 0))
+            if _is_device_array(arr):
+                resident[field] = {"host": 0, "device": nbytes}
+            else:
+                resident[field] = {"host": nbytes, "device": 0}
+        if print_summary:
+            for field, val in resident.items():
+                print(field, ": host", val["host"], "B, device", val["device"], "B")
+        return resident
+
+    def save_snapshot(self, path):
+        """saves the activated arrays as a lightweight snapshot
+
+        Notes:
+            The snapshot is a directory of .npy files and meta.json. It does not include radis manager states nor DataFrame.
+            Use MdbSnapshot.load(path) to load it, for instance, in worker processes.
+            The .npy files are memory-mapped, so that workers share one on-disk copy through the page cache.
+
+        Args:
+            path: directory of the snapshot
+
+        Raises:
+            ValueError: when a field has been already released by release_host()
+        """
+        path = pathlib.Path(path).expanduser()
+        path.mkdir(parents=True, exist_ok=True)
+        device_fields = self.device_fields()
+        fields = list(dict.fromkeys(device_fields + self.snapshot_extra_fields))
+        for field in fields:
+            if not hasattr(self, field):
+                raise ValueError(field + " is not available (released?).")
+            np.save(path / (field + ".npy"), np.asarray(getattr(self, field)))
+
+        meta = {key: _jsonable(getattr(self, key)) for key in self.snapshot_meta_keys}
+        meta["fields"] = fields
+        meta["device_fields"] = device_fields
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+
+class MdbSnapshot(MdbLineArrays):
+    """lightweight snapshot of mdb, made by mdb.save_snapshot(path)
+
+    Notes:
+        MdbSnapshot has the activated arrays and the partition function grids only, and can be used instead of mdb in opa.
+        Use MdbSnapshot.load(path) to make an instance.
+
+    Examples:
+
+        >>> mdb = api.MdbExomol(emf, nus)
+        >>> mdb.save_snapshot("snapshot_CO")
+        >>> # in a worker process
+        >>> mdb = api.MdbSnapshot.load("snapshot_CO")
+        >>> opa = OpaPremodit(mdb, nus, auto_trange=[500.0, 1500.0])
+    """
+
+    def __init__(self, arrays, meta):
+        """initialization from arrays and meta data
+
+        Args:
+            arrays (dict): arrays {field: ndarray}
+            meta (dict): meta data
+        """
+        for key, val in meta.items():
+            if key not in ["fields", "device_fields"]:
+                setattr(self, key, val)
+        for key, val in arrays.items():
+            setattr(self, key, val)
+        self._device_fields = meta["device_fields"]
+        self.gpu_transfer = False
+
+    @staticmethod
+    def load(path, mmap_mode="r", gpu_transfer=False):
+        """loads the snapshot saved by mdb.save_snapshot(path)
+
+        Args:
+            path: directory of the snapshot
+            mmap_mode (str, optional): mmap_mode of np.load. Defaults to "r". If None, arrays are read into memory.
+            gpu_transfer (bool, optional): if True, the arrays are transfered to the device. Defaults to False.
+
+        Returns:
+            MdbSnapshotExomol or MdbSnapshotHitran: snapshot instance
+        """
+        path = pathlib.Path(path).expanduser()
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        arrays = {
+            field: np.load(path / (field + ".npy"), mmap_mode=mmap_mode)
+            for field in meta["fields"]
+        }
+        if meta["dbtype"] == "exomol":
+            snapshot = MdbSnapshotExomol(arrays, meta)
+        elif meta["dbtype"] == "hitran":
+            snapshot = MdbSnapshotHitran(arrays, meta)
+        else:
+            raise ValueError("Unknown dbtype in the snapshot.")
+        if gpu_transfer:
+            snapshot.gpu_transfer = True
+            snapshot.to_device()
+        return snapshot
+
+
+def _jsonable(val):
+    """converts numpy scalar/array to json-serializable values
+
+    Args:
+        val: value
+
+    Returns:
+        json-serializable value
+    """
+    if isinstance(val, (np.ndarray, list, tuple)):
+        return [_jsonable(v) for v in val]
+    elif isinstance(val, np.generic):
+        return val.item()
+    return val
+
+
+def _is_device_array(arr):
+    """checks if arr is a jax array
+
+    Args:
+        arr: array
+
+    Returns:
+        bool: True if arr is a jax array
+    """
+    return isinstance(arr, jax.Array)
+
+
+class MdbExomol(MdbLineArrays, CapiMdbExomol):
     """molecular database of ExoMol.
 
     MdbExomol is a class for ExoMol.
@@ -56,6 +386,9 @@ class MdbExomol(CapiMdbExomol):
         alpha_ref_def: default alpha_ref (gamma0) in .def file, used for jlower not given in .broad
     """
 
+    snapshot_extra_fields = ["line_strength_ref", "T_gQT", "gQT"]
+    snapshot_meta_keys = ["dbtype", "simple_molecule_name", "molmass", "Tref", "nurange"]
+
     def __init__(
         self,
         path,
@@ -80,7 +413,7 @@ class MdbExomol(CapiMdbExomol):
             Ttyp: typical temperature to calculate Sij(T) used in crit
             bkgdatm: background atmosphere for broadening. e.g. H2, He,
             broadf: if False, the default broadening parameters in .def file is used
-            gpu_transfer: if True, some instances will be transfered to jnp.array. False is recommended for PreMODIT.
+            gpu_transfer: if True, some instances will be transfered to jnp.array. False is recommended for PreMODIT. If "lazy", instances are kept in ndarray until they are required by opa or self.to_device() is called.
             inherit_dataframe: if True, it makes self.df instance available, which needs more DRAM when pickling.
             optional_quantum_states: if True, all of the fields available in self.df will be loaded. if False, the mandatory fields (i,E,g,J) will be loaded.
             activation: if True, the activation of mdb will be done when initialization, if False, the activation won't be done and it makes self.df instance available.
@@ -192,7 +525,7 @@ class MdbExomol(CapiMdbExomol):
             self.set_broadening_coef(df[mask], add_columns=False)
 
         self.gamma_natural = gn(self.A)
-        if self.gpu_transfer:
+        if self.gpu_transfer and self.gpu_transfer != "lazy":
             self.generate_jnp_arrays()
 
     def compute_load_mask(self, df):
@@ -251,7 +584,8 @@ class MdbExomol(CapiMdbExomol):
         self.A = self.A[mask]
         self.logsij0 = self.logsij0[mask]
         self.nu_lines = self.nu_lines[mask]
-        self.dev_nu_lines = self.dev_nu_lines[mask]
+        if hasattr(self, "dev_nu_lines"):
+            self.dev_nu_lines = self.dev_nu_lines[mask]
         self.gamma_natural = self.gamma_natural[mask]
         self.alpha_ref = self.alpha_ref[mask]
         self.n_Texp = self.n_Texp[mask]
@@ -279,16 +613,27 @@ class MdbExomol(CapiMdbExomol):
 
         """
         # jnp arrays
-        self.dev_nu_lines = jnp.array(self.nu_lines)
-        self.logsij0 = jnp.array(np.log(self.line_strength_ref))
-        self.gamma_natural = jnp.array(self.gamma_natural)
-        self.A = jnp.array(self.A)
-        self.elower = jnp.array(self.elower)
-        self.gpp = jnp.array(self.gpp)
-        self.jlower = jnp.array(self.jlower, dtype=int)
-        self.jupper = jnp.array(self.jupper, dtype=int)
-        self.alpha_ref = jnp.array(self.alpha_ref)
-        self.n_Texp = jnp.array(self.n_Texp)
+        self.logsij0 = np.log(self.line_strength_ref)
+        self.to_device()
+
+    def device_fields(self):
+        """names of the line arrays that can be transfered to the device
+
+        Returns:
+            list: field names
+        """
+        return [
+            "nu_lines",
+            "logsij0",
+            "gamma_natural",
+            "A",
+            "elower",
+            "gpp",
+            "jlower",
+            "jupper",
+            "alpha_ref",
+            "n_Texp",
+        ]
 
     def QT_interp(self, T):
         """interpolated partition function.
@@ -299,7 +644,7 @@ class MdbExomol(CapiMdbExomol):
         Returns:
             Q(T) interpolated in jnp.array
         """
-        return jnp.interp(T, self.T_gQT, self.gQT)
+        return interp_uniform(T, *self.partition_function_table())
 
     def qr_interp(self, T):
         """interpolated partition function ratio.
@@ -327,7 +672,18 @@ class MdbExomol(CapiMdbExomol):
         self.Tref = Tref_new
 
 
-class MdbCommonHitempHitran:
+class MdbCommonHitempHitran(MdbLineArrays):
+    snapshot_extra_fields = ["line_strength_ref", "isoid", "uniqiso", "T_gQT", "gQT"]
+    snapshot_meta_keys = [
+        "dbtype",
+        "simple_molecule_name",
+        "molecid",
+        "molmass",
+        "Tref",
+        "nurange",
+        "isotope",
+    ]
+
     def __init__(
         self,
         path="CO",
@@ -351,7 +707,7 @@ class MdbCommonHitempHitran:
             elower_max: maximum lower state energy, Elower (cm-1)
             Ttyp: typical temperature to calculate Sij(T) used in crit
             isotope: isotope number, 0 or None = use all isotopes.
-            gpu_transfer: tranfer data to jnp.array?
+            gpu_transfer: tranfer data to jnp.array? If "lazy", instances are kept in ndarray until they are required by opa or self.to_device() is called.
             inherit_dataframe: if True, it makes self.df instance available, which needs more DRAM when pickling.
             activation: if True, the activation of mdb will be done when initialization, if False, the activation won't be done and it makes self.df instance available.
             parfile: if not none, provide path, then directly load parfile
@@ -431,7 +787,7 @@ class MdbCommonHitempHitran:
             self.molecid, self.uniqiso
         )
 
-        if self.gpu_transfer:
+        if self.gpu_transfer and self.gpu_transfer != "lazy":
             self.generate_jnp_arrays()
 
     def set_molmass(self):
@@ -477,6 +833,28 @@ class MdbCommonHitempHitran:
             # uncertainties
             self.ierr = self.ierr[mask]
 
+    def device_fields(self):
+        """names of the line arrays that can be transfered to the device
+
+        Returns:
+            list: field names
+        """
+        fields = [
+            "nu_lines",
+            "logsij0",
+            "line_strength_ref",
+            "delta_air",
+            "A",
+            "n_air",
+            "gamma_air",
+            "gamma_self",
+            "elower",
+            "gpp",
+        ]
+        if self.with_error:
+            fields.append("ierr")
+        return fields
+
     def Sij0(self):
         """old line strength definition"""
         msg = "Sij0 instance was replaced to line_strength_ref."
@@ -493,7 +871,8 @@ class MdbCommonHitempHitran:
            Q(idx, T) interpolated in jnp.array
         """
         isotope_index = _isotope_index_from_isotope_number(isotope, self.uniqiso)
-        return _QT_interp(isotope_index, T, self.T_gQT, self.gQT)
+        T0, dT, QT_table = self.partition_function_table()
+        return interp_uniform(T, T0, dT, QT_table[isotope_index])
 
     def qr_interp(self, isotope, T):
         """interpolated partition function ratio.
@@ -505,8 +884,18 @@ class MdbCommonHitempHitran:
         Returns:
             qr(T)=Q(T)/Q(Tref) interpolated in jnp.array
         """
-        isotope_index = _isotope_index_from_isotope_number(isotope, self.uniqiso)
-        return _qr_interp(isotope_index, T, self.T_gQT, self.gQT, self.Tref)
+        return self.QT_interp(isotope, T) / self.QT_interp(isotope, self.Tref)
+
+    def qr_interp_isotopes(self, T):
+        """interpolated partition function ratio for all of the isotopes in mdb.
+
+        Args:
+            T: temperature, scalar or [Nlayer]
+
+        Returns:
+            qr(T)=Q(T)/Q(Tref) [Nisotope] or [Nlayer, Nisotope], the order is the same as self.uniqiso
+        """
+        return _qr_table_isotopes(T, self.Tref, *self.partition_function_table())
 
     def qr_interp_lines(self, T):
         """Partition Function ratio using HAPI partition data.
@@ -521,9 +910,8 @@ class MdbCommonHitempHitran:
         Note:
             Nlines=len(self.nu_lines)
         """
-        return _qr_interp_lines(
-            T, self.isoid, self.uniqiso, self.T_gQT, self.gQT, self.Tref
-        )
+        qr_isotopes = self.qr_interp_isotopes(T)
+        return qr_isotopes[..., _isotope_index_lines(self.isoid, self.uniqiso)]
 
     def exact_isotope_name(self, isotope):
         """exact isotope name
@@ -552,12 +940,7 @@ class MdbCommonHitempHitran:
             + " K."
         )
         if self.isotope is None or self.isotope == 0:
-            msg1 = "Currently all isotope mode is not fully compatible to change_reference_temperature."
-            msg2 = (
-                "QT used in change_reference_temperature is assumed isotope=1 instead."
-            )
-            warnings.warn(msg1 + msg2, UserWarning)
-            qr = self.qr_interp(1, Tref_new)
+            qr = np.asarray(self.qr_interp_lines(Tref_new))
         else:
             qr = self.qr_interp(self.isotope, Tref_new)
 
@@ -631,7 +1014,7 @@ class MdbHitemp(MdbCommonHitempHitran, HITEMPDatabaseManager):
             elower_max: maximum lower state energy, Elower (cm-1)
             Ttyp: typical temperature to calculate Sij(T) used in crit
             isotope: isotope number, 0 or None = use all isotopes.
-            gpu_transfer: tranfer data to jnp.array?
+            gpu_transfer: tranfer data to jnp.array? If "lazy", instances are kept in ndarray until they are required by opa or self.to_device() is called.
             inherit_dataframe: if True, it makes self.df instance available, which needs more DRAM when pickling.
             activation: if True, the activation of mdb will be done when initialization, if False, the activation won't be done and it makes self.df instance available.
             parfile: if not none, provide path, then directly load parfile
@@ -770,18 +1153,8 @@ class MdbHitemp(MdbCommonHitempHitran, HITEMPDatabaseManager):
 
         """
         # jnp.array copy from the copy sources
-        self.dev_nu_lines = jnp.array(self.nu_lines)
-        self.logsij0 = jnp.array(np.log(self.line_strength_ref))
-        self.line_strength_ref = jnp.array(self.line_strength_ref)
-        self.delta_air = jnp.array(self.delta_air)
-        self.A = jnp.array(self.A)
-        self.n_air = jnp.array(self.n_air)
-        self.gamma_air = jnp.array(self.gamma_air)
-        self.gamma_self = jnp.array(self.gamma_self)
-        self.elower = jnp.array(self.elower)
-        self.gpp = jnp.array(self.gpp)
-        if self.with_error:
-            self.ierr = jnp.array(self.ierr)
+        self.logsij0 = np.log(self.line_strength_ref)
+        self.to_device()
 
 
 class MdbHitran(MdbCommonHitempHitran, HITRANDatabaseManager):
@@ -827,7 +1200,7 @@ class MdbHitran(MdbCommonHitempHitran, HITRANDatabaseManager):
             elower_max: maximum lower state energy, Elower (cm-1)
             Ttyp: typical temperature to calculate Sij(T) used in crit
             isotope: isotope number. 0 or None= use all isotopes.
-            gpu_transfer: tranfer data to jnp.array?
+            gpu_transfer: tranfer data to jnp.array? If "lazy", instances are kept in ndarray until they are required by opa or self.to_device() is called.
             inherit_dataframe: if True, it makes self.df instance available, which needs more DRAM when pickling.
             activation: if True, the activation of mdb will be done when initialization, if False, the activation won't be done and it makes self.df instance available.
             nonair_broadening: If True, background atmospheric broadening parameters(n and gamma) other than air will also be downloaded (e.g. h2, he...)
@@ -966,18 +1339,8 @@ class MdbHitran(MdbCommonHitempHitran, HITRANDatabaseManager):
 
         """
         # jnp.array copy from the copy sources
-        self.dev_nu_lines = jnp.array(self.nu_lines)
-        self.logsij0 = jnp.array(np.log(self.line_strength_ref))
-        self.line_strength_ref = jnp.array(self.line_strength_ref)
-        self.delta_air = jnp.array(self.delta_air)
-        self.A = jnp.array(self.A)
-        self.n_air = jnp.array(self.n_air)
-        self.gamma_air = jnp.array(self.gamma_air)
-        self.gamma_self = jnp.array(self.gamma_self)
-        self.elower = jnp.array(self.elower)
-        self.gpp = jnp.array(self.gpp)
-        if self.with_error:
-            self.ierr = jnp.array(self.ierr)
+        self.logsij0 = np.log(self.line_strength_ref)
+        self.to_device()
 
         if hasattr(self.df_load_mask, "n_h2") and self.nonair_broadening:
             self.n_h2 = jnp.array(self.n_h2)
@@ -996,6 +1359,25 @@ class MdbHitran(MdbCommonHitempHitran, HITRANDatabaseManager):
             self.gamma_h2o = jnp.array(self.gamma_h2o)
 
 
+class MdbSnapshotExomol(MdbSnapshot):
+    """snapshot of MdbExomol"""
+
+    QT_interp = MdbExomol.QT_interp
+    qr_interp = MdbExomol.qr_interp
+    change_reference_temperature = MdbExomol.change_reference_temperature
+
+
+class MdbSnapshotHitran(MdbSnapshot):
+    """snapshot of MdbHitemp and MdbHitran"""
+
+    QT_interp = MdbCommonHitempHitran.QT_interp
+    qr_interp = MdbCommonHitempHitran.qr_interp
+    qr_interp_lines = MdbCommonHitempHitran.qr_interp_lines
+    qr_interp_isotopes = MdbCommonHitempHitran.qr_interp_isotopes
+    exact_isotope_name = MdbCommonHitempHitran.exact_isotope_name
+    change_reference_temperature = MdbCommonHitempHitran.change_reference_temperature
+
+
 def _convert_proper_isotope(isotope):
     """covert isotope (int) to proper type for df
 
@@ -1029,74 +1411,31 @@ def _isotope_index_from_isotope_number(isotope, uniqiso):
     return isotope_index
 
 
-def _QT_interp(isotope_index, T, T_gQT, gQT):
-    """interpolated partition function.
-
-    Note:
-        isotope_index is NOT isotope (number for HITRAN).
-        isotope_index is index for gQT and T_gQT.
-        _isotope_index_from_isotope_number can be used
-        to get isotope index from isotope.
+def _qr_table_isotopes(T, Tref, T0, dT, QT_table):
+    """partition function ratio for all of the isotopes from the uniform partition function table
 
     Args:
-        isotope index: isotope index, index from 0 to len(uniqiso) - 1
-        T: temperature
-        gQT: jnp array of partition function grid
-        T_gQT: jnp array of temperature grid for gQT
-
-    Returns:
-        Q(idx, T) interpolated in jnp.array
-    """
-
-    return jnp.interp(T, T_gQT[isotope_index], gQT[isotope_index])
-
-
-def _qr_interp(isotope_index, T, T_gQT, gQT, Tref):
-    """interpolated partition function ratio.
-
-    Note:
-        isotope_index is NOT isotope (number for HITRAN).
-        isotope_index is index for gQT and T_gQT.
-        _isotope_index_from_isotope_number can be used
-        to get isotope index from isotope.
-
-    Args:
-        isotope index: isotope index, index from 0 to len(uniqiso) - 1
-        T: temperature
-        gQT: jnp array of partition function grid
-        T_gQT: jnp array of temperature grid for gQT
+        T: temperature, scalar or [Nlayer]
         Tref: reference temperature in K
+        T0: start temperature of the table (K)
+        dT: temperature spacing of the table (K)
+        QT_table: partition function table [Nisotope, Nt]
 
     Returns:
-        qr(T)=Q(T)/Q(Tref) interpolated in jnp.array
+        qr(T)=Q(T)/Q(Tref) for isotopes [Nisotope] or [Nlayer, Nisotope], the order is the same as uniqiso
     """
-    return _QT_interp(isotope_index, T, T_gQT, gQT) / _QT_interp(
-        isotope_index, Tref, T_gQT, gQT
-    )
+    QT = jnp.moveaxis(interp_uniform(T, T0, dT, QT_table), 0, -1)
+    return QT / interp_uniform(Tref, T0, dT, QT_table)
 
 
-def _qr_interp_lines(T, isoid, uniqiso, T_gQT, gQT, Tref):
-    """Partition Function ratio using HAPI partition data.
-    (This function works for JAX environment.)
+def _isotope_index_lines(isoid, uniqiso):
+    """isotope index for each line
 
     Args:
-        T: temperature (K)
-        isoid:
-        uniqiso:
-        gQT: jnp array of partition function grid
-        T_gQT: jnp array of temperature grid for gQT
-        Tref: reference temperature in K
+        isoid (nd int array): isotope number of lines
+        uniqiso (nd int array): unique isotope array
 
     Returns:
-        Qr_line, partition function ratio array for lines [Nlines]
-
-    Note:
-        Nlines=len(self.nu_lines)
+        nd int array: isotope index (index for uniqiso, T_gQT, gQT) for lines
     """
-    qr_line = jnp.zeros(len(isoid))
-    for isotope in uniqiso:
-        mask_idx = np.where(isoid == isotope)
-        isotope_index = _isotope_index_from_isotope_number(isotope, uniqiso)
-        qr_each_isotope = _qr_interp(isotope_index, T, T_gQT, gQT, Tref)
-        qr_line = qr_line.at[jnp.index_exp[mask_idx]].set(qr_each_isotope)
-    return qr_line
+    return np.searchsorted(np.asarray(uniqiso), np.asarray(isoid))
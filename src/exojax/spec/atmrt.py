@@ -8,10 +8,13 @@
 
 import numpy as np
 import jax.numpy as jnp
+from jax import vmap
 from exojax.spec.planck import piBarr
 from exojax.spec.rtransfer import rtrun_emis_pureabs_ibased_linsap
 from exojax.spec.rtransfer import rtrun_emis_pureabs_fbased2st
 from exojax.spec.rtransfer import rtrun_emis_pureabs_ibased
+from exojax.spec.rtransfer import rtrun_emis_pureabs_fbased_e3
+from exojax.spec.rtransfer import rtrun_emis_pureabs_fbased_e3_linsap
 from exojax.spec.rtransfer import rtrun_emis_scat_lart_toonhm
 from exojax.spec.rtransfer import rtrun_emis_scat_fluxadding_toonhm
 from exojax.spec.rtransfer import rtrun_reflect_fluxadding_toonhm
@@ -24,9 +27,11 @@ from exojax.atm.idealgas import number_density
 from exojax.atm.atmprof import normalized_layer_height
 from exojax.spec.opachord import chord_geometric_matrix_lower
 from exojax.spec.opachord import chord_geometric_matrix
-from exojax.spec.opachord import chord_optical_depth
+from exojax.spec.opachord import chord_optical_depth_triangular
+from exojax.spec.nublock import nu_blocked_map
 from exojax.utils.constants import logkB, logm_ucgs
 import warnings
+from typing import NamedTuple
 
 
 class ArtCommon:
@@ -327,6 +332,7 @@ class ArtReflectPure(ArtCommon):
         nlayer=100,
         nu_grid=None,
         rtsolver="fluxadding_toon_hemispheric_mean",
+        fluxadding_solver="scan",
     ):
         """initialization of ArtReflectPure
 
@@ -336,11 +342,13 @@ class ArtReflectPure(ArtCommon):
             nlayer (int, optional): the number of the atmospheric layers. Defaults to 100.
             nu_grid (float, array, optional): the wavenumber grid. Defaults to None.
             rtsolver (str): Radiative Transfer Solver, fluxadding_toon_hemispheric_mean
+            fluxadding_solver (str): flux adding solver, "scan" (default) or "parallel" (associative scan in layers)
 
 
         """
         super().__init__(pressure_top, pressure_btm, nlayer, nu_grid)
         self.rtsolver = rtsolver
+        self.fluxadding_solver = fluxadding_solver
         self.method = "reflection_using_" + self.rtsolver
 
     def run(
@@ -378,6 +386,7 @@ class ArtReflectPure(ArtCommon):
                 source_surface,
                 reflectivity_surface,
                 incoming_flux,
+                fluxadding_solver=self.fluxadding_solver,
             )
         else:
             print("rtsolver=", self.rtsolver)
@@ -399,6 +408,7 @@ class ArtReflectEmis(ArtCommon):
         nlayer=100,
         nu_grid=None,
         rtsolver="fluxadding_toon_hemispheric_mean",
+        fluxadding_solver="scan",
     ):
         """initialization of ArtEmisPure
 
@@ -408,11 +418,13 @@ class ArtReflectEmis(ArtCommon):
             nlayer (int, optional): the number of the atmospheric layers. Defaults to 100.
             nu_grid (float, array, optional): the wavenumber grid. Defaults to None.
             rtsolver (str): Radiative Transfer Solver, fluxadding_toon_hemispheric_mean
+            fluxadding_solver (str): flux adding solver, "scan" (default) or "parallel" (associative scan in layers)
 
 
         """
         super().__init__(pressure_top, pressure_btm, nlayer, nu_grid)
         self.rtsolver = rtsolver
+        self.fluxadding_solver = fluxadding_solver
         self.method = "reflection_using_" + self.rtsolver
 
     def run(
@@ -458,6 +470,7 @@ class ArtReflectEmis(ArtCommon):
                 source_surface,
                 reflectivity_surface,
                 incoming_flux,
+                fluxadding_solver=self.fluxadding_solver,
             )
         else:
             print("rtsolver=", self.rtsolver)
@@ -479,6 +492,8 @@ class ArtEmisScat(ArtCommon):
         nlayer=100,
         nu_grid=None,
         rtsolver="fluxadding_toon_hemispheric_mean",
+        tridiagonal_solver="scan",
+        fluxadding_solver="scan",
     ):
         """initialization of ArtEmisScat
 
@@ -488,10 +503,14 @@ class ArtEmisScat(ArtCommon):
             nlayer (int, optional): the number of the atmospheric layers. Defaults to 100.
             nu_grid (float, array, optional): the wavenumber grid. Defaults to None.
             rtsolver (str): Radiative Transfer Solver, fluxadding_toon_hemispheric_mean (default), lart_toon_hemispheric_mean
+            tridiagonal_solver (str): tridiagonal solver for LART, "scan" (default) or "parallel" (associative scan in layers). "parallel" requires the 64bit mode of JAX (float64), otherwise ValueError is raised at run.
+            fluxadding_solver (str): flux adding solver, "scan" (default) or "parallel" (associative scan in layers)
 
         """
         super().__init__(pressure_top, pressure_btm, nlayer, nu_grid)
         self.rtsolver = rtsolver
+        self.tridiagonal_solver = tridiagonal_solver
+        self.fluxadding_solver = fluxadding_solver
         self.method = "emission_with_scattering_using_" + self.rtsolver
 
     def run(
@@ -502,6 +521,7 @@ class ArtEmisScat(ArtCommon):
         temperature,
         nu_grid=None,
         show=False,
+        nu_block_size=None,
     ):
         """run radiative transfer
 
@@ -510,29 +530,39 @@ class ArtEmisScat(ArtCommon):
             temperature (1D array): temperature profile (Nlayer)
             nu_grid (1D array): if nu_grid is not initialized, provide it.
             show: plot intermediate results
+            nu_block_size (int, optional): if given, the spectrum is computed in the wavenumber blocks of this size to bound the working memory. Defaults to None (no blocking). Not available with show=True.
 
         Returns:
             1D array: spectrum
         """
         if self.nu_grid is not None:
-            sourcef = piBarr(temperature, self.nu_grid)
-        elif nu_grid is not None:
-            sourcef = piBarr(temperature, nu_grid)
-        else:
+            nu_grid = self.nu_grid
+        elif nu_grid is None:
             raise ValueError("the wavenumber grid is not given.")
 
+        if show and nu_block_size is not None:
+            raise ValueError("show=True is not available with nu_block_size.")
+
         if self.rtsolver == "lart_toon_hemispheric_mean":
-            (
-                spectrum,
-                cumTtilde,
-                Qtilde,
-                trans_coeff,
-                scat_coeff,
-                piB,
-            ) = rtrun_emis_scat_lart_toonhm(
-                dtau, single_scattering_albedo, asymmetric_parameter, sourcef
-            )
+
+            def rt(dtau, single_scattering_albedo, asymmetric_parameter, nu_grid):
+                return rtrun_emis_scat_lart_toonhm(
+                    dtau,
+                    single_scattering_albedo,
+                    asymmetric_parameter,
+                    piBarr(temperature, nu_grid),
+                    tridiagonal_solver=self.tridiagonal_solver,
+                )
+
             if show:
+                (
+                    spectrum,
+                    cumTtilde,
+                    Qtilde,
+                    trans_coeff,
+                    scat_coeff,
+                    piB,
+                ) = rt(dtau, single_scattering_albedo, asymmetric_parameter, nu_grid)
                 from exojax.plot.rtplot import comparison_with_pure_absorption
 
                 spec, spec_pure = comparison_with_pure_absorption(
@@ -540,16 +570,30 @@ class ArtEmisScat(ArtCommon):
                 )
                 return spectrum, spec, spec_pure
 
+            def rt_spectrum(*nu_arrays):
+                return rt(*nu_arrays)[0]
+
         elif self.rtsolver == "fluxadding_toon_hemispheric_mean":
-            spectrum = rtrun_emis_scat_fluxadding_toonhm(
-                dtau, single_scattering_albedo, asymmetric_parameter, sourcef
-            )
+
+            def rt_spectrum(
+                dtau, single_scattering_albedo, asymmetric_parameter, nu_grid
+            ):
+                return rtrun_emis_scat_fluxadding_toonhm(
+                    dtau,
+                    single_scattering_albedo,
+                    asymmetric_parameter,
+                    piBarr(temperature, nu_grid),
+                    fluxadding_solver=self.fluxadding_solver,
+                )
 
         else:
             print("rtsolver=", self.rtsolver)
             raise ValueError("Unknown radiative transfer solver (rtsolver).")
 
-        return spectrum
+        nu_arrays = [dtau, single_scattering_albedo, asymmetric_parameter, nu_grid]
+        if nu_block_size is None:
+            return rt_spectrum(*nu_arrays)
+        return nu_blocked_map(rt_spectrum, nu_arrays, nu_block_size)
 
 
 class ArtEmisPure(ArtCommon):
@@ -580,8 +624,8 @@ class ArtEmisPure(ArtCommon):
             pressure_btm (float, optional): bottom pressure in bar. Defaults to 1.0e2.
             nlayer (int, optional): the number of the atmospheric layers. Defaults to 100.
             nu_grid (float, array, optional): the wavenumber grid. Defaults to None.
-            rtsolver (str, optional): radiative transfer solver (ibased, fbased2st, ibased_linsap). Defaults to "ibased".
-            nstream (int, optional): the number of stream. Defaults to 8. Should be 2 for rtsolver = fbased2st
+            rtsolver (str, optional): radiative transfer solver (ibased, fbased2st, fbased_e3, fbased_e3_linsap, ibased_linsap). Defaults to "ibased".
+            nstream (int, optional): the number of stream. Defaults to 8. Should be 2 for rtsolver = fbased2st, not used for fbased_e3(_linsap)
         """
         super().__init__(pressure_top, pressure_btm, nlayer, nu_grid)
         self.method = "emission_with_pure_absorption"
@@ -591,6 +635,8 @@ class ArtEmisPure(ArtCommon):
     def set_capable_rtsolvers(self):
         self.rtsolver_dict = {
             "fbased2st": rtrun_emis_pureabs_fbased2st,
+            "fbased_e3": rtrun_emis_pureabs_fbased_e3,
+            "fbased_e3_linsap": rtrun_emis_pureabs_fbased_e3_linsap,
             "ibased": rtrun_emis_pureabs_ibased,
             "ibased_linsap": rtrun_emis_pureabs_ibased_linsap,
         }
@@ -600,12 +646,16 @@ class ArtEmisPure(ArtCommon):
         # source function to be used in rtsolver
         self.source_position_dict = {
             "fbased2st": "representative",
+            "fbased_e3": "representative",
+            "fbased_e3_linsap": "upper_boundary",
             "ibased": "representative",
             "ibased_linsap": "upper_boundary",
         }
 
         self.rtsolver_explanation = {
             "fbased2st": "Flux-based two-stream solver, isothermal layer (ExoJAX1, HELIOS-R1 like)",
+            "fbased_e3": "Flux-based solver w/ analytic angular integration (2E3) of the cumulative optical depth, isothermal layer",
+            "fbased_e3_linsap": "Flux-based solver w/ analytic angular integration (E2, E3, E4) and linear source approximation (linsap), single pass",
             "ibased": "Intensity-based n-stream solver, isothermal layer (e.g. NEMESIS, pRT like)",
             "ibased_linsap": "Intensity-based n-stream solver w/ linear source approximation (linsap), see Olson and Kunasz (e.g. HELIOS-R2 like)",
         }
@@ -636,13 +686,14 @@ class ArtEmisPure(ArtCommon):
             )
         self.nstream = nstream
 
-    def run(self, dtau, temperature, nu_grid=None):
+    def run(self, dtau, temperature, nu_grid=None, nu_block_size=None):
         """run radiative transfer
 
         Args:
             dtau (2D array): optical depth matrix, dtau  (N_layer, N_nus)
             temperature (1D array): temperature profile (Nlayer)
             nu_grid (1D array): if nu_grid is not initialized, provide it.
+            nu_block_size (int, optional): if given, the spectrum is computed in the wavenumber blocks of this size to bound the working memory. Defaults to None (no blocking).
 
         Returns:
             1D array: emission spectrum
@@ -650,16 +701,38 @@ class ArtEmisPure(ArtCommon):
         if self.nu_grid is not None:
             nu_grid = self.nu_grid
 
-        sourcef = piBarr(temperature, nu_grid)
         rtfunc = self.rtsolver_dict[self.rtsolver]
 
-        if self.rtsolver == "fbased2st":
-            return rtfunc(dtau, sourcef)
+        if self.rtsolver in ["fbased2st", "fbased_e3", "fbased_e3_linsap"]:
+
+            def rt(dtau, nu_grid):
+                return rtfunc(dtau, piBarr(temperature, nu_grid))
+
         elif self.rtsolver == "ibased" or self.rtsolver == "ibased_linsap":
             from exojax.spec.rtransfer import initialize_gaussian_quadrature
 
             mus, weights = initialize_gaussian_quadrature(self.nstream)
-            return rtfunc(dtau, sourcef, mus, weights)
+
+            def rt(dtau, nu_grid):
+                return rtfunc(dtau, piBarr(temperature, nu_grid), mus, weights)
+
+        if nu_block_size is None:
+            return rt(dtau, nu_grid)
+        return nu_blocked_map(rt, [dtau, nu_grid], nu_block_size)
+
+
+class TransmissionGeometry(NamedTuple):
+    """chord geometry of the atmospheric layers for ArtTransPure
+
+    Attributes:
+        normalized_height: normalized height of the layers (Nlayer)
+        normalized_radius_lower: normalized radius at the lower boundary of the layers (Nlayer)
+        chord_geometric_matrices: tuple of the chord geometric matrices (Nlayer, Nlayer), (lower,) or (lower, midpoint)
+    """
+
+    normalized_height: jnp.ndarray
+    normalized_radius_lower: jnp.ndarray
+    chord_geometric_matrices: tuple
 
 
 class ArtTransPure(ArtCommon):
@@ -724,7 +797,15 @@ class ArtTransPure(ArtCommon):
                 "Unknown integration (scheme). Use " + str_valid_integration
             )
 
-    def run(self, dtau, temperature, mean_molecular_weight, radius_btm, gravity_btm):
+    def run(
+        self,
+        dtau,
+        temperature,
+        mean_molecular_weight,
+        radius_btm,
+        gravity_btm,
+        nu_block_size=None,
+    ):
         """run radiative transfer
 
         Args:
@@ -733,6 +814,7 @@ class ArtTransPure(ArtCommon):
             mean_molecular_weight (1D array): mean molecular weight profile, (Nlayer, from atmospheric top to bottom)
             radius_btm (float): radius (cm) at the lower boundary of the bottom layer, R0 or r_N
             gravity_btm (float): gravity (cm/s2) at the lower boundary of the bottom layer, g_N
+            nu_block_size (int, optional): if given, the spectrum is computed in the wavenumber blocks of this size to bound the working memory. Defaults to None (no blocking).
 
         Returns:
             1D array: transit squared radius normalized by radius_btm**2, i.e. it returns (radius/radius_btm)**2
@@ -744,26 +826,138 @@ class ArtTransPure(ArtCommon):
 
         """
 
+        geometry = self.chord_geometry(
+            temperature, mean_molecular_weight, radius_btm, gravity_btm
+        )
+        return self.run_with_geometry(dtau, geometry, nu_block_size)
+
+    def run_batch(
+        self,
+        dtau,
+        temperature,
+        mean_molecular_weight,
+        radius_btm,
+        gravity_btm,
+        average=False,
+        nu_block_size=None,
+    ):
+        """run radiative transfer for K profiles (e.g. exposures or morning/evening limbs) in one call
+
+        Args:
+            dtau (3D array): optical depth matrices, dtau  (K, N_layer, N_nus)
+            temperature (1D/2D array): temperature profile (Nlayer) shared by all the profiles, or profiles (K, Nlayer)
+            mean_molecular_weight (1D/2D array): mean molecular weight profile (Nlayer) shared by all the profiles, or profiles (K, Nlayer)
+            radius_btm (float): radius (cm) at the lower boundary of the bottom layer, R0 or r_N
+            gravity_btm (float): gravity (cm/s2) at the lower boundary of the bottom layer, g_N
+            average (bool, optional): if True, returns the average over the K profiles, e.g. the limb-averaged spectrum. Defaults to False.
+            nu_block_size (int, optional): if given, the spectrum is computed in the wavenumber blocks of this size. Defaults to None (no blocking).
+
+        Returns:
+            2D array: transit squared radius normalized by radius_btm**2 (K, N_nus), or 1D array (N_nus) if average=True
+
+        Notes:
+            When both temperature and mean_molecular_weight are 1D, the layer heights and chord geometric matrices are computed once and shared by the K profiles.
+        """
+        temperature = jnp.asarray(temperature)
+        mean_molecular_weight = jnp.asarray(mean_molecular_weight)
+
+        if temperature.ndim == 1 and mean_molecular_weight.ndim == 1:
+            geometry = self.chord_geometry(
+                temperature, mean_molecular_weight, radius_btm, gravity_btm
+            )
+            spectra = vmap(
+                lambda dtau: self.run_with_geometry(dtau, geometry, nu_block_size)
+            )(dtau)
+        else:
+            shape = (jnp.shape(dtau)[0], self.nlayer)
+            temperature = jnp.broadcast_to(temperature, shape)
+            mean_molecular_weight = jnp.broadcast_to(mean_molecular_weight, shape)
+
+            def run_single(dtau, temperature, mean_molecular_weight):
+                geometry = self.chord_geometry(
+                    temperature, mean_molecular_weight, radius_btm, gravity_btm
+                )
+                return self.run_with_geometry(dtau, geometry, nu_block_size)
+
+            spectra = vmap(run_single)(dtau, temperature, mean_molecular_weight)
+
+        if average:
+            return jnp.mean(spectra, axis=0)
+        return spectra
+
+    def chord_geometry(
+        self, temperature, mean_molecular_weight, radius_btm, gravity_btm
+    ):
+        """computes the chord geometry, which can be reused by run_with_geometry as long as the profiles are fixed
+
+        Args:
+            temperature (1D array): temperature profile (Nlayer)
+            mean_molecular_weight (1D array): mean molecular weight profile, (Nlayer, from atmospheric top to bottom)
+            radius_btm (float): radius (cm) at the lower boundary of the bottom layer, R0 or r_N
+            gravity_btm (float): gravity (cm/s2) at the lower boundary of the bottom layer, g_N
+
+        Returns:
+            TransmissionGeometry: normalized layer height, normalized radius at the lower boundary, and chord geometric matrices (lower, and midpoint for simpson)
+        """
         normalized_height, normalized_radius_lower = self.atmosphere_height(
             temperature, mean_molecular_weight, radius_btm, gravity_btm
         )
+        chord_geometric_matrices = (
+            chord_geometric_matrix_lower(normalized_height, normalized_radius_lower),
+        )
+        if self.integration == "simpson":
+            chord_geometric_matrices = chord_geometric_matrices + (
+                chord_geometric_matrix(normalized_height, normalized_radius_lower),
+            )
+        return TransmissionGeometry(
+            normalized_height, normalized_radius_lower, chord_geometric_matrices
+        )
+
+    def run_with_geometry(self, dtau, geometry, nu_block_size=None):
+        """run radiative transfer using the precomputed chord geometry
+
+        Args:
+            dtau (2D array): optical depth matrix, dtau  (N_layer, N_nus)
+            geometry (TransmissionGeometry): chord geometry from chord_geometry
+            nu_block_size (int, optional): if given, the spectrum is computed in the wavenumber blocks of this size. Defaults to None (no blocking).
+
+        Returns:
+            1D array: transit squared radius normalized by radius_btm**2, i.e. it returns (radius/radius_btm)**2
+
+        Notes:
+            The layer heights and O(Nlayer^2) chord geometric matrices are not recomputed, which is useful when only dtau changes (e.g. abundance-only retrievals).
+        """
+        normalized_height, normalized_radius_lower, cgm_list = geometry
+        if self.integration == "simpson" and len(cgm_list) < 2:
+            raise ValueError(
+                "geometry lacks the midpoint chord geometric matrix. Compute it with integration = simpson."
+            )
         normalized_radius_top = normalized_radius_lower[0] + normalized_height[0]
-        cgm = chord_geometric_matrix_lower(normalized_height, normalized_radius_lower)
-        dtau_chord_lower = chord_optical_depth(cgm, dtau)
         func = self.integration_dict[self.integration]
 
         if self.integration == "trapezoid":
-            return func(
-                dtau_chord_lower, normalized_radius_lower, normalized_radius_top
-            )
+
+            def rt(dtau):
+                (dtau_chord_lower,) = chord_optical_depth_triangular(
+                    cgm_list[:1], dtau
+                )
+                return func(
+                    dtau_chord_lower, normalized_radius_lower, normalized_radius_top
+                )
+
         elif self.integration == "simpson":
-            cgm_midpoint = chord_geometric_matrix(
-                normalized_height, normalized_radius_lower
-            )
-            dtau_chord_midpoint = chord_optical_depth(cgm_midpoint, dtau)
-            return func(
-                dtau_chord_midpoint,
-                dtau_chord_lower,
-                normalized_radius_lower,
-                normalized_height,
-            )
+
+            def rt(dtau):
+                dtau_chord_lower, dtau_chord_midpoint = chord_optical_depth_triangular(
+                    cgm_list, dtau
+                )
+                return func(
+                    dtau_chord_midpoint,
+                    dtau_chord_lower,
+                    normalized_radius_lower,
+                    normalized_height,
+                )
+
+        if nu_block_size is None:
+            return rt(dtau)
+        return nu_blocked_map(rt, [dtau], nu_block_size)
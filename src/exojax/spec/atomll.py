@@ -1,8 +1,8 @@
 import numpy as np
 from exojax.spec import atomllapi
 from exojax.utils.constants import ccgs, m_u, kB, hcperk, ecgs, hcgs, Rcgs, a0, eV2wn, Tref_original
+from exojax.utils.interp import interp_uniform
 import jax.numpy as jnp
-from jax.lax import scan
 import warnings
 
 
@@ -23,13 +23,11 @@ def Sij0(A, gupper, nu_lines, elower, QTref_284, QTmask, Irwin=False):
     """
 
     # Assign Q(Tref) for each line
-    QTref = np.zeros_like(QTmask, dtype=float)
-    for i, mask in enumerate(QTmask):
-        QTref[i] = QTref_284[mask]
+    QTref = np.asarray(QTref_284, dtype=float)[np.asarray(QTmask, dtype=int)]
 
     # Use Irwin_1981 for Fe I (mask==76)  #test211013Tako
     if Irwin == True:
-        QTref[jnp.where(QTmask == 76)[0]] = atomllapi.partfn_Fe(Tref_original)
+        QTref[np.asarray(QTmask) == 76] = atomllapi.partfn_Fe(Tref_original)
 
     S0 = -A*gupper*np.exp(-hcperk*elower/Tref_original)*np.expm1(-hcperk*nu_lines/Tref_original)\
         / (8.0*np.pi*ccgs*nu_lines**2*QTref)
@@ -398,14 +396,32 @@ def get_unique_species(adb):
     Returns:
        uspecies: unique elements of the combination of ielem and iion (jnp.array with a shape of N_UniqueSpecies x 2(ielem and iion))
     """
-    seen = []
-    def get_unique_list(seq): return [
-        x for x in seq if x not in seen and not seen.append(x)]
-    uspecies = jnp.array(get_unique_list(
-        jnp.vstack([adb.ielem, adb.iion]).T.tolist()))
+    pairs = np.vstack([np.asarray(adb.ielem), np.asarray(adb.iion)]).T
+    _, first_index = np.unique(pairs, axis=0, return_index=True)
+    # keeps the order of the first appearance in adb
+    uspecies = jnp.array(pairs[np.sort(first_index)])
     return uspecies
 
 
+def species_index_lines(ielem, iion, uspecies):
+    """index of uspecies for each line
+
+    Args:
+       ielem: atomic number of lines [N_line]
+       iion: ionized level of lines [N_line]
+       uspecies: unique combinations of ielem and iion [N_species x 2], e.g. output of get_unique_species
+
+    Returns:
+       index of uspecies for each line (nd int array [N_line])
+    """
+    uspecies = np.asarray(uspecies)
+    code_uspecies = uspecies[:, 0] * 100 + uspecies[:, 1]
+    code_lines = np.asarray(ielem) * 100 + np.asarray(iion)
+    order = np.argsort(code_uspecies)
+    pos = np.searchsorted(code_uspecies, code_lines, sorter=order)
+    return order[np.clip(pos, 0, len(order) - 1)]
+
+
 def ielemion_to_FastChemSymbol(ielem, iion):
     """Translate atomic number and ionization level into SpeciesSymbol in
     FastChem.
@@ -432,33 +448,21 @@ def get_VMR_uspecies(uspecies, mods_ID = jnp.array([[0, 0], ]), mods = jnp.array
     Returns:
         VMR_uspecies: jnp.array of volume mixing ratio [N_species]
     """
-    mods_ID_uspecies = jnp.zeros(len(mods_ID), dtype=int)
-
-    def f_miu(i_and_arr, sp):
-        i, arr = i_and_arr
-        i_and_arr = i + \
-            1, jnp.where(((mods_ID[:, 0] == sp[0]) & (
-                mods_ID[:, 1] == sp[1])), i, arr)
-        return (i_and_arr, sp)
-    mods_ID_uspecies = scan(f_miu, (0, mods_ID_uspecies), uspecies)[0][1]
-
+    uspecies = jnp.asarray(uspecies)
+    mods_ID = jnp.asarray(mods_ID)
     ipccd = atomllapi.load_atomicdata()
     ItIoI = atomllapi.ielem_to_index_of_ipccd
     Narr = jnp.array(10**(ipccd['solarA']))  # number density in the Sun
 
-    def f_vmr(i, sp): return (i, jnp.where(sp[1] == 1,
-                                           Narr[ItIoI[sp[0]]] / jnp.sum(Narr),
-                                           Narr[ItIoI[sp[0]]] / jnp.sum(Narr) * 1e-10))
-    VMR_uspecies = scan(f_vmr, 0, uspecies)[1]
+    VMR_sun = Narr[ItIoI[uspecies[:, 0]]] / jnp.sum(Narr)
+    VMR_uspecies = jnp.where(uspecies[:, 1] == 1, VMR_sun, VMR_sun * 1e-10)
 
-    def f_mod(i_and_VMR, i_MIU):
-        i, VMR_uspecies = i_and_VMR
-        i_and_VMR = i + \
-            1, VMR_uspecies.at[i_MIU].set(VMR_uspecies[i_MIU]*10**mods[i])
-        return (i_and_VMR, i_MIU)
-    VMR_uspecies = scan(f_mod, (0, VMR_uspecies), mods_ID_uspecies)[0][1]
-
-    return VMR_uspecies
+    # match matrix between uspecies and mods_ID [N_species x N_modified_species]
+    match = (uspecies[:, None, 0] == mods_ID[None, :, 0]) & (
+        uspecies[:, None, 1] == mods_ID[None, :, 1])
+    dex_uspecies = jnp.sum(jnp.where(match, jnp.asarray(mods)[None, :], 0.0),
+                           axis=1)
+    return VMR_uspecies * 10**dex_uspecies
 
 
 def get_VMR_uspecies_FC(FCSpIndex_uspecies, mixing_ratios):
@@ -472,13 +476,7 @@ def get_VMR_uspecies_FC(FCSpIndex_uspecies, mixing_ratios):
     Returns:
         VMR_uspecies: VMR of each species in each atmospheric layer [N_species x N_layer]
     """
-    def floop(i_sp, VMR_sp):
-        VMR_sp = mixing_ratios[:, FCSpIndex_uspecies[i_sp]]
-        i_sp = i_sp + 1
-        return (i_sp, VMR_sp)
-
-    i, VMR_uspecies = scan(floop, 0, jnp.zeros(len(FCSpIndex_uspecies)))
-    return VMR_uspecies
+    return jnp.asarray(mixing_ratios)[:, jnp.asarray(FCSpIndex_uspecies)].T
 
 
 def uspecies_info(uspecies, ielem_to_index_of_ipccd, mods_ID=jnp.array([[0, 0], ]), mods=jnp.array([0, ]), mods_id_trans=jnp.array([])):
@@ -503,37 +501,14 @@ def uspecies_info(uspecies, ielem_to_index_of_ipccd, mods_ID=jnp.array([[0, 0],
     massarr = jnp.array(ipccd['mass'])
     Nmassarr = Narr * massarr  # mass density of each neutral species
 
-    def floopMMR(i, arr):
-        arr = Nmassarr[ielem_to_index_of_ipccd[uspecies[i][0]]
-                       ] / jnp.sum(Nmassarr)
-        i = i + 1
-        return (i, arr)
-    MMR_uspecies_list = scan(floopMMR, 0, np.zeros(len(uspecies)))[1]
-
-    def floopAM(i, arr):
-        arr = massarr[ielem_to_index_of_ipccd[uspecies[i][0]]]
-        i = i + 1
-        return (i, arr)
-    atomicmass_uspecies_list = scan(
-        floopAM, 0, np.zeros(len(uspecies)))[1]  # [amu]
-
-    # for i, mit in enumerate(mods_id_trans):
-    # mods_uspecies_list[mit] = mods[i]
-    def f_Mmul(msi, null):
-        ms, i = msi
-        mit = mods_id_trans[i]
-        ms = (ms.at[mit].set(mods[i]))
-        i = i + 1
-        msi = [ms, i]
-        return (msi, null)
-    length = len(mods)
-
-    def g_Mmul(msi0):
-        msi, null = scan(f_Mmul, msi0, None, length)
-        return msi[0]
-
-    mods_uspecies_list = jnp.zeros(len(uspecies))
-    mods_uspecies_list = g_Mmul([mods_uspecies_list, 0])
+    index_ipccd = jnp.asarray(ielem_to_index_of_ipccd)[jnp.asarray(uspecies)[:, 0]]
+    MMR_uspecies_list = Nmassarr[index_ipccd] / jnp.sum(Nmassarr)
+    atomicmass_uspecies_list = massarr[index_ipccd]  # [amu]
+
+    # mods_uspecies_list[mods_id_trans[i]] = mods[i]
+    mods_id_trans = jnp.asarray(mods_id_trans, dtype=int)
+    mods_uspecies_list = jnp.zeros(len(uspecies)).at[mods_id_trans].set(
+        jnp.asarray(mods, dtype=float)[:len(mods_id_trans)])
 
     return (MMR_uspecies_list, atomicmass_uspecies_list, mods_uspecies_list)
 
@@ -605,13 +580,13 @@ def interp_QT284(T, T_gQT, gQT_284species):
         T_gQT: temperature in the grid obtained from the adb instance [N_grid(42)]
         gQT_284species: partition function in the grid from the adb instance [N_species(284) x N_grid(42)]
 
+    Note:
+        The grid is resampled to the uniform temperature table by atomllapi.make_QT_table_284, i.e. the same Q(T) as adb.QT_interp_284.
+        T_gQT and gQT_284species should be concrete (not traced) arrays. Use interp_uniform(T, *adb.QT_table_284) when the table is available.
+
     Returns:
         QT_284: interpolated partition function at T Q(T) for all 284 Atomic Species [284]
     """
-    list_gQT_eachspecies = gQT_284species.tolist()
-    listofDA_gQT_eachspecies = list(
-        map(lambda x: jnp.array(x), list_gQT_eachspecies))
-    listofQT = list(map(lambda x: jnp.interp(
-        T, T_gQT, x), listofDA_gQT_eachspecies))
-    QT_284 = jnp.array(listofQT)
+    T0, dT, QT_table = atomllapi.make_QT_table_284(T_gQT, gQT_284species)
+    QT_284 = interp_uniform(T, T0, dT, jnp.asarray(QT_table))
     return QT_284
@@ -3,15 +3,20 @@
 import numpy as np
 import pandas as pd
 from exojax.utils.constants import ccgs, ecgs, mecgs, eV2wn
+from exojax.utils.interp import cubic_loglog_uniform_table
 import io
 import vaex
 import pkgutil
+import pathlib
 from io import BytesIO
 
 PeriodicTable = np.zeros([119], dtype=object)
 PeriodicTable[:] = [' 0', 'H', 'He', 'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne', 'Na', 'Mg', 'Al', 'Si', 'P', 'S', 'Cl', 'Ar', 'K', 'Ca', 'Sc', 'Ti', 'V', 'Cr', 'Mn', 'Fe', 'Co', 'Ni', 'Cu', 'Zn', 'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr', 'Rb', 'Sr', 'Y', 'Zr', 'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd', 'In', 'Sn', 'Sb', 'Te', 'I', 'Xe', 'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm', 'Eu', 'Gd', 'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu', 'Hf', 'Ta', 'W', 'Re', 'Os', 'Ir', 'Pt', 'Au', 'Hg', 'Tl', 'Pb', 'Bi', 'Po', 'At', 'Rn', 'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk', 'Cf', 'Es', 'Fm', 'Md', 'No', 'Lr', 'Rf', 'Db', 'Sg', 'Bh', 'Hs', 'Mt', 'Ds', 'Rg', 'Cn', 'Nh', 'Fl', 'Mc', 'Lv', 'Ts', 'Og']
 
 
+symbol_to_ielem = {symbol: ielem for ielem, symbol in enumerate(PeriodicTable)}
+
+
 def read_ExAll(allf):
     """IO for linelists downloaded from VALD3 with a query of "Long format" in the format of "Extract All" or "Extract Element".
 
@@ -71,14 +76,12 @@ def read_ExAll(allf):
         False: True, True: False})]
 
     # Remove highly ionized ions (iion > 3, for which the partition function is not reported in Barklem+2016)
-    dat = dat.drop(dat.index[np.where(np.array(
-        list(map(lambda x: int(x[1].strip("'")), dat.species.str.split(' ')))) > 3)[0]])
-    for i, sp in enumerate(dat.species):
-        symbol = sp.strip("'").split(' ')[0]
-        ielem = np.where(PeriodicTable == symbol)[
-            0][0] if (symbol in PeriodicTable) else 0
-        iion = int(sp.strip("'").split(' ')[-1])
-        dat.species.values[i] = ielem*100+iion-1
+    species = dat.species.str.strip("'").str.split(' ')
+    iion = species.str[-1].astype(int)
+    dat = dat[(iion <= 3).to_numpy()]
+    species = species[(iion <= 3).to_numpy()]
+    ielem = species.str[0].map(symbol_to_ielem).fillna(0).astype(int)
+    dat = dat.assign(species=ielem*100 + species.str[-1].astype(int) - 1)
     dat = dat.reset_index(drop=True)
     dat = dat.astype('float64')
     #dat = dat.astype({'wav_lines': 'float64', 'loggf': 'float64', 'elowereV': 'float64', 'jlower': 'float64', 'euppereV': 'float64'})
@@ -98,6 +101,9 @@ def read_kurucz(kuruczf):
     Args:
         kuruczf: file path
 
+    Note:
+        The fixed-width columns are parsed at once by pandas.read_fwf. The output can be cached by save_kurucz_hdf5 and read by load_kurucz_hdf5, as done in moldb.AdbKurucz.
+
     Returns:
         A:  Einstein coefficient in [s-1]
         nu_lines:  transition waveNUMBER in [cm-1] (#NOT frequency in [s-1])
@@ -112,36 +118,18 @@ def read_kurucz(kuruczf):
         gamSta: log of gamma of Stark damping (s-1)
         gamvdW:  log of (van der Waals damping constant / neutral hydrogen number) (s-1)
     """
-    with open(kuruczf) as f:
-        lines = f.readlines()
-    wlnmair, loggf, species, elower, jlower, labellower, eupper, jupper, labelupper, \
-        gamRad, gamSta, gamvdW, ref, \
-        NLTElower, NLTEupper, isonum, hyperfrac, isonumdi, isofrac, \
-        hypershiftlower, hypershiftupper, hyperFlower, hypernotelower, hyperFupper, hypternoteupper, \
-        strenclass, auto, landeglower, landegupper, isoshiftmA \
-        = \
-        np.zeros(len(lines)), np.zeros(len(lines)), np.array(['']*len(lines), dtype=object), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), \
-        np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), \
-        np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), \
-        np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(len(lines)), \
-        np.zeros(len(lines)), np.zeros(len(lines)), np.zeros(
-            len(lines)), np.zeros(len(lines)), np.zeros(len(lines))
-    ielem, iion = np.zeros(len(lines), dtype=int), np.zeros(
-        len(lines), dtype=int)
-
-    for i, line in enumerate(lines):
-        wlnmair[i] = float(line[0:11])
-        loggf[i] = float(line[11:18])
-        species[i] = str(line[18:24])
-        ielem[i] = int(species[i].split('.')[0])
-        iion[i] = int(species[i].split('.')[1])+1
-        elower[i] = float(line[24:36])
-        jlower[i] = float(line[36:41])
-        eupper[i] = float(line[52:64])
-        jupper[i] = float(line[64:69])
-        gamRad[i] = float(line[80:86])
-        gamSta[i] = float(line[86:92])
-        gamvdW[i] = float(line[92:98])
+    kuruczf = pathlib.Path(kuruczf)
+    colspecs = [(0, 11), (11, 18), (18, 24), (24, 36), (36, 41),
+                (52, 64), (64, 69), (80, 86), (86, 92), (92, 98)]
+    names = ['wlnmair', 'loggf', 'species', 'elower', 'jlower',
+             'eupper', 'jupper', 'gamRad', 'gamSta', 'gamvdW']
+    dat = pd.read_fwf(kuruczf, colspecs=colspecs, names=names, header=None,
+                      dtype={'species': str})
+    species = dat['species'].str.strip().str.split('.')
+    ielem = species.str[0].astype(int).to_numpy()
+    iion = species.str[1].astype(int).to_numpy() + 1
+    wlnmair, loggf, elower, jlower, eupper, jupper, gamRad, gamSta, gamvdW = [
+        dat[key].to_numpy(dtype=float) for key in ['wlnmair', 'loggf', 'elower', 'jlower', 'eupper', 'jupper', 'gamRad', 'gamSta', 'gamvdW']]
 
     elower_inverted = np.where((eupper-elower) > 0,  elower,  eupper)
     eupper_inverted = np.where((eupper-elower) > 0,  eupper,  elower)
@@ -172,6 +160,35 @@ def read_kurucz(kuruczf):
     return A, nu_lines, elower, eupper, gupper, jlower, jupper, ielem, iion, gamRad, gamSta, gamvdW
 
 
+kurucz_hdf5_keys = ['A', 'nu_lines', 'elower', 'eupper', 'gupper', 'jlower',
+                    'jupper', 'ielem', 'iion', 'gamRad', 'gamSta', 'gamvdW']
+
+
+def save_kurucz_hdf5(hdf5f, kurucz_arrays):
+    """save the output of read_kurucz to the hdf5 format
+
+    Args:
+        hdf5f: path to the hdf5 file
+        kurucz_arrays: the output of read_kurucz
+    """
+    dat = vaex.from_arrays(
+        **{key: np.ascontiguousarray(arr) for key, arr in zip(kurucz_hdf5_keys, kurucz_arrays)})
+    dat.export_hdf5(hdf5f)
+
+
+def load_kurucz_hdf5(hdf5f):
+    """load the hdf5 file saved by save_kurucz_hdf5 (memory-mapped by vaex)
+
+    Args:
+        hdf5f: path to the hdf5 file
+
+    Returns:
+        the same as read_kurucz
+    """
+    dat = vaex.open(hdf5f)
+    return tuple(dat[key].to_numpy() for key in kurucz_hdf5_keys)
+
+
 def pickup_param(ExAll):
     """extract transition parameters from VALD3 line list and insert the same
     DataFrame.
@@ -217,12 +234,9 @@ def pickup_param(ExAll):
     gamSta = ExAll['stark_damping'].to_numpy()
     vdWdamp = ExAll['waals_damping'].to_numpy()
 
-    ielem = np.zeros(len(ExAll), dtype='int')  # atomic number (e.g., Fe=26)
-    # e.g., neutral=1, singly ionized=2, ...
-    iion = np.zeros(len(ExAll), dtype='int')
-    for i, sp in enumerate(ExAll['species']):
-        ielem[i] = int(str(int(sp))[:2])
-        iion[i] = int(str(int(sp))[2:])+1
+    species = ExAll['species'].to_numpy().astype(int)
+    ielem = species // 100  # atomic number (e.g., Fe=26)
+    iion = species % 100 + 1  # e.g., neutral=1, singly ionized=2, ...
 
     return A, nu_lines, elower, eupper, gupper, jlower, jupper, ielem, iion, gamRad, gamSta, vdWdamp
 
@@ -305,6 +319,23 @@ def make_ielem_to_index_of_ipccd():
 ielem_to_index_of_ipccd = make_ielem_to_index_of_ipccd()
 
 
+def atomic_data_lines(ielem, key, ipccd=None):
+    """pick up the atomic data (e.g., solarA, mass) for each line by array indexing
+
+    Args:
+        ielem (nd int array): atomic number of lines (e.g., Fe=26)
+        key (str): column name of ipccd, e.g. "solarA", "mass"
+        ipccd (pd.DataFrame, optional): table of atomic data. Defaults to None (load_atomicdata()).
+
+    Returns:
+        nd array: atomic data for lines
+    """
+    if ipccd is None:
+        ipccd = load_atomicdata()
+    index = np.asarray(ielem_to_index_of_ipccd)[np.asarray(ielem, dtype=int)]
+    return ipccd[key].to_numpy()[index]
+
+
 def load_ionization_energies():
     """Load atomic ionization energies.
 
@@ -341,6 +372,63 @@ def pick_ionE(ielem, iion, df_ionE):
     return ionE
 
 
+def make_ionE_table(df_ionE):
+    """make a table of the ionization energies indexed by [ielem, iion]
+
+    Args:
+        df_ionE (pd.DataFrame): table of ionization energies (output of load_ionization_energies)
+
+    Returns:
+        ionE_table (nd array): ionization energy (eV), ionE_table[ielem, iion] gives the same value as pick_ionE(ielem, iion, df_ionE)
+    """
+    ielem = df_ionE['At. num '].to_numpy(dtype=int)
+    iion = df_ionE[' Ion Charge '].to_numpy(dtype=int) + 1
+    ionE = df_ionE['      Ionization Energy (a) (eV)      '].str.replace(
+        r'[\(\)\[\]]', '', regex=True).str.strip().replace('', '0').astype(float).to_numpy()
+    ionE_table = np.zeros((np.max(ielem) + 1, np.max(iion) + 1))
+    ionE_table[ielem, iion] = ionE
+    return ionE_table
+
+
+def ionE_lines(ielem, iion, df_ionE=None):
+    """ionization energy for each line by array indexing
+
+    Args:
+        ielem (nd int array): atomic number of lines (e.g., Fe=26)
+        iion (nd int array): ionized level of lines (e.g., neutral=1, singly ionized=2, etc.)
+        df_ionE (pd.DataFrame, optional): table of ionization energies. Defaults to None (load_ionization_energies()).
+
+    Returns:
+        nd array: ionization energy (eV) for lines
+    """
+    if df_ionE is None:
+        df_ionE = load_ionization_energies()
+    ionE_table = make_ionE_table(df_ionE)
+    return ionE_table[np.asarray(ielem, dtype=int), np.asarray(iion, dtype=int)]
+
+
+def QTmask_lines(ielem, iion, pfdat):
+    """index of the partition function grid (Barklem & Collet 2016) for each line
+
+    Args:
+        ielem (nd int array): atomic number of lines (e.g., Fe=26)
+        iion (nd int array): ionized level of lines (e.g., neutral=1, singly ionized=2, etc.)
+        pfdat (pd.DataFrame): partition function table (output of load_pf_Barklem2016)
+
+    Note:
+        The species name is looked up only for the unique species, then broadcast to the lines.
+
+    Returns:
+        QTmask (nd int array): index of Q(T) grid (gQT) for each line
+    """
+    index_of_species = {name: i for i, name in enumerate(pfdat['T[K]'])}
+    species_id = np.asarray(ielem, dtype=int) * 100 + np.asarray(iion, dtype=int)
+    uniq_species_id, inverse = np.unique(species_id, return_inverse=True)
+    uniq_QTmask = np.array([index_of_species[PeriodicTable[sid // 100] + '_' + 'I' * (sid % 100)]
+                            for sid in uniq_species_id], dtype=int)
+    return uniq_QTmask[inverse]
+
+
 def load_pf_Barklem2016():
     """load a table of the partition functions for 284 atomic species.
 
@@ -361,6 +449,24 @@ def load_pf_Barklem2016():
     return pfTdat, pfdat
 
 
+def make_QT_table_284(T_gQT, gQT_284species, dT=1.0):
+    """partition function table of all 284 species on the uniform temperature grid.
+
+    Args:
+       T_gQT: temperature grid of Barklem & Collet (2016)
+       gQT_284species: partition functions of 284 species on T_gQT [284, N]
+       dT: temperature spacing (K) of the table
+
+    Note:
+       The grid of Barklem & Collet (2016) is resampled by a cubic spline in log Q vs log T.
+       The tabulated values are kept exactly at the original temperature nodes (T >= dT).
+
+    Returns:
+       T0, dT, Q table [284, Nt] (ndarray)
+    """
+    return cubic_loglog_uniform_table(T_gQT, gQT_284species, dx=dT)
+
+
 def partfn_Fe(T):
     """Partition function of Fe I from Irwin_1981.
 
@@ -125,7 +125,8 @@ def init_premodit(nu_lines,
                   diffmode=0,
                   single_broadening=False,
                   single_broadening_parameters=None,
-                  warning=False):
+                  warning=False,
+                  isotope_index=None):
     """Initialization for PreMODIT. 
 
     Args:
@@ -145,6 +146,7 @@ def init_premodit(nu_lines,
         diffmode (int): i-th Taylor expansion is used for the weight, default is 1.
         single_broadening (optional): if True, single_braodening_parameters is used. Defaults to False. 
         single_broadening_parameters (optional): [gamma_ref, n_Texp] at 296K for single broadening. When None, the median is used.
+        isotope_index (optional): isotope index (0,1,...,Nisotope-1) of lines for the multi isotope mode. Defaults to None (single isotope).
 
     Returns:
         cont_nu: contribution for wavenumber jnp.array
@@ -189,6 +191,10 @@ def init_premodit(nu_lines,
     print("# of temperature exponent grid :", len(n_Texp_grid))
 
     wavmask = (nu_lines >= nu_grid[0]) * (nu_lines <= nu_grid[-1])  #Issue 341
+    Nisotope = None
+    if isotope_index is not None:
+        Nisotope = np.max(isotope_index) + 1
+        isotope_index = np.asarray(isotope_index)[wavmask]
 
     lbd_coeff, multi_index_uniqgrid = generate_lbd(line_strength_ref[wavmask],
                                                    nu_lines[wavmask],
@@ -201,7 +207,9 @@ def init_premodit(nu_lines,
                                                    elower_grid,
                                                    Twt,
                                                    Tref=Tref,
-                                                   diffmode=diffmode)
+                                                   diffmode=diffmode,
+                                                   isotope_index=isotope_index,
+                                                   Nisotope=Nisotope)
     pmarray = np.ones(len(nu_grid) + 1)
     pmarray[1::2] = (pmarray[1::2] * -1.0)
     pmarray = jnp.array(pmarray)
@@ -253,6 +261,151 @@ def init_modit_vald(nu_linesM, nus, N_usp):
     return contS, indexS, R, pmarray
 
 
+def init_modit_vald_ragged(ardb, nus, mass_grid_resolution=None):
+    """Initialization for MODIT for the ragged atomic database (AdbRaggedVald)
+
+    Args:
+        ardb: ardb instance made by the AdbRaggedVald class in moldb.py
+        nus: wavenumenr grid [Nnugrid] (should be numpy F64)
+        mass_grid_resolution: resolution of the atomic mass grid in natural log, used for the Doppler width. If None, the grid is the unique atomic masses of the species (exact).
+
+    Note:
+        The Doppler width of a line is sqrt(T/m) dependent, so the lines are distributed on the (log) atomic mass grid, which is common to all the layers.
+
+    Returns:
+        cont: (contribution for wavenumber) jnp.array [N_line]
+        index: (index for wavenumber) jnp.array [N_line]
+        R: spectral resolution
+        pmarray: (+1,-1) array whose length of len(nu_grid)+1
+        cont_mass: (contribution for the atomic mass grid) jnp.array [N_line]
+        index_mass: (index for the atomic mass grid) jnp.array [N_line]
+        mass_grid: atomic mass grid [N_mass_grid]
+    """
+    from exojax.spec.set_ditgrid import ditgrid_log_interval
+    cont, index, R, pmarray = init_modit(ardb.nu_lines, nus)
+    if mass_grid_resolution is None:
+        mass_grid = np.unique(ardb.atomicmass_uspecies)
+    else:
+        mass_grid = ditgrid_log_interval(ardb.atomicmass_uspecies,
+                                         dit_grid_resolution=mass_grid_resolution)
+    if len(mass_grid) == 1:
+        mass_grid = np.array([mass_grid[0], mass_grid[0] * 1.1])
+    cont_mass, index_mass = npgetix(np.log(np.asarray(ardb.atomicmass)),
+                                    np.log(mass_grid))
+    return cont, index, R, pmarray, jnp.array(cont_mass), jnp.array(
+        index_mass), mass_grid
+
+
+def init_premodit_vald(adb,
+                       nu_grid,
+                       species_index,
+                       Twt,
+                       Tref,
+                       Tref_broadening,
+                       dE=160.0,
+                       dit_grid_resolution=0.2,
+                       diffmode=0,
+                       warning=False):
+    """Initialization for PreMODIT for atomic lines (VALD/Kurucz).
+
+    Args:
+        adb: adb instance made by AdbVald or AdbKurucz (or AdbRaggedVald)
+        nu_grid: wavenumenr grid [Nnugrid] (should be numpy F64)
+        species_index: index of uspecies for each line [Nline]
+        Twt: temperature for weight in Kelvin
+        Tref: reference temperature of premodit grid
+        Tref_broadening: reference temperature for broadening.
+        dE: Elower grid interval
+        dit_grid_resolution (float): DIT grid resolution of the broadening parameters
+        diffmode (int): i-th Taylor expansion is used for the weight, default is 0.
+
+    Note:
+        The lines are grouped by (species, n_Texp), and each group has its own partition function, Doppler width and temperature exponent.
+        The pressure and natural half-widths are gridded (see premodit.broadpar_vald).
+
+    Returns:
+        lbd_coeff: LBD coefficient (diffmode+1, Nnu, Ncolumn, Nelower)
+        multi_index_column: multi index of the broadening parameter grids for the columns (Ncolumn, 2)
+        species_column: index of uspecies for the columns (Ncolumn)
+        n_Texp_column: temperature exponent for the columns (Ncolumn)
+        elower_grid: elower grid
+        ngamma_pressure_grid: grid of the normalized pressure half-width at Tref_broadening and Peff = 1 bar
+        ngamma_natural_grid: grid of the normalized natural half-width
+        R: spectral resolution
+        pmarray: (+1,-1) array whose length of len(nu_grid)+1
+    """
+    from exojax.spec.premodit import broadpar_vald
+    from exojax.spec.premodit import make_broadpar_grid_vald
+    from exojax.spec.premodit import generate_lbd_vald
+    from exojax.utils.interp import interp_uniform
+    from exojax.utils.constants import Tref_original
+    from exojax.utils.constants import hcperk
+
+    nu_lines = np.asarray(adb.nu_lines)
+    elower = np.asarray(adb.elower)
+    warn_dtype64(nu_lines, warning, tag='nu_lines')
+    warn_dtype64(nu_grid, warning, tag='nu_grid')
+    warn_outside_wavenumber_grid(nu_lines, nu_grid)
+
+    R = resolution_eslog(nu_grid)
+    elower_grid = make_elower_grid(elower, dE)
+
+    # line strength at Tref, computed in log to avoid the underflow of high Elower lines
+    QTmask = np.asarray(adb.QTmask)
+    qt_Tref = np.asarray(interp_uniform(Tref, *adb.QT_table_284))
+    qr = qt_Tref[QTmask] / np.asarray(adb.QTref_284)[QTmask]
+    logsij_ref = (np.asarray(adb.logsij0) - hcperk * elower *
+                  (1.0 / Tref - 1.0 / Tref_original) +
+                  np.log(np.expm1(-hcperk * nu_lines / Tref) /
+                         np.expm1(-hcperk * nu_lines / Tref_original)) -
+                  np.log(qr))
+    line_strength_ref = np.exp(logsij_ref)
+
+    ngamma_pressure_ref, n_Texp, ngamma_natural = broadpar_vald(
+        adb, Tref_broadening, R)
+    ngamma_pressure_grid, ngamma_natural_grid = make_broadpar_grid_vald(
+        ngamma_pressure_ref,
+        ngamma_natural,
+        dit_grid_resolution=dit_grid_resolution)
+    print("# of pressure width grid : ", len(ngamma_pressure_grid))
+    print("# of natural width grid :", len(ngamma_natural_grid))
+
+    groups, group_index = np.unique(np.vstack(
+        [np.asarray(species_index), n_Texp]).T,
+                                    axis=0,
+                                    return_inverse=True)
+    group_index = group_index.ravel()
+
+    wavmask = (nu_lines >= nu_grid[0]) * (nu_lines <= nu_grid[-1])
+    lbd_coeff, multi_index_column, group_column = generate_lbd_vald(
+        line_strength_ref[wavmask],
+        nu_lines[wavmask],
+        nu_grid,
+        ngamma_pressure_ref[wavmask],
+        ngamma_pressure_grid,
+        ngamma_natural[wavmask],
+        ngamma_natural_grid,
+        elower[wavmask],
+        elower_grid,
+        Twt,
+        group_index[wavmask],
+        Tref=Tref,
+        diffmode=diffmode)
+    species_column = groups[group_column, 0].astype(int)
+    n_Texp_column = groups[group_column, 1]
+    print("# of columns (species x broadening parameters) :",
+          len(species_column))
+
+    pmarray = np.ones(len(nu_grid) + 1)
+    pmarray[1::2] = (pmarray[1::2] * -1.0)
+    pmarray = jnp.array(pmarray)
+
+    return lbd_coeff, jnp.array(multi_index_column), jnp.array(
+        species_column), jnp.array(
+            n_Texp_column
+        ), elower_grid, ngamma_pressure_grid, ngamma_natural_grid, R, pmarray
+
+
 def warn_dtype64(arr, warning, tag=''):
     """check arr's dtype.
 
@@ -99,6 +99,22 @@ def layer_optical_depth_VALD(dParr, xsm, VMR, mean_molecular_weight, gravity):
     return dtau
 
 
+def layer_optical_depth_VALD_ragged(dParr, xsm_vmr, mean_molecular_weight, gravity):
+    """dtau of the atomic (+ionic) cross section from the ragged VALD database.
+
+    Args:
+        dParr: delta pressure profile (bar) [N_layer]
+        xsm_vmr: VMR-weighted cross section matrix (cm2), output of modit.xsmatrix_vald_ragged [N_layer x N_wav]
+        mean_molecular_weight: mean molecular weight [N_layer]
+        gravity: gravity (cm/s2)
+
+    Returns:
+        2D array: optical depth matrix, dtau  [N_layer, N_nus]
+    """
+    return dtauM_mmwl(dParr, xsm_vmr, jnp.ones_like(dParr), mean_molecular_weight,
+                      gravity)
+
+
 def layer_optical_depth_Hminus(nu_grid, temperature, Parr, dParr, vmre, vmrh, mmw, g):
     """dtau of the H- continuum.
 
@@ -10,8 +10,12 @@ import numpy as np
 import jax.numpy as jnp
 from jax import jit, vmap
 from jax.lax import scan
+from jax.lax import map as lax_map
 from exojax.spec.ditkernel import fold_voigt_kernel_logst
 from exojax.spec.lsd import inc2D_givenx
+from exojax.spec.lsd import add3D
+from exojax.utils.indexing import getix
+from exojax.utils.interp import interp_uniform
 from exojax.spec.set_ditgrid import minmax_ditgrid_matrix
 from exojax.spec.set_ditgrid import precompute_modit_ditgrid_matrix
 
@@ -25,7 +29,8 @@ from exojax.spec import normalized_doppler_sigma
 from exojax.spec.hitran import gamma_hitran
 
 # vald
-from exojax.spec.atomll import gamma_vald3, interp_QT284
+from exojax.spec.atomll import gamma_vald3
+from exojax.spec import atomllapi
 
 
 def calc_xsection_from_lsd(Slsd, R, pmarray, nsigmaD, nu_grid,
@@ -296,7 +301,7 @@ def set_ditgrid_matrix_hitran(mdb, fT, Parr, Pself_ref, R, molmass,
 
 
 @jit
-def vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, QTmask, \
+def vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, QTref_284, QTmask, \
                ielem, iion, atomicmass, ionE, dev_nu_lines, logsij0, elower, eupper, gamRad, gamSta, vdWdamp, Tref):
     """Compute atomic line information required for MODIT for separated EACH species, using parameters attributed in VALD separated atomic database (asdb).
 
@@ -307,6 +312,7 @@ def vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, QTmask, \
         PHH:  partial pressure array of molecular hydrogen (H2) [N_layer]
         R:  spectral resolution [scalar]
         qt_284_T:  partition function at the temperature T Q(T), for 284 species
+        QTref_284:  partition function at Tref Q(Tref), for 284 species
         QTmask:  array of index of Q(Tref) grid (gQT) for each line
         ielem:  atomic number (e.g., Fe=26)
         iion:  ionized level (e.g., neutral=1, singly ionized=2, etc.)
@@ -326,8 +332,8 @@ def vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, QTmask, \
         ngammaLM:  normalized gammaL matrix [N_layer x N_line]
         nsigmaDl:  normalized sigmaD matrix [N_layer x 1]
     """
-    # Compute normalized partition function for each species
-    qt = qt_284_T[:, QTmask]
+    # Compute normalized partition function Q(T)/Q(Tref) for each species
+    qt = qt_284_T[:, QTmask] / QTref_284[QTmask]
 
     # Compute line strength matrix
     SijM = jit(vmap(line_strength,(0,None,None,None,0,None)))\
@@ -360,12 +366,10 @@ def vald_all(asdb, Tarr, PH, PHe, PHH, R):
         ngammaLMS:  normalized gammaL matrix [N_species x N_layer x N_line]
         nsigmaDlS:  normalized sigmaD matrix [N_species x N_layer x 1]
     """
-    gQT_284species = asdb.gQT_284species
-    T_gQT = asdb.T_gQT
-    qt_284_T = vmap(interp_QT284, (0, None, None))(Tarr, T_gQT, gQT_284species)
+    qt_284_T = interp_uniform(Tarr, *asdb.QT_table_284).T
 
-    SijMS, ngammaLMS, nsigmaDlS = jit(vmap(vald_each, (None, None, None, None, None, None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, None, )))\
-        (Tarr, PH, PHe, PHH, R, qt_284_T, \
+    SijMS, ngammaLMS, nsigmaDlS = jit(vmap(vald_each, (None, None, None, None, None, None, None, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, None, )))\
+        (Tarr, PH, PHe, PHH, R, qt_284_T, jnp.asarray(asdb.QTref_284), \
                  asdb.QTmask, asdb.ielem, asdb.iion, asdb.atomicmass, asdb.ionE, \
                        asdb.dev_nu_lines, asdb.logsij0, asdb.elower, asdb.eupper, asdb.gamRad, asdb.gamSta, asdb.vdWdamp, asdb.Tref)
 
@@ -418,10 +422,13 @@ def set_ditgrid_matrix_vald_each(ielem, iion, atomicmass, ionE, dev_nu_lines,
     """
     set_dgm_minmax = []
     Tarr_list = fT(*kargs)
+    # the same uniform partition function table as adb.QT_interp_284
+    T0, dT, QT_table = atomllapi.make_QT_table_284(T_gQT, gQT_284species)
+    QT_table = jnp.asarray(QT_table)
+    QTref_284 = interp_uniform(Tref, T0, dT, QT_table)
     for Tarr in Tarr_list:
-        qt_284_T = vmap(interp_QT284, (0, None, None))(Tarr, T_gQT,
-                                                       gQT_284species)
-        SijM, ngammaLM, nsigmaDl = vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, \
+        qt_284_T = interp_uniform(Tarr, T0, dT, QT_table).T
+        SijM, ngammaLM, nsigmaDl = vald_each(Tarr, PH, PHe, PHH, R, qt_284_T, QTref_284, \
              QTmask, ielem, iion, atomicmass, ionE, \
                                              dev_nu_lines, logsij0, elower, eupper, gamRad, gamSta, vdWdamp, Tref)
         floop = lambda c, arr: (c,
@@ -461,6 +468,11 @@ def set_ditgrid_matrix_vald_all(asdb, PH, PHe, PHH, R, fT, dit_grid_resolution,
     Returns:
         dgm_ngammaLS:  DIT Grid Matrix (dgm) of normalized gammaL [N_species x N_layer x N_DITgrid]
 
+    Note:
+        The min/max of the normalized gammaL are computed species by species (lax.map) and accumulated over the sampled temperature profiles (lax.scan),
+        i.e. the peak memory is N_layer x L_max (L_max: the maximum number of lines per species). The grids are padded with the maximum to the longest one,
+        i.e. the result is identical to the loop of set_ditgrid_matrix_vald_each over species.
+
     Example:
        >>> fT = lambda T0,alpha:  T0[:,None]*(Parr[None,:]/Pref)**alpha[:,None]
        >>> T0_test=np.array([3000.0,4000.0,3000.0,4000.0])
@@ -468,25 +480,43 @@ def set_ditgrid_matrix_vald_all(asdb, PH, PHe, PHH, R, fT, dit_grid_resolution,
        >>> dit_grid_resolution=0.2
        >>> dgm_ngammaLS = setdgm_vald_all(asdb, PH, PHe, PHH, R, fT, dit_grid_resolution, T0_test, alpha_test)
     """
-    T_gQT = asdb.T_gQT
-    gQT_284species = asdb.gQT_284species
-
-    dgm_ngammaLS_BeforePadding = []
-    lendgm = []
-    for i in range(asdb.N_usp):
-        dgm_ngammaL_sp = set_ditgrid_matrix_vald_each(asdb.ielem[i], asdb.iion[i], asdb.atomicmass[i], asdb.ionE[i], \
-            asdb.dev_nu_lines[i], asdb.logsij0[i], asdb.elower[i], asdb.eupper[i], asdb.gamRad[i], asdb.gamSta[i], asdb.vdWdamp[i], asdb.Tref, \
-            asdb.QTmask[i], T_gQT, gQT_284species, PH, PHe, PHH, R, fT, dit_grid_resolution, *kargs)
-        dgm_ngammaLS_BeforePadding.append(dgm_ngammaL_sp)
-        lendgm.append(dgm_ngammaL_sp.shape[1])
-    Lmax_dgm = np.max(np.array(lendgm))
-
-    # Padding to unity the length of all the DIT Grid Matrix (dgm) and convert them into jnp.array
-    pad2Dm = lambda arr, L: jnp.pad(arr, ((0, 0), (0, L - arr.shape[1])),
-                                    mode='maximum')
-    dgm_ngammaLS = np.zeros([asdb.N_usp, len(PH), Lmax_dgm])
-    for i_sp, dgmi in enumerate(dgm_ngammaLS_BeforePadding):
-        dgm_ngammaLS[i_sp] = pad2Dm(dgmi, Lmax_dgm)
+    Tarr_list = jnp.asarray(fT(*kargs))
+    N_usp, L_max = np.shape(asdb.dev_nu_lines)
+    N_layer = np.shape(Tarr_list)[1]
+    per_species = lambda arr: jnp.repeat(jnp.asarray(arr)[:, None], L_max, axis=1)
+    line_params = (per_species(asdb.ielem), per_species(asdb.iion), jnp.asarray(asdb.dev_nu_lines),
+                   jnp.asarray(asdb.elower), jnp.asarray(asdb.eupper),
+                   per_species(asdb.atomicmass), per_species(asdb.ionE),
+                   jnp.asarray(asdb.gamRad), jnp.asarray(asdb.gamSta), jnp.asarray(asdb.vdWdamp))
+    vmapvald3 = vmap(gamma_vald3, (0, 0, 0, 0) + (None, ) * (len(line_params) + 1))
+
+    def minmax_species(line_params_species):
+        nu_lines = line_params_species[2]
+
+        def minmax_sample(minmax, Tarr):
+            gammaL = vmapvald3(Tarr, PH, PHH, PHe, *line_params_species, 1.0)
+            log_ngammaL = jnp.log10(gammaL / (nu_lines / R))  # [N_layer x L_max]
+            # padded lines (nu_lines=0) and nan/inf widths are excluded from min/max
+            valid = (nu_lines > 0.0) & jnp.isfinite(log_ngammaL)
+            lmin = jnp.minimum(minmax[0], jnp.min(jnp.where(valid, log_ngammaL, jnp.inf), axis=1))
+            lmax = jnp.maximum(minmax[1], jnp.max(jnp.where(valid, log_ngammaL, -jnp.inf), axis=1))
+            return (lmin, lmax), None
+
+        init = (jnp.full(N_layer, jnp.inf), jnp.full(N_layer, -jnp.inf))
+        minmax, _ = scan(minmax_sample, init, Tarr_list)
+        return minmax
+
+    lmin, lmax = jit(lambda params: lax_map(minmax_species, params))(line_params)
+    lmin = np.asarray(lmin)  # [N_species x N_layer]
+    lmax = np.asarray(lmax)
+
+    # the number of the grid points of each species, as precompute_modit_ditgrid_matrix
+    Ng = (np.max(lmax - lmin, axis=1) / dit_grid_resolution).astype(int) + 2
+    Lmax_dgm = np.max(Ng)
+    k = np.arange(Lmax_dgm)[None, None, :]
+    frac = np.minimum(k / (Ng[:, None, None] - 1.0), 1.0)
+    # padding with the maximum value for k >= Ng
+    dgm_ngammaLS = 10**(lmin[:, :, None] + (lmax - lmin)[:, :, None] * frac)
     return jnp.array(dgm_ngammaLS)
 
 
@@ -515,6 +545,147 @@ def xsmatrix_vald(cnuS, indexnuS, R, pmarray, nsigmaDlS, ngammaLMS, SijMS,
     return xsmS
 
 
+def vald_ragged(ardb, Tarr, PH, PHe, PHH, R):
+    """Compute atomic line information required for MODIT for all species at once, using the ragged atomic database (ardb).
+
+    Args:
+        ardb:  ardb instance made by the AdbRaggedVald class in moldb.py
+        Tarr:  temperature array [N_layer]
+        PH:  partial pressure array of neutral hydrogen (H) [N_layer]
+        PHe:  partial pressure array of neutral helium (He) [N_layer]
+        PHH:  partial pressure array of molecular hydrogen (H2) [N_layer]
+        R:  spectral resolution [scalar]
+
+    Note:
+        The line strength is computed with the partition function ratio Q(T)/Q(Tref) of each species.
+
+    Returns:
+        SijM:  line intensity matrix [N_layer x N_line]
+        ngammaLM:  normalized gammaL matrix [N_layer x N_line]
+    """
+    qt_284_T = interp_uniform(Tarr, *ardb.QT_table_284).T
+    qr = qt_284_T[:, ardb.QTmask] / ardb.QTref_284[np.asarray(ardb.QTmask)]
+    SijM = jit(vmap(line_strength, (0, None, None, None, 0, None)))(
+        Tarr, ardb.logsij0, ardb.dev_nu_lines, ardb.elower, qr, ardb.Tref)
+    gammaLM = jit(vmap(gamma_vald3,(0,0,0,0,None,None,None,None,None,None,None,None,None,None,None)))\
+            (Tarr, PH, PHH, PHe, ardb.ielem, ardb.iion, ardb.dev_nu_lines, ardb.elower, ardb.eupper, ardb.atomicmass, ardb.ionE, ardb.gamRad, ardb.gamSta, ardb.vdWdamp, 1.0)
+    ngammaLM = gammaLM / (ardb.dev_nu_lines / R)
+    return SijM, ngammaLM
+
+
+def nsigmaD_matrix_mass_grid(Tarr, mass_grid, R):
+    """normalized Doppler width matrix on the atomic mass grid
+
+    Args:
+        Tarr:  temperature array [N_layer]
+        mass_grid: atomic mass grid (output of initspec.init_modit_vald_ragged) [N_mass_grid]
+        R:  spectral resolution [scalar]
+
+    Returns:
+        nsigmaDM:  normalized sigmaD matrix [N_layer x N_mass_grid]
+    """
+    return normalized_doppler_sigma(Tarr[:, None], jnp.asarray(mass_grid)[None, :], R)
+
+
+def set_ditgrid_matrix_vald_ragged(ardb, PH, PHe, PHH, R, fT, dit_grid_resolution,
+                                   *kargs):
+    """Easy Setting of DIT Grid Matrix (dgm) using the ragged atomic database. The grid is common to all the species.
+
+    Args:
+        ardb:  ardb instance made by the AdbRaggedVald class in moldb.py
+        PH:  partial pressure array of neutral hydrogen (H) [N_layer]
+        PHe:  partial pressure array of neutral helium (He) [N_layer]
+        PHH:  partial pressure array of molecular hydrogen (H2) [N_layer]
+        R:  spectral resolution
+        fT:  function of temperature array
+        dit_grid_resolution:  resolution of dgm
+        *kargs:  arguments for fT
+
+    Returns:
+        dgm_ngammaL:  DIT Grid Matrix (dgm) of normalized gammaL [N_layer x N_DITgrid]
+    """
+    set_dgm_minmax = []
+    Tarr_list = fT(*kargs)
+    for Tarr in Tarr_list:
+        SijM, ngammaLM = vald_ragged(ardb, Tarr, PH, PHe, PHH, R)
+        set_dgm_minmax.append(
+            minmax_ditgrid_matrix(ngammaLM, dit_grid_resolution))
+    dgm_ngammaL = precompute_modit_ditgrid_matrix(
+        set_dgm_minmax, dit_grid_resolution=dit_grid_resolution)
+    return jnp.array(dgm_ngammaL)
+
+
+@jit
+def xsvector_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray, nsigmaD_grid,
+                         ngammaL, S, nu_grid, ngammaL_grid):
+    """Cross section vector (MODIT) for lines of multiple species with different atomic masses
+
+    Args:
+       cnu: contribution by npgetix for wavenumber [N_line]
+       indexnu: index by npgetix for wavenumber [N_line]
+       cmass: contribution for the atomic mass grid [N_line]
+       imass: index for the atomic mass grid [N_line]
+       R: spectral resolution
+       pmarray: (+1,-1) array whose length of len(nu_grid)+1
+       nsigmaD_grid: normaized Gaussian STD on the atomic mass grid [N_mass_grid]
+       ngammaL: normalized gammaL [N_line]
+       S: line strength, can be weighted by the VMR of the species [N_line]
+       nu_grid: linear wavenumber grid
+       ngammaL_grid: gammaL grid
+
+    Returns:
+       Cross section in the log nu grid
+    """
+    log_ngammaL_grid = jnp.log(ngammaL_grid)
+    lsd_array = jnp.zeros((len(nu_grid), len(nsigmaD_grid), len(ngammaL_grid)))
+    cgammaL, igammaL = getix(jnp.log(ngammaL), log_ngammaL_grid)
+    Slsd = add3D(lsd_array, S, cnu, indexnu, cmass, imass, cgammaL, igammaL)
+    xsk = vmap(calc_xsection_from_lsd, (1, None, None, 0, None, None))(
+        Slsd, R, pmarray, nsigmaD_grid, nu_grid, log_ngammaL_grid)
+    return jnp.sum(xsk, axis=0)
+
+
+@jit
+def xsmatrix_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray, nsigmaDM,
+                         ngammaLM, SijM, nu_grid, dgm_ngammaL, species_index,
+                         VMR_uspecies):
+    """VMR-weighted cross section matrix (MODIT) for the ragged atomic database (ardb)
+
+    Notes:
+        All the species are accumulated into a single LSD weighted by their VMR, so no padding to L_max is needed.
+        The output is sum_species VMR_species * xs_species, i.e. layeropacity.layer_optical_depth_VALD_ragged converts it to dtau.
+
+    Args:
+        cnu: contribution by npgetix for wavenumber [N_line]
+        indexnu: index by npgetix for wavenumber [N_line]
+        cmass: contribution for the atomic mass grid [N_line]
+        imass: index for the atomic mass grid [N_line]
+        R: spectral resolution
+        pmarray: (+1,-1) array whose length of len(nu_grid)+1
+        nsigmaDM: normalized sigmaD matrix on the atomic mass grid [N_layer x N_mass_grid]
+        ngammaLM: normalized gammaL matrix [N_layer x N_line]
+        SijM: line intensity matrix [N_layer x N_line]
+        nu_grid: linear wavenumber grid
+        dgm_ngammaL: DIT Grid Matrix (dgm) of normalized gammaL [N_layer x N_DITgrid]
+        species_index: index of uspecies for each line (ardb.species_index) [N_line]
+        VMR_uspecies: volume mixing ratio of the species [N_species x N_layer]
+
+    Return:
+        xsm_vmr: VMR-weighted cross section matrix [N_layer x N_wav]
+    """
+    wSijM = SijM * VMR_uspecies.T[:, species_index]
+
+    def fxs(carry, arr):
+        nsigmaD_grid, ngammaL, Sij, ngammaL_grid = arr
+        xs = xsvector_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray,
+                                  nsigmaD_grid, ngammaL, Sij, nu_grid,
+                                  ngammaL_grid)
+        return carry, xs
+
+    _, xsm = scan(fxs, 0.0, (nsigmaDM, ngammaLM, wSijM, dgm_ngammaL))
+    return jnp.abs(xsm)
+
+
 #
 def precompute_dgmatrix(set_gm_minmax, dit_grid_resolution=0.1, adopt=True):
     """Precomputing MODIT GRID MATRIX for normalized GammaL.
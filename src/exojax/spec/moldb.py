@@ -8,8 +8,9 @@ import vaex
 import warnings
 from exojax.spec import atomllapi, atomll
 from exojax.utils.constants import Tref_original
+from exojax.utils.interp import interp_uniform
 from exojax.spec import api 
-__all__ = ['AdbVald', 'AdbSepVald', 'AdbKurucz']
+__all__ = ['AdbVald', 'AdbSepVald', 'AdbRaggedVald', 'AdbKurucz']
 
 explanation_states = "Note: Couldn't find the hdf5 format. We convert data to the hdf5 format. After the second time, it will become much faster."
 explanation_trans = "Note: Couldn't find the hdf5 format. We convert data to the hdf5 format. After the second time, it will become much faster."
@@ -94,6 +95,8 @@ class AdbVald(object):
         self.T_gQT = jnp.array(pfTdat.columns[1:], dtype=float)
         self.gQT_284species = jnp.array(self.pfdat.iloc[:, 1:].to_numpy(
             dtype=float))  # grid Q vs T vs Species
+        T0, dT, QT_table = atomllapi.make_QT_table_284(self.T_gQT, self.gQT_284species)
+        self.QT_table_284 = (T0, dT, jnp.array(QT_table))
         self.QTref_284 = np.array(self.QT_interp_284(Tref_original))
         # identify index of QT grid (gQT) for each line
         self._QTmask = self.make_QTmask(self._ielem, self._iion)
@@ -114,12 +117,10 @@ class AdbVald(object):
         # Compile atomic-specific data for each absorption line of interest
         ipccd = atomllapi.load_atomicdata()
         self.solarA = jnp.array(
-            list(map(lambda x: ipccd[ipccd['ielem'] == x].iat[0, 4], self.ielem)))
+            atomllapi.atomic_data_lines(self._ielem, 'solarA', ipccd))
         self.atomicmass = jnp.array(
-            list(map(lambda x: ipccd[ipccd['ielem'] == x].iat[0, 5], self.ielem)))
-        df_ionE = atomllapi.load_ionization_energies()
-        self.ionE = jnp.array(
-            list(map(atomllapi.pick_ionE, self.ielem, self.iion, [df_ionE, ] * len(self.ielem))))
+            atomllapi.atomic_data_lines(self._ielem, 'mass', ipccd))
+        self.ionE = jnp.array(atomllapi.ionE_lines(self._ielem, self._iion))
 
     def masking(self, mask):
         """applying mask.
@@ -200,8 +201,11 @@ class AdbVald(object):
         Returns:
           Q(T): interpolated in jnp.array for the Atomic Species
         """
-        gQT = self.Atomic_gQT(atomspecies)
-        QT = jnp.interp(T, self.T_gQT, gQT)
+        atomspecies_Roman = atomspecies.split(
+            ' ')[0] + '_' + 'I'*int(atomspecies.split(' ')[-1])
+        isp = np.where(self.pfdat['T[K]'] == atomspecies_Roman)[0][0]
+        T0, dT, QT_table = self.QT_table_284
+        QT = interp_uniform(T, T0, dT, QT_table[isp])
         return QT
 
     def QT_interp_Irwin_Fe(self, T, atomspecies='Fe 1'):
@@ -256,12 +260,7 @@ class AdbVald(object):
         Returns:
            Q(T)*284: interpolated in jnp.array for all 284 Atomic Species
         """
-        list_gQT_eachspecies = self.gQT_284species.tolist()
-        listofDA_gQT_eachspecies = list(
-            map(lambda x: jnp.array(x), list_gQT_eachspecies))
-        listofQT = list(map(lambda x: jnp.interp(
-            T, self.T_gQT, x), listofDA_gQT_eachspecies))
-        QT_284 = jnp.array(listofQT)
+        QT_284 = interp_uniform(T, *self.QT_table_284)
         return QT_284
 
     def make_QTmask(self, ielem, iion):
@@ -275,12 +274,7 @@ class AdbVald(object):
         Returns:
             QTmask_sp:  array of index of Q(Tref) grid (gQT) for each line
         """
-        def species_to_QTmask(ielem, iion):
-            sp_Roman = atomllapi.PeriodicTable[ielem] + '_' + 'I'*iion
-            QTmask = np.where(self.pfdat['T[K]'] == sp_Roman)[0][0]
-            return QTmask
-        QTmask_sp = np.array(
-            list(map(species_to_QTmask, ielem, iion))).astype('int')
+        QTmask_sp = atomllapi.QTmask_lines(ielem, iion, self.pfdat)
         return QTmask_sp
 
 
@@ -308,7 +302,9 @@ class AdbSepVald(object):
         N_usp (int): number of species (atoms and ions)
         L_max (int): maximum number of spectral lines for a single species
         gQT_284species (jnp array): partition function grid of 284 species
+        QTref_284 (nd array): partition function of 284 species at Tref
         T_gQT (jnp array): temperatures in the partition function grid
+        QT_table_284 (tuple): partition function table of 284 species on the uniform temperature grid (T0, dT, table)
     """
 
     def __init__(self, adb):
@@ -339,8 +335,80 @@ class AdbSepVald(object):
         self.N_usp = len(self.uspecies)
         self.L_max = self.nu_lines.shape[1]
 
+        self.Tref = Tref_original
+        self.QTref_284 = adb.QTref_284
         self.gQT_284species = adb.gQT_284species
         self.T_gQT = adb.T_gQT
+        self.QT_table_284 = adb.QT_table_284
+
+
+class AdbRaggedVald(object):
+    """atomic database from VALD3 with the ragged (segment-based) species layout
+
+    AdbRaggedVald keeps the lines of all the species concatenated (sorted by species), instead of padding each species to L_max as AdbSepVald does.
+    The species of each line is given by species_index, and the lines of the i-th species are in [offsets[i], offsets[i+1]).
+
+    Attributes:
+        nu_lines (nd array):      line center (cm-1) (#NOT frequency in (s-1))
+        dev_nu_lines (jnp array): line center (cm-1) in device
+        logsij0 (jnp array): log line strength at T=Tref
+        elower (jnp array): the lower state energy (cm-1)
+        eupper (jnp array): the upper state energy (cm-1)
+        QTmask (jnp array): identifier of species for Q(T)
+        ielem (jnp array):  atomic number (e.g., Fe=26)
+        iion (jnp array):  ionized level (e.g., neutral=1, singly ionized=2, etc.)
+        atomicmass (jnp array): atomic mass (amu)
+        ionE (jnp array): ionization potential (eV)
+        gamRad (jnp array): log of gamma of radiation damping (s-1) #(https://www.astro.uu.se/valdwiki/Vald3Format)
+        gamSta (jnp array): log of gamma of Stark damping (s-1)
+        vdWdamp (jnp array):  log of (van der Waals damping constant / neutral hydrogen number) (s-1)
+        species_index (jnp array): index of uspecies for each line [N_line]
+        offsets (nd array): segment offsets of the species [N_species + 1]
+        uspecies (jnp array): unique combinations of ielem and iion [N_species x 2(ielem and iion)], the same order as AdbSepVald
+        N_usp (int): number of species (atoms and ions)
+        atomicmass_uspecies (nd array): atomic mass (amu) of each species [N_species]
+        QTref_284 (nd array): partition function of 284 species at Tref
+        gQT_284species (jnp array): partition function grid of 284 species
+        T_gQT (jnp array): temperatures in the partition function grid
+        QT_table_284 (tuple): partition function table of 284 species on the uniform temperature grid (T0, dT, table)
+    """
+
+    def __init__(self, adb):
+        """Ragged atomic database for VALD3.
+
+        Args:
+            adb: adb instance made by the AdbVald (or AdbKurucz) class, which stores the lines of all species together
+        """
+        self.uspecies = atomll.get_unique_species(adb)
+        self.N_usp = len(self.uspecies)
+        ielem = np.asarray(adb.ielem)
+        iion = np.asarray(adb.iion)
+        species_index = atomll.species_index_lines(ielem, iion, self.uspecies)
+        order = np.argsort(species_index, kind='stable')
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(species_index, minlength=self.N_usp))])
+        self.species_index = jnp.array(species_index[order], dtype=int)
+
+        self.nu_lines = np.asarray(adb.nu_lines)[order]
+        self.dev_nu_lines = jnp.array(self.nu_lines)
+        self.QTmask = jnp.array(np.asarray(adb.QTmask)[order], dtype=int)
+        self.ielem = jnp.array(ielem[order], dtype=int)
+        self.iion = jnp.array(iion[order], dtype=int)
+        self.atomicmass = jnp.array(np.asarray(adb.atomicmass)[order])
+        self.ionE = jnp.array(np.asarray(adb.ionE)[order])
+        self.logsij0 = jnp.array(np.asarray(adb.logsij0)[order])
+        self.elower = jnp.array(np.asarray(adb.elower)[order])
+        self.eupper = jnp.array(np.asarray(adb.eupper)[order])
+        self.gamRad = jnp.array(np.asarray(adb.gamRad)[order])
+        self.gamSta = jnp.array(np.asarray(adb.gamSta)[order])
+        self.vdWdamp = jnp.array(np.asarray(adb.vdWdamp)[order])
+        self.atomicmass_uspecies = np.asarray(self.atomicmass)[self.offsets[:-1]]
+
+        self.Tref = Tref_original
+        self.QTref_284 = adb.QTref_284
+        self.gQT_284species = adb.gQT_284species
+        self.T_gQT = adb.T_gQT
+        self.QT_table_284 = adb.QT_table_284
 
 
 class AdbKurucz(object):
@@ -382,6 +450,7 @@ class AdbKurucz(object):
 
         Note:
           (written with reference to moldb.py, but without using feather format)
+          The line list is cached in the hdf5 format (path with the suffix .hdf5), which is regenerated when the line list is newer than the cache.
         """
 
         self.dbtype = "kurucz"
@@ -398,14 +467,23 @@ class AdbKurucz(object):
 
         # load kurucz file
         print('Reading Kurucz file')
-        self._A, self.nu_lines, self._elower, self._eupper, self._gupper, self._jlower, self._jupper, self._ielem, self._iion, self._gamRad, self._gamSta, self._vdWdamp = atomllapi.read_kurucz(
-            self.kurucz_file)
+        kurucz_hdf5 = self.kurucz_file.with_suffix('.hdf5')
+        if _is_cache_updated(kurucz_hdf5, self.kurucz_file):
+            kurucz_arrays = atomllapi.load_kurucz_hdf5(kurucz_hdf5)
+        else:
+            print(
+                "Note: Couldn't find the (updated) hdf5 format. We convert data to the hdf5 format.")
+            kurucz_arrays = atomllapi.read_kurucz(self.kurucz_file)
+            atomllapi.save_kurucz_hdf5(kurucz_hdf5, kurucz_arrays)
+        self._A, self.nu_lines, self._elower, self._eupper, self._gupper, self._jlower, self._jupper, self._ielem, self._iion, self._gamRad, self._gamSta, self._vdWdamp = kurucz_arrays
 
         # load the partition functions (for 284 atomic species)
         pfTdat, self.pfdat = atomllapi.load_pf_Barklem2016()  # Barklem & Collet (2016)
         self.T_gQT = jnp.array(pfTdat.columns[1:], dtype=float)
         self.gQT_284species = jnp.array(self.pfdat.iloc[:, 1:].to_numpy(
             dtype=float))  # grid Q vs T vs Species
+        T0, dT, QT_table = atomllapi.make_QT_table_284(self.T_gQT, self.gQT_284species)
+        self.QT_table_284 = (T0, dT, jnp.array(QT_table))
         self.QTref_284 = np.array(self.QT_interp_284(Tref_original))
         # identify index of QT grid (gQT) for each line
         self._QTmask = self.make_QTmask(self._ielem, self._iion)
@@ -426,12 +504,10 @@ class AdbKurucz(object):
         # Compile atomic-specific data for each absorption line of interest
         ipccd = atomllapi.load_atomicdata()
         self.solarA = jnp.array(
-            list(map(lambda x: ipccd[ipccd['ielem'] == x].iat[0, 4], self.ielem)))
+            atomllapi.atomic_data_lines(self._ielem, 'solarA', ipccd))
         self.atomicmass = jnp.array(
-            list(map(lambda x: ipccd[ipccd['ielem'] == x].iat[0, 5], self.ielem)))
-        df_ionE = atomllapi.load_ionization_energies()
-        self.ionE = jnp.array(
-            list(map(atomllapi.pick_ionE, self.ielem, self.iion, [df_ionE, ] * len(self.ielem))))
+            atomllapi.atomic_data_lines(self._ielem, 'mass', ipccd))
+        self.ionE = jnp.array(atomllapi.ionE_lines(self._ielem, self._iion))
 
     def masking(self, mask):
         """applying mask
@@ -511,8 +587,11 @@ class AdbKurucz(object):
         Returns:
           Q(T): interpolated in jnp.array for the Atomic Species
         """
-        gQT = self.Atomic_gQT(atomspecies)
-        QT = jnp.interp(T, self.T_gQT, gQT)
+        atomspecies_Roman = atomspecies.split(
+            ' ')[0] + '_' + 'I'*int(atomspecies.split(' ')[-1])
+        isp = np.where(self.pfdat['T[K]'] == atomspecies_Roman)[0][0]
+        T0, dT, QT_table = self.QT_table_284
+        QT = interp_uniform(T, T0, dT, QT_table[isp])
         return QT
 
     def QT_interp_Irwin_Fe(self, T, atomspecies='Fe 1'):
@@ -567,12 +646,7 @@ class AdbKurucz(object):
         Returns:
            Q(T)*284: interpolated in jnp.array for all 284 Atomic Species
         """
-        list_gQT_eachspecies = self.gQT_284species.tolist()
-        listofDA_gQT_eachspecies = list(
-            map(lambda x: jnp.array(x), list_gQT_eachspecies))
-        listofQT = list(map(lambda x: jnp.interp(
-            T, self.T_gQT, x), listofDA_gQT_eachspecies))
-        QT_284 = jnp.array(listofQT)
+        QT_284 = interp_uniform(T, *self.QT_table_284)
         return QT_284
 
     def make_QTmask(self, ielem, iion):
@@ -586,10 +660,22 @@ class AdbKurucz(object):
         Returns:
             QTmask_sp:  array of index of Q(Tref) grid (gQT) for each line
         """
-        def species_to_QTmask(ielem, iion):
-            sp_Roman = atomllapi.PeriodicTable[ielem] + '_' + 'I'*iion
-            QTmask = np.where(self.pfdat['T[K]'] == sp_Roman)[0][0]
-            return QTmask
-        QTmask_sp = np.array(
-            list(map(species_to_QTmask, ielem, iion))).astype('int')
+        QTmask_sp = atomllapi.QTmask_lines(ielem, iion, self.pfdat)
         return QTmask_sp
+
+
+def _is_cache_updated(cache_file, source_file):
+    """checks if the cache file exists and is not older than the source file
+
+    Args:
+        cache_file: path to the cache file (e.g. hdf5)
+        source_file: path to the source file (e.g. Kurucz line list). If it does not exist, the cache is used.
+
+    Returns:
+        bool: True if the cache can be used
+    """
+    if not cache_file.exists():
+        return False
+    if not source_file.exists():
+        return True
+    return cache_file.stat().st_mtime >= source_file.stat().st_mtime
@@ -0,0 +1,69 @@
+"""wavenumber (or layer) blocking of the spectral computation
+
+    The computation along the wavenumber axis is independent for each wavenumber bin in radiative transfer.
+    nu_blocked_map splits the wavenumber axis into blocks and maps a function over the blocks using jax.lax.map,
+    so that the working memory of the (N_layer, N_nus) temporaries is bounded by (N_layer, nu_block_size).
+    blocked_map does the same along an arbitrary axis, e.g. the layer axis for the opacity computation.
+
+"""
+
+import jax.numpy as jnp
+from jax.lax import map as lax_map
+from jax.tree_util import tree_map
+
+
+def nu_blocked_map(func, nu_arrays, nu_block_size):
+    """maps func over the wavenumber blocks
+
+    Args:
+        func (callable): function of the blocked arrays, func(*nu_arrays_block), which returns an array (or pytree of arrays) with the wavenumber axis as the last axis
+        nu_arrays (list): arrays whose last axis is the wavenumber axis (N_nus), e.g. dtau (N_layer, N_nus) or nu_grid (N_nus)
+        nu_block_size (int): the number of the wavenumber bins per block
+
+    Returns:
+        the output of func concatenated along the wavenumber axis (N_nus)
+
+    Notes:
+        The last block is padded with the edge values of the arrays, and the padded part is cropped from the output.
+        Because the blocks are independent, the output and gradient are identical to func(*nu_arrays).
+    """
+    return blocked_map(func, nu_arrays, nu_block_size, axis=-1)
+
+
+def blocked_map(func, arrays, block_size, axis=-1):
+    """maps func over the blocks along the given axis
+
+    Args:
+        func (callable): function of the blocked arrays, func(*arrays_block), which returns an array (or pytree of arrays) with the blocked axis at the same position
+        arrays (list): arrays to be blocked along axis
+        block_size (int): the number of the elements per block
+        axis (int, optional): the axis to be blocked, common to the arrays and the output. Defaults to -1.
+
+    Returns:
+        the output of func concatenated along axis
+
+    Notes:
+        The last block is padded with the edge values of the arrays, and the padded part is cropped from the output.
+    """
+    n = jnp.shape(arrays[0])[axis]
+    nblock = -(-n // block_size)
+    npad = nblock * block_size - n
+
+    def split(arr):
+        arr = jnp.moveaxis(jnp.asarray(arr), axis, -1)
+        pad_width = [(0, 0)] * (arr.ndim - 1) + [(0, npad)]
+        arr = jnp.pad(arr, pad_width, mode="edge")
+        arr = arr.reshape(arr.shape[:-1] + (nblock, block_size))
+        return jnp.moveaxis(arr, -2, 0)
+
+    def merge(out):
+        out = jnp.moveaxis(jnp.moveaxis(out, axis + 1 if axis >= 0 else axis, -1), 0, -2)
+        out = out.reshape(out.shape[:-2] + (nblock * block_size,))
+        return jnp.moveaxis(out[..., :n], -1, axis)
+
+    def func_block(block):
+        return func(*[jnp.moveaxis(arr, -1, axis) for arr in block])
+
+    blocks = [split(arr) for arr in arrays]
+    output = lax_map(func_block, blocks)
+    return tree_map(merge, output)
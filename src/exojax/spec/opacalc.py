@@ -5,7 +5,7 @@ Notes:
 
 """
 
-__all__ = ["OpaPremodit", "OpaModit", "OpaDirect"]
+__all__ = ["OpaPremodit", "OpaPremoditVald", "OpaModit", "OpaDirect"]
 
 from exojax.spec import initspec
 from exojax.spec.lbderror import optimal_params
@@ -24,6 +24,36 @@ import numpy as np
 import warnings
 
 
+def _device_fields_mdb(dbtype):
+    """names of the line arrays of mdb (ExoMol/HITRAN/HITEMP) consumed in JAX by OpaModit and OpaDirect
+
+    Args:
+        dbtype (str): "exomol" or "hitran"
+
+    Returns:
+        list: field names
+    """
+    if dbtype == "exomol":
+        broadening_fields = ["n_Texp", "alpha_ref"]
+    else:
+        broadening_fields = ["n_air", "gamma_air", "gamma_self"]
+    return ["nu_lines", "logsij0", "elower", "A"] + broadening_fields
+
+
+def _nu_lines_jax(mdb):
+    """line centers of mdb (ExoMol/HITRAN/HITEMP) consumed in JAX
+
+    Args:
+        mdb: mdb instance
+
+    Returns:
+        array: dev_nu_lines if nu_lines has been transfered to the device, otherwise nu_lines
+    """
+    if mdb.on_device(["nu_lines"]):
+        return mdb.dev_nu_lines
+    return mdb.nu_lines
+
+
 class OpaCalc:
     """Common Opacity Calculator Class"""
 
@@ -97,6 +127,7 @@ class OpaPremodit(OpaCalc):
         self.resolution = resolution_eslog(nu_grid)
         self.mdb = mdb
         self.ngrid_broadpar = None
+        self.multi_isotope = False
         self.version_auto_trange = version_auto_trange
         # check if the mdb lines are in nu_grid
         if is_outside_range(self.mdb.nu_lines, self.nu_grid[0], self.nu_grid[-1]):
@@ -224,6 +255,30 @@ class OpaPremodit(OpaCalc):
             reference_factor = (Tref_original / self.Tref_broadening) ** (self.n_Texp)
             self.gamma_ref = mdb.alpha_ref * reference_factor
 
+    def set_isotope_index(self, mdb):
+        """sets the multi isotope mode when mdb includes all isotopes (isotope=0 or None in HITRAN/HITEMP)
+
+        Notes:
+            In the multi isotope mode, the LBD is sliced by isotope and the partition function ratio of each isotope is applied.
+
+        Args:
+            mdb (_type_): mdb instance
+
+        Returns:
+            isotope index (index for mdb.uniqiso) of lines, None for the single isotope mode
+        """
+        from exojax.spec.api import _isotope_index_lines
+
+        self.multi_isotope = (
+            mdb.dbtype == "hitran"
+            and (mdb.isotope is None or mdb.isotope == 0)
+            and len(mdb.uniqiso) > 1
+        )
+        if self.multi_isotope:
+            print("OpaPremodit: multi isotope mode, isotopes=", mdb.uniqiso)
+            return _isotope_index_lines(mdb.isoid, mdb.uniqiso)
+        return None
+
     def apply_params(self):
         self.mdb.change_reference_temperature(self.Tref)
         self.dbtype = self.mdb.dbtype
@@ -236,6 +291,7 @@ class OpaPremodit(OpaCalc):
             self.set_Tref_broadening_to_midpoint()
 
         self.compute_gamma_ref_and_n_Texp(self.mdb)
+        isotope_index = self.set_isotope_index(self.mdb)
 
         self.opainfo = initspec.init_premodit(
             self.mdb.nu_lines,
@@ -255,6 +311,7 @@ class OpaPremodit(OpaCalc):
             single_broadening=self.single_broadening,
             single_broadening_parameters=self.single_broadening_parameters,
             warning=self.warning,
+            isotope_index=isotope_index,
         )
         self.ready = True
 
@@ -287,7 +344,9 @@ class OpaPremodit(OpaCalc):
         ) = self.opainfo
         nsigmaD = normalized_doppler_sigma(T, self.mdb.molmass, R)
 
-        if self.mdb.dbtype == "hitran":
+        if self.multi_isotope:
+            qt = self.mdb.qr_interp_isotopes(T)
+        elif self.mdb.dbtype == "hitran":
             qt = self.mdb.qr_interp(self.mdb.isotope, T)
         elif self.mdb.dbtype == "exomol":
             qt = self.mdb.qr_interp(T)
@@ -374,7 +433,9 @@ class OpaPremodit(OpaCalc):
             pmarray,
         ) = self.opainfo
 
-        if self.mdb.dbtype == "hitran":
+        if self.multi_isotope:
+            qtarr = self.mdb.qr_interp_isotopes(Tarr)
+        elif self.mdb.dbtype == "hitran":
             qtarr = vmap(self.mdb.qr_interp, (None, 0))(self.mdb.isotope, Tarr)
         elif self.mdb.dbtype == "exomol":
             qtarr = vmap(self.mdb.qr_interp)(Tarr)
@@ -462,6 +523,237 @@ class OpaPremodit(OpaCalc):
         )
 
 
+class OpaPremoditVald(OpaCalc):
+    """Opacity Calculator Class for PreMODIT of atomic lines (VALD/Kurucz)
+
+    Attributes:
+        opainfo: information set used in PreMODIT for atomic lines
+        uspecies: unique combinations of ielem and iion [N_species x 2]
+        atomicmass_uspecies: atomic mass of the species [N_species]
+
+    """
+
+    def __init__(
+        self,
+        adb,
+        nu_grid,
+        diffmode=0,
+        dit_grid_resolution=0.2,
+        auto_trange=None,
+        manual_params=None,
+        allow_32bit=False,
+        wavelength_order="descending",
+        version_auto_trange=2,
+    ):
+        """initialization of OpaPremoditVald
+
+        Note:
+            The damping of gamma_vald3 is decomposed into the pressure part, ngamma_pressure_ref (T/Tref_broadening)**(-n_Texp) Peff,
+            and the natural part. Both are gridded, and the LBD is grouped by (species, n_Texp), see initspec.init_premodit_vald.
+            Peff is given by premodit.vald_effective_pressure(PH, PHe, PHH).
+
+        Args:
+            adb (adb class): AdbVald, AdbKurucz (or AdbRaggedVald)
+            nu_grid (): wavenumber grid (cm-1)
+            diffmode (int, optional): i-th Taylor expansion is used for the weight. Defaults to 0.
+            dit_grid_resolution (float, optional): DIT grid resolution of the broadening parameters. Defaults to 0.2.
+            auto_trange (optional): temperature range [Tl, Tu], in which line strength is within 1 % prescision. Defaults to None.
+            manual_params (optional): premodit parameter set [dE, Tref, Twt]. Defaults to None.
+            allow_32bit (bool, optional): If True, allow 32bit mode of JAX. Defaults to False.
+            wavlength order: wavelength order: "ascending" or "descending"
+            version_auto_trange: version of the default elower grid trange (degt) file
+        """
+        from exojax.spec.atomll import get_unique_species
+        from exojax.spec.atomll import species_index_lines
+        from exojax.spec.atomll import uspecies_info
+        from exojax.spec import atomllapi
+        from exojax.spec.moldb import AdbRaggedVald
+
+        super().__init__()
+        check_jax64bit(allow_32bit)
+
+        self.method = "premodit"
+        self.diffmode = diffmode
+        self.warning = True
+        self.nu_grid = nu_grid
+        self.wavelength_order = wavelength_order
+        self.wav = nu2wav(
+            self.nu_grid, wavelength_order=self.wavelength_order, unit="AA"
+        )
+        self.resolution = resolution_eslog(nu_grid)
+        self.adb = adb
+        self.dit_grid_resolution = dit_grid_resolution
+        self.version_auto_trange = version_auto_trange
+        if is_outside_range(self.adb.nu_lines, self.nu_grid[0], self.nu_grid[-1]):
+            raise ValueError("None of the lines in adb are within nu_grid.")
+
+        self.uspecies = np.asarray(get_unique_species(adb))
+        self.species_index = species_index_lines(adb.ielem, adb.iion, self.uspecies)
+        if isinstance(adb, AdbRaggedVald):
+            self.atomicmass_uspecies = adb.atomicmass_uspecies
+        else:
+            _, atomicmass_uspecies, _ = uspecies_info(
+                self.uspecies, atomllapi.ielem_to_index_of_ipccd
+            )
+            self.atomicmass_uspecies = np.asarray(atomicmass_uspecies)
+        QTmask = np.asarray(adb.QTmask)
+        self.QTmask_uspecies = np.array(
+            [QTmask[np.argmax(self.species_index == i)] for i in range(len(self.uspecies))]
+        )
+
+        if auto_trange is not None:
+            self.auto_setting(auto_trange[0], auto_trange[1])
+        elif manual_params is not None:
+            self.manual_setting(manual_params[0], manual_params[1], manual_params[2])
+        else:
+            print("OpaPremoditVald: initialization without parameters setting")
+            print("Call self.apply_params() to complete the setting.")
+
+    def auto_setting(self, Tl, Tu):
+        print("OpaPremoditVald: params automatically set.")
+        self.dE, self.Tref, self.Twt = optimal_params(
+            Tl, Tu, self.diffmode, self.version_auto_trange
+        )
+        self.Tmax = Tu
+        self.Tmin = Tl
+        self.apply_params()
+
+    def manual_setting(self, dE, Tref, Twt, Tmax=None, Tmin=None):
+        """setting PreMODIT parameters by manual
+
+        Args:
+            dE (float): E lower grid interval (cm-1)
+            Tref (float): reference temperature (K)
+            Twt (float): Temperature for weight (K)
+            Tmax (float/None): max temperature (K) for Tref_broadening
+            Tmin (float/None): min temperature (K) for Tref_broadening
+        """
+        print("OpaPremoditVald: params manually set.")
+        self.Twt = Twt
+        self.Tref = Tref
+        self.dE = dE
+        if Tmax is None:
+            Tmax = np.max([Twt, Tref])
+        if Tmin is None:
+            Tmin = np.min([Twt, Tref])
+        self.Tmax = Tmax
+        self.Tmin = Tmin
+        self.apply_params()
+
+    def apply_params(self):
+        from exojax.spec.premodit import reference_temperature_broadening_at_midpoint
+
+        self.Tref_broadening = reference_temperature_broadening_at_midpoint(
+            self.Tmin, self.Tmax
+        )
+        self.opainfo = initspec.init_premodit_vald(
+            self.adb,
+            self.nu_grid,
+            self.species_index,
+            self.Twt,
+            self.Tref,
+            self.Tref_broadening,
+            dE=self.dE,
+            dit_grid_resolution=self.dit_grid_resolution,
+            diffmode=self.diffmode,
+            warning=self.warning,
+        )
+        self.ready = True
+        self.ncolumn = len(self.opainfo[2])
+        self.ngrid_elower = len(self.opainfo[4])
+
+    def qr_uspecies(self, Tarr):
+        """partition function ratio Q(T)/Q(Tref) of the species
+
+        Args:
+            Tarr: temperature array in K [N_layer]
+
+        Returns:
+            jnp.array: partition function ratio [N_layer, N_species]
+        """
+        from exojax.utils.interp import interp_uniform
+
+        qt = interp_uniform(jnp.asarray(Tarr), *self.adb.QT_table_284)[self.QTmask_uspecies]
+        qt_Tref = interp_uniform(self.Tref, *self.adb.QT_table_284)[self.QTmask_uspecies]
+        return (qt / qt_Tref[:, None]).T
+
+    def xsvector(self, T, PH, PHe, PHH, VMR_uspecies):
+        """VMR-weighted cross section vector
+
+        Args:
+            T: temperature in K
+            PH: partial pressure of neutral hydrogen (H) in bar
+            PHe: partial pressure of neutral helium (He) in bar
+            PHH: partial pressure of molecular hydrogen (H2) in bar
+            VMR_uspecies: volume mixing ratio of the species [N_species]
+
+        Returns:
+            jnp.array : VMR-weighted cross section vector (N_wavenumber)
+        """
+        return self.xsmatrix(
+            jnp.array([T]),
+            jnp.array([PH]),
+            jnp.array([PHe]),
+            jnp.array([PHH]),
+            jnp.asarray(VMR_uspecies)[:, None],
+        )[0]
+
+    def xsmatrix(self, Tarr, PHarr, PHearr, PHHarr, VMR_uspecies):
+        """VMR-weighted cross section matrix, sum_species VMR_species * xs_species
+
+        Notes:
+            layeropacity.layer_optical_depth_VALD_ragged converts the output to dtau.
+
+        Args:
+            Tarr (): tempearture array in K
+            PHarr (): partial pressure array of neutral hydrogen (H) in bar
+            PHearr (): partial pressure array of neutral helium (He) in bar
+            PHHarr (): partial pressure array of molecular hydrogen (H2) in bar
+            VMR_uspecies: volume mixing ratio of the species [N_species x N_layer]
+
+        Returns:
+            jnp.array : VMR-weighted cross section matrix (Nlayer, N_wavenumber)
+        """
+        from exojax.spec.premodit import xsmatrix_vald
+        from exojax.spec.premodit import vald_effective_pressure
+
+        (
+            lbd_coeff,
+            multi_index_column,
+            species_column,
+            n_Texp_column,
+            elower_grid,
+            ngamma_pressure_grid,
+            ngamma_natural_grid,
+            R,
+            pmarray,
+        ) = self.opainfo
+
+        Peffarr = vald_effective_pressure(PHarr, PHearr, PHHarr)
+        weightM = (jnp.asarray(VMR_uspecies).T / self.qr_uspecies(Tarr))[
+            :, species_column
+        ]
+        mass_column = jnp.asarray(self.atomicmass_uspecies)[species_column]
+        return xsmatrix_vald(
+            Tarr,
+            Peffarr,
+            weightM,
+            self.Tref,
+            self.Twt,
+            R,
+            pmarray,
+            lbd_coeff,
+            self.nu_grid,
+            ngamma_pressure_grid,
+            ngamma_natural_grid,
+            multi_index_column,
+            n_Texp_column,
+            mass_column,
+            elower_grid,
+            self.Tref_broadening,
+        )
+
+
 class OpaModit(OpaCalc):
     """Opacity Calculator Class for MODIT
 
@@ -513,7 +805,9 @@ class OpaModit(OpaCalc):
         self.resolution = resolution_eslog(nu_grid)
         self.mdb = mdb
         self.dit_grid_resolution = dit_grid_resolution
-        if not self.mdb.gpu_transfer:
+        device_fields = _device_fields_mdb(self.mdb.dbtype)
+        self.mdb.require_device(device_fields)
+        if not self.mdb.on_device(device_fields):
             raise ValueError("For MODIT, gpu_transfer should be True in mdb.")
         self.apply_params()
         if Tarr_list is not None and Parr is not None:
@@ -557,12 +851,12 @@ class OpaModit(OpaCalc):
             gammaL = gamma_exomol(
                 P, T, self.mdb.n_Texp, self.mdb.alpha_ref
             ) + gamma_natural(self.mdb.A)
-        dv_lines = self.mdb.nu_lines / R
+        dv_lines = self.mdb.dev_nu_lines / R
         ngammaL = gammaL / dv_lines
 
         nsigmaD = normalized_doppler_sigma(T, self.mdb.molmass, R)
         Sij = line_strength(
-            T, self.mdb.logsij0, self.mdb.nu_lines, self.mdb.elower, qt, self.mdb.Tref
+            T, self.mdb.logsij0, self.mdb.dev_nu_lines, self.mdb.elower, qt, self.mdb.Tref
         )
 
         ngammaL_grid = ditgrid_log_interval(
@@ -685,6 +979,8 @@ class OpaDirect(OpaCalc):
             self.nu_grid, wavelength_order=self.wavelength_order, unit="AA"
         )
         self.mdb = mdb
+        if self.mdb.dbtype in ["exomol", "hitran"]:
+            self.mdb.require_device(_device_fields_mdb(self.mdb.dbtype))
         self.apply_params()
 
     def apply_params(self):
@@ -712,6 +1008,7 @@ class OpaDirect(OpaCalc):
 
         numatrix = self.opainfo
 
+        nu_lines = _nu_lines_jax(self.mdb)
         if self.mdb.dbtype == "hitran":
             qt = self.mdb.qr_interp(self.mdb.isotope, T)
             gammaL = gamma_hitran(
@@ -722,9 +1019,9 @@ class OpaDirect(OpaCalc):
             gammaL = gamma_exomol(
                 P, T, self.mdb.n_Texp, self.mdb.alpha_ref
             ) + gamma_natural(self.mdb.A)
-        sigmaD = doppler_sigma(self.mdb.nu_lines, T, self.mdb.molmass)
+        sigmaD = doppler_sigma(nu_lines, T, self.mdb.molmass)
         Sij = line_strength(
-            T, self.mdb.logsij0, self.mdb.nu_lines, self.mdb.elower, qt, self.mdb.Tref
+            T, self.mdb.logsij0, nu_lines, self.mdb.elower, qt, self.mdb.Tref
         )
         return xsvector_lpf(numatrix, sigmaD, gammaL, Sij)
 
@@ -755,13 +1052,14 @@ class OpaDirect(OpaCalc):
         numatrix = self.opainfo
         vmaplinestrengh = jit(vmap(line_strength, (0, None, None, None, 0, None)))
         if self.mdb.dbtype == "hitran":
+            nu_lines = _nu_lines_jax(self.mdb)
             vmapqt = vmap(self.mdb.qr_interp, (None, 0))
             qt = vmapqt(self.mdb.isotope, Tarr)
             vmaphitran = jit(vmap(gamma_hitran, (0, 0, 0, None, None, None)))
             gammaLM = vmaphitran(
                 Parr,
                 Tarr,
-                np.zeros_like(Parr),
+                jnp.zeros_like(Parr),
                 self.mdb.n_air,
                 self.mdb.gamma_air,
                 self.mdb.gamma_self,
@@ -769,15 +1067,16 @@ class OpaDirect(OpaCalc):
             SijM = vmaplinestrengh(
                 Tarr,
                 self.mdb.logsij0,
-                self.mdb.nu_lines,
+                nu_lines,
                 self.mdb.elower,
                 qt,
                 self.mdb.Tref,
             )
             sigmaDM = jit(vmap(doppler_sigma, (None, 0, None)))(
-                self.mdb.nu_lines, Tarr, self.mdb.molmass
+                nu_lines, Tarr, self.mdb.molmass
             )
         elif self.mdb.dbtype == "exomol":
+            nu_lines = _nu_lines_jax(self.mdb)
             vmapqt = vmap(self.mdb.qr_interp)
             qt = vmapqt(Tarr)
             vmapexomol = jit(vmap(gamma_exomol, (0, 0, None, None)))
@@ -787,13 +1086,13 @@ class OpaDirect(OpaCalc):
             SijM = vmaplinestrengh(
                 Tarr,
                 self.mdb.logsij0,
-                self.mdb.nu_lines,
+                nu_lines,
                 self.mdb.elower,
                 qt,
                 self.mdb.Tref,
             )
             sigmaDM = jit(vmap(doppler_sigma, (None, 0, None)))(
-                self.mdb.nu_lines, Tarr, self.mdb.molmass
+                nu_lines, Tarr, self.mdb.molmass
             )
         elif (self.mdb.dbtype == "kurucz") or (self.mdb.dbtype == "vald"):
             qt_284 = vmap(self.mdb.QT_interp_284)(Tarr)
@@ -1,3 +1,5 @@
+from functools import partial
+import numpy as np
 import jax.numpy as jnp
 from jax import jit
 
@@ -73,3 +75,35 @@ def chord_optical_depth(chord_geometric_matrix, dtau):
 
     """
     return jnp.dot(chord_geometric_matrix, dtau)
+
+
+@partial(jit, static_argnames=("nblock",))
+def chord_optical_depth_triangular(chord_geometric_matrices, dtau, nblock=8):
+    """chord optical depth matrices from lower triangle chord geometric matrices, computed in one pass over dtau
+
+    Args:
+        chord_geometric_matrices (list): list of chord geometric matrices (Nlayer, Nlayer), lower triangle matrices, e.g. [cgm_lower, cgm_midpoint]
+        dtau (jnp array): layer optical depth matrix, dtau (Nlayer, N_wavenumber)
+        nblock (int, optional): the number of the row blocks. Defaults to 8.
+
+    Returns:
+        list: chord optical depth (tauchord) matrices (Nlayer, N_wavenumber), in the order of chord_geometric_matrices
+
+    Notes:
+        The rows of the chord geometric matrices are split into nblock blocks. The row block [s:e] depends only on dtau[:e] because of the triangularity,
+        so the product of the stacked matrices and dtau[:e] is computed per block. The number of operations is reduced to (nblock + 1)/(2 nblock) of jnp.dot,
+        and dtau is read once for all the matrices.
+    """
+    nlayer = jnp.shape(dtau)[0]
+    nmatrix = len(chord_geometric_matrices)
+    edges = np.linspace(0, nlayer, min(nblock, nlayer) + 1).astype(int)
+    tauchord_blocks = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        stacked = jnp.concatenate(
+            [cgm[start:end, :end] for cgm in chord_geometric_matrices], axis=0
+        )
+        tauchord_blocks.append(
+            jnp.dot(stacked, dtau[:end]).reshape(nmatrix, end - start, -1)
+        )
+    tauchord = jnp.concatenate(tauchord_blocks, axis=1)
+    return [tauchord[i] for i in range(nmatrix)]
@@ -0,0 +1,109 @@
+"""opacity -> dtau -> radiative transfer pipeline
+
+    OpaArtPipeline computes the optical depth of multiple species and continua, accumulating each contribution into
+    a single dtau matrix, and then runs the radiative transfer of art. The cross section matrices of the species are
+    never held at once; optionally the opacity is computed in layer blocks and the RT in wavenumber blocks.
+
+"""
+
+import jax.numpy as jnp
+from exojax.spec.layeropacity import layer_optical_depth
+from exojax.spec.nublock import blocked_map
+
+
+class OpaArtPipeline:
+    """opacity -> dtau -> RT pipeline
+
+    Attributes:
+        art: art instance (ArtEmisPure, ArtTransPure)
+        opa_list: list of opa instances (OpaPremodit, OpaModit, OpaDirect)
+        continuum_list: list of functions of temperature which return the continuum dtau (N_layer, N_nus)
+        layer_block_size: the number of the layers per block for the opacity computation
+        nu_block_size: the number of the wavenumber bins per block for the RT
+
+    """
+
+    def __init__(
+        self,
+        art,
+        opa_list,
+        continuum_list=None,
+        layer_block_size=None,
+        nu_block_size=None,
+    ):
+        """initialization of OpaArtPipeline
+
+        Args:
+            art: art instance (ArtEmisPure, ArtTransPure). For the other arts, use dtau and art.run.
+            opa_list (list): list of opa instances, their nu_grid should be the same
+            continuum_list (list, optional): list of functions of temperature which return the continuum dtau (N_layer, N_nus), e.g. lambda T: art.opacity_profile_cia(...). Defaults to None (no continuum).
+            layer_block_size (int, optional): if given, the cross sections are computed in the layer blocks of this size. Defaults to None (all the layers at once).
+            nu_block_size (int, optional): if given, the RT is computed in the wavenumber blocks of this size. Defaults to None.
+
+        Raises:
+            ValueError: layer_block_size is given for OpaModit, whose DIT grid matrix is fixed for all the layers
+        """
+        self.art = art
+        self.opa_list = opa_list
+        self.continuum_list = continuum_list if continuum_list is not None else []
+        self.layer_block_size = layer_block_size
+        self.nu_block_size = nu_block_size
+        if layer_block_size is not None:
+            for opa in opa_list:
+                if opa.method == "modit":
+                    raise ValueError(
+                        "layer_block_size is not available for OpaModit (the DIT grid matrix is set for all the layers)."
+                    )
+
+    def dtau(self, temperature, mmr_list, gravity):
+        """optical depth matrix summed over the species and continua
+
+        Args:
+            temperature (1D array): temperature profile (N_layer)
+            mmr_list (list): list of the mass mixing ratio profiles (N_layer) of the species in opa_list
+            gravity (float/2D array): constant gravity or gravity profile (N_layer, 1) in cgs
+
+        Returns:
+            2D array: dtau (N_layer, N_nus)
+        """
+        pressure = self.art.pressure
+        dParr = self.art.dParr
+        mmr_array = jnp.array(mmr_list)
+        gravity_layer = jnp.ones_like(pressure) * jnp.ravel(jnp.asarray(gravity))
+
+        def dtau_lines(temperature, pressure, dParr, mmr_layer, gravity_layer):
+            dtau = 0.0
+            for opa, mmr in zip(self.opa_list, mmr_layer.T):
+                xs = opa.xsmatrix(temperature, pressure)
+                dtau = dtau + layer_optical_depth(
+                    dParr, jnp.abs(xs), mmr, opa.mdb.molmass, gravity_layer[:, None]
+                )
+            return dtau
+
+        layer_arrays = [temperature, pressure, dParr, mmr_array.T, gravity_layer]
+        if self.layer_block_size is None:
+            dtau = dtau_lines(*layer_arrays)
+        else:
+            dtau = blocked_map(dtau_lines, layer_arrays, self.layer_block_size, axis=0)
+
+        for continuum in self.continuum_list:
+            dtau = dtau + continuum(temperature)
+        return dtau
+
+    def run(self, temperature, mmr_list, gravity, *args, **kwargs):
+        """runs the opacity computation and RT
+
+        Args:
+            temperature (1D array): temperature profile (N_layer)
+            mmr_list (list): list of the mass mixing ratio profiles (N_layer) of the species in opa_list
+            gravity (float/2D array): constant gravity or gravity profile (N_layer, 1) in cgs
+            *args: the arguments of art.run following dtau and temperature
+            **kwargs: the keyword arguments of art.run
+
+        Returns:
+            the output of art.run, i.e. spectrum
+        """
+        dtau = self.dtau(temperature, mmr_list, gravity)
+        return self.art.run(
+            dtau, temperature, *args, nu_block_size=self.nu_block_size, **kwargs
+        )
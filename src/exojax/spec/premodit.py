@@ -387,7 +387,9 @@ def generate_lbd(line_strength_ref,
                  elower_grid,
                  Twt,
                  Tref=Tref_original,
-                 diffmode=0):
+                 diffmode=0,
+                 isotope_index=None,
+                 Nisotope=None):
     """generate log-biased line shape density (LBD)
 
     Args:
@@ -403,10 +405,17 @@ def generate_lbd(line_strength_ref,
         Twt: temperature used for the weight coefficient computation 
         Tref: reference temperature in Kelvin, default is 296.0 K
         diffmode (int): i-th Taylor expansion is used for the weight, default is 1.
+        isotope_index (nd int array, optional): isotope index (0,1,...,Nisotope-1) of lines for the multi isotope mode. Defaults to None (single isotope).
+        Nisotope (int, optional): the number of isotopes. Defaults to None, i.e. max(isotope_index) + 1.
         
     Notes:
         When len(ngamma_ref_grid) = 1 and len(n_Texp_grid) = 1, the single broadening parameter mode is applied.
 
+    Notes:
+        In the multi isotope mode, the LBD of each isotope is stacked along the broadening parameter axis, 
+        i.e. the shape of the LBD coefficient is (Nnu, Nisotope*Ng_broadpar, Nelower), with the common multi_index_uniqgrid. 
+        The partition function ratio of each isotope is applied when unbiasing (see sum_isotopes_lsd).
+
     Returns:
         [jnp array]: the list of the n-th coeffs of line shape density (LBD)
         jnp.array: multi_index_uniqgrid (number of unique broadpar, 2)
@@ -442,26 +451,36 @@ def generate_lbd(line_strength_ref,
     coeff_elower, index_elower = lbd_coefficients(elower, elower_grid, Tref,
                                                   Twt, diffmode)
 
+    if isotope_index is None:
+        isotope_index = np.zeros(len(nu_lines), dtype=int)
+    if Nisotope is None:
+        Nisotope = np.max(isotope_index) + 1
+
     lbd_coeff = []
     for idiff in range(diffmode + 1):
-        lbd_diff = np.zeros((Ng_nu_plus_one, Ng_broadpar, Ng_elower_plus_one),
-                            dtype=np.float64)
-
-        if single_broadening:
-            lbd_diff = npadd3D_direct1D(lbd_diff, line_strength_ref, cont_nu,
-                                        index_nu, 1.0, 0, coeff_elower[idiff],
-                                        index_elower)
-        else:
-            lbd_diff = npadd3D_multi_index(lbd_diff,
-                                           line_strength_ref,
-                                           cont_nu,
-                                           index_nu,
-                                           coeff_elower[idiff],
-                                           index_elower,
-                                           uidx_bp,
-                                           multi_cont_lines,
-                                           neighbor_uidx,
-                                           sumz=1.0)
+        lbd_diff_isotopes = []
+        for iiso in range(Nisotope):
+            mask = isotope_index == iiso
+            lbd_diff = np.zeros(
+                (Ng_nu_plus_one, Ng_broadpar, Ng_elower_plus_one), dtype=np.float64)
+            if single_broadening:
+                lbd_diff = npadd3D_direct1D(lbd_diff, line_strength_ref[mask],
+                                            cont_nu[mask], index_nu[mask], 1.0,
+                                            0, coeff_elower[idiff][mask],
+                                            index_elower[mask])
+            else:
+                lbd_diff = npadd3D_multi_index(lbd_diff,
+                                               line_strength_ref[mask],
+                                               cont_nu[mask],
+                                               index_nu[mask],
+                                               coeff_elower[idiff][mask],
+                                               index_elower[mask],
+                                               uidx_bp[mask],
+                                               multi_cont_lines[mask],
+                                               neighbor_uidx,
+                                               sumz=1.0)
+            lbd_diff_isotopes.append(lbd_diff)
+        lbd_diff = np.concatenate(lbd_diff_isotopes, axis=1)
         if idiff == 0:
             lbd_diff = convert_to_jnplog(lbd_diff)
         else:
@@ -554,7 +573,7 @@ def unbiased_lsd_zeroth(lbd_zeroth, T, Tref, nu_grid, elower_grid, qt):
         Tref: reference temperature in Kelvin
         nu_grid: wavenumber grid in cm-1
         elower_grid: Elower grid in cm-1
-        qt: partition function ratio Q(T)/Q(Tref)
+        qt: partition function ratio Q(T)/Q(Tref), scalar or [Nisotope] for the multi isotope mode
 
     Returns:
         LSD (0th), shape = (number_of_wavenumber_bin, number_of_broadening_parameters)
@@ -562,7 +581,7 @@ def unbiased_lsd_zeroth(lbd_zeroth, T, Tref, nu_grid, elower_grid, qt):
     """
     Slsd = jnp.sum(jnp.exp(logf_bias(elower_grid, T, Tref) + lbd_zeroth),
                    axis=-1)
-    return (Slsd.T * g_bias(nu_grid, T, Tref) / qt).T
+    return sum_isotopes_lsd(Slsd * g_bias(nu_grid, T, Tref)[:, None], qt)
 
 
 def unbiased_lsd_first(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
@@ -575,7 +594,7 @@ def unbiased_lsd_first(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
         Twt: Temperature at the weight point
         nu_grid: wavenumber grid in cm-1
         elower_grid: Elower grid in cm-1
-        qt: partition function ratio Q(T)/Q(Tref)
+        qt: partition function ratio Q(T)/Q(Tref), scalar or [Nisotope] for the multi isotope mode
 
     Returns:
         LSD, shape = (number_of_wavenumber_bin, number_of_broadening_parameters)
@@ -590,7 +609,7 @@ def unbiased_lsd_first(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
     #unbiased_coeff = jnp.exp(lfb + lbd_coeff[1] + logdt)
     Slsd = jnp.sum(jnp.exp(lfb + lbd_coeff[0]) + unbiased_coeff,
                    axis=-1)  # 0th term + sum_l[ f*w1(t-twt) ]
-    return (Slsd.T * g_bias(nu_grid, T, Tref) / qt).T
+    return sum_isotopes_lsd(Slsd * g_bias(nu_grid, T, Tref)[:, None], qt)
 
 
 def unbiased_lsd_second(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
@@ -603,7 +622,7 @@ def unbiased_lsd_second(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
         Twt: Temperature at the weight point
         nu_grid: wavenumber grid in cm-1
         elower_grid: Elower grid in cm-1
-        qt: partition function ratio Q(T)/Q(Tref)
+        qt: partition function ratio Q(T)/Q(Tref), scalar or [Nisotope] for the multi isotope mode
 
     Returns:
         LSD, shape = (number_of_wavenumber_bin, number_of_broadening_parameters)
@@ -618,7 +637,23 @@ def unbiased_lsd_second(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid, qt):
     #unbiased_coeff = jnp.exp(lfb + lbd_coeff[1] + logdt)
     # + jnp.exp(lfb + lbd_coeff[1] + 2*logdt * jnp.log(0.5))
     Slsd = jnp.sum(jnp.exp(lfb + lbd_coeff[0]) + unbiased_coeff, axis=-1)
-    return (Slsd.T * g_bias(nu_grid, T, Tref) / qt).T
+    return sum_isotopes_lsd(Slsd * g_bias(nu_grid, T, Tref)[:, None], qt)
+
+
+def sum_isotopes_lsd(Slsd, qt):
+    """divides LSD by the partition function ratio and sums up the isotope slices
+
+    Args:
+        Slsd: LSD, shape = (number_of_wavenumber_bin, Nisotope*number_of_broadening_parameters)
+        qt: partition function ratio Q(T)/Q(Tref), scalar or [Nisotope]
+
+    Returns:
+        LSD, shape = (number_of_wavenumber_bin, number_of_broadening_parameters)
+    """
+    qt = jnp.atleast_1d(qt)
+    Nisotope = qt.shape[0]
+    Slsd = Slsd.reshape((Slsd.shape[0], Nisotope, Slsd.shape[1] // Nisotope))
+    return jnp.sum(Slsd / qt[None, :, None], axis=1)
 
 
 def unbiased_ngamma_grid(T, P, ngamma_ref_grid, n_Texp_grid,
@@ -643,3 +678,269 @@ def unbiased_ngamma_grid(T, P, ngamma_ref_grid, n_Texp_grid,
     ngamma_ref_g = ngamma_ref_grid[multi_index_uniqgrid[:, 0]]
     n_Texp_g = n_Texp_grid[multi_index_uniqgrid[:, 1]]
     return ngamma_ref_g * (T / Tref_broadening)**(-n_Texp_g) * P
+
+
+# PreMODIT for atomic lines (VALD/Kurucz)
+
+
+def vald_effective_pressure(PH, PHe, PHH):
+    """effective perturber pressure of the van der Waals broadening in gamma_vald3
+
+    Args:
+        PH: partial pressure of neutral hydrogen (H) in bar
+        PHe: partial pressure of neutral helium (He) in bar
+        PHH: partial pressure of molecular hydrogen (H2) in bar
+
+    Returns:
+        effective pressure in bar, PH + 0.41336 PHe + 0.85 PHH
+    """
+    return PH + 0.41336 * PHe + 0.85 * PHH
+
+
+def broadpar_vald(adb, Tref_broadening, R, enh_damp=1.0):
+    """decompose the VALD3 damping (gamma_vald3) into the pressure and natural parts for each line
+
+    Notes:
+        gamma_vald3 can be written as ngamma(T, Peff) = ngamma_pressure_ref (T/Tref_broadening)**(-n_Texp) Peff + ngamma_natural,
+        where Peff is vald_effective_pressure, n_Texp = 0.7 (Unsoeld) or 0.62 (vdWdamp in the line list, Barklem+2000),
+        and ngamma_natural is the radiation + Stark damping. The parts are evaluated from gamma_vald3 itself.
+        Zero parts (e.g. gamRad=gamSta=0) are replaced by the minimum positive value of the part, because the DIT grids are logarithmic.
+
+    Args:
+        adb: adb instance made by AdbVald or AdbKurucz (or AdbRaggedVald)
+        Tref_broadening: reference temperature for broadening in Kelvin
+        R: spectral resolution
+        enh_damp: enhancement factor of the Unsoeld damping, see gamma_vald3
+
+    Returns:
+        ngamma_pressure_ref: normalized pressure half-width at Tref_broadening and Peff = 1 bar
+        n_Texp: temperature exponent of the pressure broadening
+        ngamma_natural: normalized half-width of the natural (radiation + Stark) broadening
+    """
+    from exojax.spec.atomll import gamma_vald3
+    line_params = (adb.ielem, adb.iion, adb.nu_lines, adb.elower, adb.eupper,
+                   adb.atomicmass, adb.ionE, adb.gamRad, adb.gamSta,
+                   adb.vdWdamp, enh_damp)
+    gamma_natural = np.asarray(
+        gamma_vald3(Tref_broadening, 0.0, 0.0, 0.0, *line_params))
+    gamma_pressure_ref = np.asarray(
+        gamma_vald3(Tref_broadening, 1.0, 0.0, 0.0,
+                    *line_params)) - gamma_natural
+    gamma_pressure_2ref = np.asarray(
+        gamma_vald3(2.0 * Tref_broadening, 1.0, 0.0, 0.0,
+                    *line_params)) - gamma_natural
+
+    valid = (gamma_pressure_ref > 0.0) * (gamma_pressure_2ref > 0.0)
+    n_Texp = np.zeros_like(gamma_pressure_ref)
+    n_Texp[valid] = np.round(
+        np.log(gamma_pressure_ref[valid] / gamma_pressure_2ref[valid]) /
+        np.log(2.0), 6)
+    if np.any(valid):
+        n_Texp[~valid] = np.median(n_Texp[valid])
+
+    nu_R = np.asarray(adb.nu_lines) / R
+    ngamma_pressure_ref = _floor_to_min_positive(gamma_pressure_ref) / nu_R
+    ngamma_natural = _floor_to_min_positive(gamma_natural) / nu_R
+    return ngamma_pressure_ref, n_Texp, ngamma_natural
+
+
+def _floor_to_min_positive(x):
+    positive = x > 0.0
+    if not np.any(positive):
+        raise ValueError("No positive broadening width.")
+    return np.where(positive, x, np.min(x[positive]))
+
+
+def make_broadpar_grid_vald(ngamma_pressure_ref,
+                            ngamma_natural,
+                            dit_grid_resolution=0.2,
+                            twod_factor=4.0 / 3.0,
+                            adopt=True):
+    """make grids of the normalized pressure and natural half-widths for atomic lines
+
+    Args:
+        ngamma_pressure_ref (nd array): normalized pressure half-width at Tref_broadening and Peff = 1 bar
+        ngamma_natural (nd array): normalized half-width of the natural broadening
+        dit_grid_resolution (float, optional): DIT grid resolution. Defaults to 0.2.
+        twod_factor: conversion factor of the grid resolution from 1D to 2D. default 3.0/4.0. See Issue #366.
+        adopt (bool, optional): if True, min, max grid points are used at min and max values of x. Defaults to True.
+
+    Returns:
+        nd array: ngamma_pressure_grid
+        nd array: ngamma_natural_grid
+    """
+    ngamma_pressure_grid = ditgrid_log_interval(
+        ngamma_pressure_ref,
+        dit_grid_resolution=dit_grid_resolution / twod_factor,
+        adopt=adopt)
+    ngamma_natural_grid = ditgrid_log_interval(
+        ngamma_natural,
+        dit_grid_resolution=dit_grid_resolution / twod_factor,
+        adopt=adopt)
+    return ngamma_pressure_grid, ngamma_natural_grid
+
+
+def generate_lbd_vald(line_strength_ref,
+                      nu_lines,
+                      nu_grid,
+                      ngamma_pressure_ref,
+                      ngamma_pressure_grid,
+                      ngamma_natural,
+                      ngamma_natural_grid,
+                      elower,
+                      elower_grid,
+                      Twt,
+                      group_index,
+                      Tref=Tref_original,
+                      diffmode=0):
+    """generate log-biased line shape density (LBD) for atomic lines
+
+    Notes:
+        The lines are divided into groups, within which the partition function, the atomic mass and n_Texp are common
+        (i.e. group = species x n_Texp). The LBD of each group is computed by generate_lbd using the pressure and natural half-widths
+        as the two broadening parameters, and only the occupied broadening parameter grid points of the group are kept.
+        The LBDs of the groups are concatenated along the broadening parameter axis (the "columns").
+
+    Args:
+        line_strength_ref: line strength at Tref
+        nu_lines: line center (cm-1)
+        nu_grid: wavenumber grid (cm-1)
+        ngamma_pressure_ref: normalized pressure half-width at Tref_broadening and Peff = 1 bar
+        ngamma_pressure_grid: grid of ngamma_pressure_ref
+        ngamma_natural: normalized half-width of the natural broadening
+        ngamma_natural_grid: grid of ngamma_natural
+        elower: Elower (cm-1)
+        elower_grid: Elower grid (cm-1)
+        Twt: temperature used for the weight coefficient computation
+        group_index (nd int array): group index (0,1,...,Ngroup-1) of the lines
+        Tref: reference temperature in Kelvin, default is 296.0 K
+        diffmode (int): i-th Taylor expansion is used for the weight, default is 0.
+
+    Returns:
+        jnp.array: LBD coefficient, shape = (diffmode+1, Nnu, Ncolumn, Nelower)
+        nd array: multi index of the broadening parameter grids for the columns (Ncolumn, 2)
+        nd array: group index of the columns (Ncolumn)
+    """
+    lbd_coeff = []
+    multi_index_column = []
+    group_column = []
+    for igroup in range(np.max(group_index) + 1):
+        mask = group_index == igroup
+        if not np.any(mask):
+            continue
+        lbd_group, multi_index_uniqgrid = generate_lbd(
+            line_strength_ref[mask],
+            nu_lines[mask],
+            nu_grid,
+            ngamma_pressure_ref[mask],
+            ngamma_pressure_grid,
+            ngamma_natural[mask],
+            ngamma_natural_grid,
+            elower[mask],
+            elower_grid,
+            Twt,
+            Tref=Tref,
+            diffmode=diffmode)
+        lbd_coeff.append(lbd_group)
+        multi_index_column.append(np.asarray(multi_index_uniqgrid))
+        group_column.append(np.full(len(multi_index_uniqgrid), igroup))
+    lbd_coeff = jnp.concatenate(lbd_coeff, axis=2)
+    return lbd_coeff, np.concatenate(multi_index_column), np.concatenate(
+        group_column)
+
+
+def unbiased_lsd_vald(lbd_coeff, T, Tref, Twt, nu_grid, elower_grid,
+                      weight_column):
+    """unbias the biased LSD of atomic lines, keeping the columns
+
+    Args:
+        lbd_coeff: the coeffs of log-biased line shape density (LBD), shape = (diffmode+1, Nnu, Ncolumn, Nelower)
+        T: temperature for unbiasing in Kelvin
+        Tref: reference temperature in Kelvin
+        Twt: Temperature at the weight point
+        nu_grid: wavenumber grid in cm-1
+        elower_grid: Elower grid in cm-1
+        weight_column: weight of the columns, such as VMR/qr(T) of the species [Ncolumn]
+
+    Returns:
+        LSD, shape = (number_of_wavenumber_bin, Ncolumn)
+    """
+    lfb = logf_bias(elower_grid, T, Tref)
+    Slsd = jnp.exp(lfb + lbd_coeff[0])
+    dt = (1.0 / T - 1.0 / Twt)
+    if lbd_coeff.shape[0] > 1:
+        Slsd = Slsd + jnp.exp(lfb) * lbd_coeff[1] * dt
+    if lbd_coeff.shape[0] > 2:
+        Slsd = Slsd + jnp.exp(lfb) * 0.5 * lbd_coeff[2] * dt**2
+    Slsd = jnp.sum(Slsd, axis=-1)
+    return Slsd * g_bias(nu_grid, T, Tref)[:, None] * weight_column[None, :]
+
+
+def unbiased_ngamma_grid_vald(T, Peff, ngamma_pressure_grid,
+                              ngamma_natural_grid, n_Texp_column,
+                              multi_index_column, Tref_broadening):
+    """compute the normalized Lorentz half-width of the columns for atomic lines
+
+    Args:
+        T: temperature in Kelvin
+        Peff: effective perturber pressure in bar (vald_effective_pressure)
+        ngamma_pressure_grid: grid of the normalized pressure half-width at Tref_broadening and Peff = 1 bar
+        ngamma_natural_grid: grid of the normalized natural half-width
+        n_Texp_column: temperature exponent of the columns
+        multi_index_column: multi index of the broadening parameter grids for the columns
+        Tref_broadening: reference temperature in Kelvin for broadening
+
+    Returns:
+        normalized half-width of the columns at T and Peff
+    """
+    ngamma_pressure_g = ngamma_pressure_grid[multi_index_column[:, 0]]
+    ngamma_natural_g = ngamma_natural_grid[multi_index_column[:, 1]]
+    return ngamma_pressure_g * (T / Tref_broadening)**(
+        -n_Texp_column) * Peff + ngamma_natural_g
+
+
+@jit
+def xsmatrix_vald(Tarr, Peffarr, weightM, Tref, Twt, R, pmarray, lbd_coeff,
+                  nu_grid, ngamma_pressure_grid, ngamma_natural_grid,
+                  multi_index_column, n_Texp_column, mass_column, elower_grid,
+                  Tref_broadening):
+    """compute cross section matrix of atomic lines given atmospheric layers, with scan+fft
+
+    Notes:
+        Each column has its own Doppler width (atomic mass) and Lorentz width, so the columns are convolved separately.
+        When weightM = VMR/qr of the species, the output is sum_species VMR_species * xs_species,
+        i.e. layeropacity.layer_optical_depth_VALD_ragged converts it to dtau.
+
+    Args:
+        Tarr: temperature layers
+        Peffarr: effective perturber pressure layers (vald_effective_pressure) in bar
+        weightM: weight of the columns for the layers, e.g. VMR/qr(T) of the species [Nlayer, Ncolumn]
+        Tref: reference temperature in K
+        Twt: weight temperature in K
+        R (float): spectral resolution
+        pmarray: pmarray
+        lbd_coeff: LBD coefficient (generate_lbd_vald)
+        nu_grid: wavenumber grid
+        ngamma_pressure_grid: grid of the normalized pressure half-width
+        ngamma_natural_grid: grid of the normalized natural half-width
+        multi_index_column: multi index of the broadening parameter grids for the columns
+        n_Texp_column: temperature exponent of the columns
+        mass_column: atomic mass of the columns
+        elower_grid: Elower grid
+        Tref_broadening: reference temperature for broadening in Kelvin
+
+    Returns:
+        jnp.array : cross section matrix (Nlayer, N_wavenumber)
+    """
+    nsigmaD = normalized_doppler_sigma(Tarr[:, None], mass_column[None, :], R)
+    Slsd = vmap(unbiased_lsd_vald, (None, 0, None, None, None, None, 0),
+                0)(lbd_coeff, Tarr, Tref, Twt, nu_grid, elower_grid, weightM)
+    ngamma_grid = vmap(unbiased_ngamma_grid_vald,
+                       (0, 0, None, None, None, None, None),
+                       0)(Tarr, Peffarr, ngamma_pressure_grid,
+                          ngamma_natural_grid, n_Texp_column,
+                          multi_index_column, Tref_broadening)
+    log_ngammaL_grid = jnp.log(ngamma_grid)
+    xsm = vmap(calc_xsection_from_lsd_scanfft, (0, None, None, 0, None, 0),
+               0)(Slsd, R, pmarray, nsigmaD, nu_grid, log_ngammaL_grid)
+    return xsm
@@ -4,12 +4,17 @@
 * response is a response operation for the wavenumber grid spaced evenly on a log scale.
 
 """
+from functools import partial
 from jax import jit
+from jax import vmap
+import numpy as np
 import jax.numpy as jnp
 from jax.lax import scan
 from exojax.utils.constants import c
 from exojax.signal.convolve import convolve_same
 from exojax.signal.ola import olaconv, ola_lengths, generate_zeropad
+from exojax.signal.convolve import convolve_same_batch
+from exojax.signal.ola import olaconv_same_batch
 
 
 @jit
@@ -96,6 +101,68 @@ def ipgauss(spectrum, varr_kernel, beta):
 
     return F
 
+def ipgauss_kernel(varr_kernel, beta):
+    """normalized Gaussian IP kernel(s)
+
+    Args:
+        varr_kernel: velocity array for the kernel
+        beta: STD of a Gaussian broadening, float or 1D array (Nspec)
+
+    Returns:
+        normalized kernel (len(varr_kernel)) if beta is float, otherwise kernels (Nspec, len(varr_kernel))
+    """
+    x = varr_kernel / jnp.asarray(beta)[..., None]
+    kernel = jnp.exp(-x * x / 2.0)
+    return kernel / jnp.sum(kernel, axis=-1, keepdims=True)
+
+
+@jit
+def ipgauss_batch(spectra, varr_kernel, beta):
+    """Apply the Gaussian IP response to multiple spectra at once (batched FFT).
+
+    Args:
+        spectra: original spectra (Nspec, Nnu)
+        varr_kernel: velocity array for the kernel
+        beta: STD of a Gaussian broadening, float or 1D array (Nspec)
+
+    Return:
+        response-applied spectra (Nspec, Nnu)
+    """
+    return convolve_same_batch(spectra, ipgauss_kernel(varr_kernel, beta))
+
+
+@jit
+def ipgauss_ola_batch(folded_spectra, varr_kernel, beta):
+    """Apply the Gaussian IP response to multiple spectra at once using OLA.
+
+    Args:
+        folded_spectra: original spectra folded to (Nspec, ndiv, div_length) form
+        varr_kernel: velocity array for the kernel
+        beta: STD of a Gaussian broadening, float or 1D array (Nspec)
+
+    Return:
+        response-applied spectra (Nspec, ndiv*div_length)
+    """
+    return olaconv_same_batch(folded_spectra, ipgauss_kernel(varr_kernel, beta))
+
+
+@jit
+def sampling_batch(nusd, nus, spectra, RV):
+    """Sampling w/ RV for multiple spectra at once.
+
+    Args:
+        nusd: sampling wavenumber
+        nus: input wavenumber
+        spectra: input spectra (Nspec, Nnu)
+        RV: radial velocity (km/s), float or 1D array (Nspec)
+
+    Returns:
+       sampled spectra (Nspec, len(nusd))
+    """
+    RV = jnp.broadcast_to(RV, jnp.shape(spectra)[:1])
+    return vmap(sampling, (None, None, 0, 0))(nusd, nus, spectra, RV)
+
+
 @jit
 def sampling(nusd, nus, F, RV):
     """Sampling w/ RV.
@@ -138,4 +205,147 @@ def ipgauss_variable_sampling(nusd, nus, spectrum, beta_variable, RV):
     
     mat = jnp.vstack([nusd, beta_variable]).T
     _, F_convolved = scan(convolve_ipgauss_scan, 0, mat)
-    return F_convolved
\ No newline at end of file
+    return F_convolved
+
+@partial(jit, static_argnames=("nhalf",))
+def ipgauss_variable_sampling_banded(nusd, nus, spectrum, beta_variable, RV, nhalf):
+    """Apply the variable Gaussian IP response + sampling to a spectrum F, evaluating the kernel only within a band.
+
+    Notes:
+        STD is a function of nusd. Unlike ipgauss_variable_sampling, which evaluates the kernel over the entire nus for each nusd (O(Nout x Nin)),
+        the kernel is evaluated only for the 2 nhalf + 1 pixels of nus around the kernel center nusd (1 + RV/c), found by searchsorted (O(Nout x nhalf)).
+        nhalf should cover the kernel, e.g. nhalf > 5 max(beta_variable)/(c/R), where R is the resolution of nus.
+
+    Args:
+        nusd: sampling wavenumber
+        nus: input wavenumber, evenly log-spaced
+        spectrum: original spectrum (F0)
+        beta_variable (1D array): STD of a Gaussian broadening, shape=(len(nusd),)
+        RV: radial velocity (km/s)
+        nhalf (int): half width of the band in the number of the nus pixels (static)
+
+    Return:
+        response-applied spectrum (F)
+    """
+    center = jnp.searchsorted(nus, nusd * (1.0 + RV / c))
+    index = center[:, None] + jnp.arange(-nhalf, nhalf + 1)[None, :]
+    inside = (index >= 0) & (index < len(nus))
+    index = jnp.clip(index, 0, len(nus) - 1)
+    dvgrid = c * (jnp.log1p(1.0 - nus[index] / nusd[:, None]))
+    kernel = jnp.where(
+        inside, jnp.exp(-((dvgrid + RV) ** 2) / (2.0 * beta_variable[:, None] ** 2)), 0.0
+    )
+    kernel = kernel / jnp.sum(kernel, axis=1, keepdims=True)
+    return jnp.sum(kernel * spectrum[index], axis=1)
+
+
+def resampling_positions(nusd, nus, pixel_integration=False):
+    """precomputes the fractional indices of the sampling wavenumbers on the ESLOG grid for sampling_gather/sampling_pixel_integration
+
+    Args:
+        nusd: sampling wavenumber (ascending)
+        nus: input wavenumber, evenly log-spaced (ascending)
+        pixel_integration (bool, optional): if True, returns the positions of the pixel edges of nusd (len(nusd) + 1), the midpoints in log between the adjacent nusd. Defaults to False.
+
+    Returns:
+        1D array, float: fractional indices on nus (len(nusd) or len(nusd)+1), log wavenumber interval of nus
+    """
+    nusd = np.asarray(nusd, dtype=np.float64)
+    nus = np.asarray(nus, dtype=np.float64)
+    dlognu = (np.log(nus[-1]) - np.log(nus[0])) / (len(nus) - 1)
+    lognusd = np.log(nusd)
+    if pixel_integration:
+        mid = 0.5 * (lognusd[1:] + lognusd[:-1])
+        lognusd = np.hstack(
+            [
+                2.0 * lognusd[0] - mid[0],
+                mid,
+                2.0 * lognusd[-1] - mid[-1],
+            ]
+        )
+    return (lognusd - np.log(nus[0])) / dlognu, dlognu
+
+
+@jit
+def sampling_gather(positions, F, RV, dlognu):
+    """Sampling w/ RV by the linear interpolation in log wavenumber using the precomputed positions (gather, no search).
+
+    Args:
+        positions: fractional indices of the sampling wavenumbers on the ESLOG grid, see resampling_positions
+        F: input spectrum on the ESLOG grid
+        RV: radial velocity (km/s)
+        dlognu: log wavenumber interval of the ESLOG grid
+
+    Returns:
+       sampled spectrum
+
+    Notes:
+        The Doppler shift is the index offset log(1 + RV/c)/dlognu on the ESLOG grid. Outside of the grid, the edge values are used as in jnp.interp.
+    """
+    position = jnp.clip(positions + jnp.log1p(RV / c) / dlognu, 0.0, len(F) - 1.0)
+    index = jnp.clip(jnp.floor(position).astype(int), 0, len(F) - 2)
+    weight = position - index
+    return (1.0 - weight) * F[index] + weight * F[index + 1]
+
+
+@jit
+def sampling_pixel_integration(edge_positions, F, RV, dlognu):
+    """Sampling w/ RV averaging the spectrum over the sampling pixels (flux-conserving), using the precomputed pixel edge positions.
+
+    Args:
+        edge_positions: fractional indices of the pixel edges on the ESLOG grid (len(nusd)+1), see resampling_positions(pixel_integration=True)
+        F: input spectrum on the ESLOG grid
+        RV: radial velocity (km/s)
+        dlognu: log wavenumber interval of the ESLOG grid
+
+    Returns:
+       sampled spectrum (len(nusd))
+
+    Notes:
+        The piecewise-linear spectrum is integrated exactly in the index space via its cumulative integral, and divided by the pixel width.
+    """
+    position = jnp.clip(
+        edge_positions + jnp.log1p(RV / c) / dlognu, 0.0, len(F) - 1.0
+    )
+    index = jnp.clip(jnp.floor(position).astype(int), 0, len(F) - 2)
+    weight = position - index
+    cumulative = jnp.concatenate(
+        [jnp.zeros(1), jnp.cumsum(0.5 * (F[1:] + F[:-1]))]
+    )
+    slope = F[index + 1] - F[index]
+    integral = cumulative[index] + F[index] * weight + 0.5 * slope * weight**2
+    width = position[1:] - position[:-1]
+    averaged = (integral[1:] - integral[:-1]) / jnp.where(width > 0.0, width, 1.0)
+    return jnp.where(width > 0.0, averaged, sampling_gather(position[1:], F, 0.0, dlognu))
+
+
+def sampling_gather_multi_rv(positions, F, RV_array, dlognu):
+    """Sampling of a single spectrum w/ multiple RVs at once, see sampling_gather.
+
+    Args:
+        positions: fractional indices of the sampling wavenumbers on the ESLOG grid, see resampling_positions
+        F: input spectrum on the ESLOG grid
+        RV_array: radial velocities (km/s), 1D array (Nrv)
+        dlognu: log wavenumber interval of the ESLOG grid
+
+    Returns:
+       sampled spectra (Nrv, len(positions))
+    """
+    return vmap(sampling_gather, (None, None, 0, None))(positions, F, RV_array, dlognu)
+
+
+def sampling_pixel_integration_multi_rv(edge_positions, F, RV_array, dlognu):
+    """Pixel-integrated sampling of a single spectrum w/ multiple RVs at once, see sampling_pixel_integration.
+
+    Args:
+        edge_positions: fractional indices of the pixel edges on the ESLOG grid (len(nusd)+1), see resampling_positions(pixel_integration=True)
+        F: input spectrum on the ESLOG grid
+        RV_array: radial velocities (km/s), 1D array (Nrv)
+        dlognu: log wavenumber interval of the ESLOG grid
+
+    Returns:
+       sampled spectra (Nrv, len(nusd))
+    """
+    return vmap(sampling_pixel_integration, (None, None, 0, None))(
+        edge_positions, F, RV_array, dlognu
+    )
@@ -5,6 +5,8 @@
     - flux-based emission
     -- pure absoprtion 
     --- 2stream: rtrun_emis_pureabs_flux2st, rtrun_emis_pureabs_flux2st_surface
+    --- analytic angular integration (2E3): rtrun_emis_pureabs_fbased_e3
+    --- analytic angular integration w/ linear source approximation: rtrun_emis_pureabs_fbased_e3_linsap
     -- scattering
     --- 2stream
     ---- LART: rtrun_emis_scat_lart_toonhm
@@ -24,17 +26,22 @@
 
 """
 
+from functools import partial
 from jax import jit
 import jax.numpy as jnp
 from jax.lax import scan
 from exojax.spec.twostream import solve_lart_twostream
+from exojax.spec.twostream import solve_lart_twostream_parallel
 from exojax.spec.twostream import solve_fluxadding_twostream
+from exojax.spec.twostream import solve_fluxadding_twostream_parallel
 from exojax.spec.toon import reduced_source_function_isothermal_layer
 from exojax.spec.toon import params_hemispheric_mean
 from exojax.spec.toon import zetalambda_coeffs
 from exojax.spec.twostream import compute_tridiag_diagonals_and_vector
 from exojax.spec.twostream import set_scat_trans_coeffs
 from exojax.special.expn import E1
+from exojax.special.expn import E3
+from exojax.special.expn import E4
 from exojax.signal.integrate import simpson
 from jax.scipy.integrate import trapezoid
 
@@ -94,6 +101,63 @@ def rtrun_emis_pureabs_fbased2st_surface(dtau, source_matrix, source_surface):
     )
 
 
+@jit
+def rtrun_emis_pureabs_fbased_e3(dtau, source_matrix):
+    """Radiative Transfer for emission spectrum using the flux-based solver with the analytic angular integration (2 E3) of the cumulative optical depth, isothermal layer, no surface
+
+    Notes:
+        The flux transmission from the layer boundary to the top of the atmosphere is exactly 2 E3(tau), where tau is the cumulative optical depth. This is the limit of rtrun_emis_pureabs_ibased for nstream -> infinity, while rtrun_emis_pureabs_fbased2st approximates it by the product of the layer-wise 2 E3(dtau).
+
+    Args:
+        dtau (2D array): optical depth matrix, dtau  (N_layer, N_nus)
+        source_matrix (2D array): source matrix (N_layer, N_nus)
+
+    Returns:
+        flux in the unit of [erg/cm2/s/cm-1] if using piBarr as a source function.
+    """
+    tau = jnp.cumsum(dtau, axis=0)
+    dtrans = -jnp.diff(2.0 * E3(tau), prepend=1.0, axis=0)
+    return jnp.sum(source_matrix * dtrans, axis=0)
+
+
+@jit
+def rtrun_emis_pureabs_fbased_e3_linsap(dtau, source_matrix_boundary):
+    """Radiative Transfer for emission spectrum using the flux-based solver with the analytic angular integration and the linear source approximation (linsap) in tau, no surface
+
+    Args:
+        dtau (2D array): optical depth matrix, dtau  (N_layer, N_nus)
+        source_matrix_boundary (2D array): source matrix at the layer upper boundary (N_layer + 1, N_nus), the last element is the source at the bottom
+
+    Returns:
+        flux in the unit of [erg/cm2/s/cm-1] if using piBarr as a source function.
+
+    Notes:
+        The angular integral of the formal solution gives F = 2 int S(t) E2(t) dt + 2 E3(tau_N) S_N. For the source linear in t between the layer boundaries a = tau_{n}, b = tau_{n+1}, the layer contributes
+        2 [E3(a) - (E4(a) - E4(b))/dtau] S_n + 2 [(E4(a) - E4(b))/dtau - E3(b)] S_{n+1}.
+        For optically thin layers (dtau < 1.e-4), the coefficients are replaced by the trapezoidal ones, E3(a) - E3(b), to avoid the cancellation.
+    """
+    Nnus = jnp.shape(dtau)[1]
+    tau_upper = jnp.vstack([jnp.zeros(Nnus), jnp.cumsum(dtau, axis=0)])
+    e3 = E3(tau_upper)
+    e4 = E4(tau_upper)
+
+    thin = dtau < 1.0e-4
+    dtau_safe = jnp.where(thin, 1.0, dtau)
+    de4 = (e4[:-1] - e4[1:]) / dtau_safe
+    de3 = e3[:-1] - e3[1:]
+    coeff_upper = jnp.where(thin, de3, 2.0 * (e3[:-1] - de4))
+    coeff_lower = jnp.where(thin, de3, 2.0 * (de4 - e3[1:]))
+
+    return (
+        jnp.sum(
+            coeff_upper * source_matrix_boundary[:-1]
+            + coeff_lower * source_matrix_boundary[1:],
+            axis=0,
+        )
+        + 2.0 * e3[-1] * source_matrix_boundary[-1]
+    )
+
+
 @jit
 def rtrun_emis_pureabs_ibased(dtau, source_matrix, mus, weights):
     """Radiative Transfer for emission spectrum using intensity-based n-stream pure absorption with no surface (NEMESIS, pRT-like)
@@ -105,6 +169,7 @@ def rtrun_emis_pureabs_ibased(dtau, source_matrix, mus, weights):
 
     Returns:
         flux in the unit of [erg/cm2/s/cm-1] if using piBarr as a source function.
+
     """
 
     Nnus = jnp.shape(dtau)[1]
@@ -115,6 +180,7 @@ def rtrun_emis_pureabs_ibased(dtau, source_matrix, mus, weights):
     # for i, mu in enumerate(mus):
     #    dtrans = - jnp.diff(jnp.exp(-tau/mu), prepend=1.0, axis=0)
     #    spec = spec + weights[i]*2.0*mu*jnp.sum(source_matrix*dtrans, axis=0)
+    # The streams are accumulated one by one, i.e. the memory is (N_layer, N_nus), not (N_stream, N_layer, N_nus).
 
     # scan part
     muws = [mus, weights]
@@ -182,7 +248,10 @@ def rtrun_emis_pureabs_ibased_linsap(dtau, source_matrix_boundary, mus, weights)
     # need to replace the last element of the above
     #
 
-    # scan part
+    # transmission to the top, computed from the cumulative optical depth instead of cumprod
+    tau_upper = jnp.vstack([jnp.zeros(Nnus), jnp.cumsum(dtau, axis=0)])
+
+    # scan part, the streams are accumulated one by one
     muws = [mus, weights]
 
     def f(carry_fmu, muw):
@@ -196,9 +265,7 @@ def rtrun_emis_pureabs_ibased_linsap(dtau, source_matrix_boundary, mus, weights)
         gamma = jnp.vstack([gamma, jnp.zeros(Nnus)])
 
         dI = beta * source_matrix_boundary + gamma * source_matrix_boundary_p1
-        intensity_for_mu = jnp.sum(
-            dI * jnp.cumprod(jnp.vstack([jnp.ones(Nnus), trans]), axis=0), axis=0
-        )
+        intensity_for_mu = jnp.sum(dI * jnp.exp(-tau_upper / mu), axis=0)
 
         carry_fmu = carry_fmu + 2.0 * mu * w * intensity_for_mu
 
@@ -295,9 +362,13 @@ def rtrun_trans_pureabs_simpson(
     return deltaRp2 + radius_lower[-1] ** 2
 
 
-@jit
+@partial(jit, static_argnames=("tridiagonal_solver",))
 def rtrun_emis_scat_lart_toonhm(
-    dtau, single_scattering_albedo, asymmetric_parameter, source_matrix
+    dtau,
+    single_scattering_albedo,
+    asymmetric_parameter,
+    source_matrix,
+    tridiagonal_solver="scan",
 ):
     """Radiative Transfer for emission spectrum using flux-based two-stream scattering LART solver w/ Toon Hemispheric Mean with no surface.
 
@@ -306,6 +377,7 @@ def rtrun_emis_scat_lart_toonhm(
         single_scattering_albedo (_type_): _description_
         asymmetric_parameter (_type_): _description_
         source_matrix (_type_): _description_
+        tridiagonal_solver (str): "scan" (sequential in layers, default) or "parallel" (associative scan in layers, requires the 64bit mode of JAX)
 
     Returns:
         _type_: _description_
@@ -323,16 +395,21 @@ def rtrun_emis_scat_lart_toonhm(
         dtau, zeta_plus, zeta_minus, lambdan, trans_coeff, scat_coeff, reduced_piB
     )
     nlayer, Nnus = diagonal.shape
-    cumTtilde, Qtilde, spectrum = solve_lart_twostream(
+    cumTtilde, Qtilde, spectrum = _lart_tridiagonal_solver(tridiagonal_solver)(
         diagonal, lower_diagonal, upper_diagonal, vector, jnp.zeros(Nnus)
     )
 
     return spectrum, cumTtilde, Qtilde, trans_coeff, scat_coeff, reduced_piB
 
 
-@jit
+@partial(jit, static_argnames=("tridiagonal_solver",))
 def rtrun_emis_scat_lart_toonhm_surface(
-    dtau, single_scattering_albedo, asymmetric_parameter, source_matrix, source_surface
+    dtau,
+    single_scattering_albedo,
+    asymmetric_parameter,
+    source_matrix,
+    source_surface,
+    tridiagonal_solver="scan",
 ):
     """Radiative Transfer for emission spectrum using flux-based two-stream scattering LART solver w/ Toon Hemispheric Mean with surface.
 
@@ -342,6 +419,7 @@ def rtrun_emis_scat_lart_toonhm_surface(
         asymmetric_parameter (_type_): _description_
         source_matrix (_type_): _description_
         source_surface: source from the surface (N_nus)
+        tridiagonal_solver (str): "scan" (sequential in layers, default) or "parallel" (associative scan in layers, requires the 64bit mode of JAX)
 
     Returns:
         _type_: _description_
@@ -353,14 +431,23 @@ def rtrun_emis_scat_lart_toonhm_surface(
         dtau, zeta_plus, zeta_minus, lambdan, trans_coeff, scat_coeff, piB
     )
 
-    cumTtilde, Qtilde, spectrum = solve_lart_twostream(
+    cumTtilde, Qtilde, spectrum = _lart_tridiagonal_solver(tridiagonal_solver)(
         diagonal, lower_diagonal, upper_diagonal, vector, source_surface
     )
 
     return spectrum, cumTtilde, Qtilde, trans_coeff, scat_coeff, piB
 
 
-@jit
+def _lart_tridiagonal_solver(tridiagonal_solver):
+    if tridiagonal_solver == "scan":
+        return solve_lart_twostream
+    elif tridiagonal_solver == "parallel":
+        return solve_lart_twostream_parallel
+    else:
+        raise ValueError("tridiagonal_solver should be scan or parallel.")
+
+
+@partial(jit, static_argnames=("fluxadding_solver",))
 def rtrun_reflect_fluxadding_toonhm(
     dtau,
     single_scattering_albedo,
@@ -369,6 +456,7 @@ def rtrun_reflect_fluxadding_toonhm(
     source_surface,
     reflectivity_surface,
     incoming_flux,
+    fluxadding_solver="scan",
 ):
     """Radiative Transfer for reflected spectrum the flux adding solver w/ Toon Hemispheric Mean with surface.
 
@@ -380,6 +468,7 @@ def rtrun_reflect_fluxadding_toonhm(
         source_surface: source from the surface (N_nus)
         reflectivity_surface: reflectivity from the surface (N_nus)
         incoming flux: incoming flux F_0^- (N_nus)
+        fluxadding_solver (str): "scan" (sequential in layers, default) or "parallel" (associative scan in layers)
 
     Returns:
         _type_: _description_
@@ -388,15 +477,19 @@ def rtrun_reflect_fluxadding_toonhm(
         dtau, single_scattering_albedo, asymmetric_parameter, source_matrix
     )
 
-    Rphat, Sphat = solve_fluxadding_twostream(
+    Rphat, Sphat = _fluxadding_solver(fluxadding_solver)(
         trans_coeff, scat_coeff, reduced_piB, reflectivity_surface, source_surface
     )
     return Rphat * incoming_flux + Sphat
 
 
-@jit
+@partial(jit, static_argnames=("fluxadding_solver",))
 def rtrun_emis_scat_fluxadding_toonhm(
-    dtau, single_scattering_albedo, asymmetric_parameter, source_matrix
+    dtau,
+    single_scattering_albedo,
+    asymmetric_parameter,
+    source_matrix,
+    fluxadding_solver="scan",
 ):
     """Radiative Transfer for emission spectrum (w/ scattering) using flux-based two-stream scattering the flux adding solver w/ Toon Hemispheric Mean with surface.
 
@@ -405,6 +498,7 @@ def rtrun_emis_scat_fluxadding_toonhm(
         single_scattering_albedo (_type_): _description_
         asymmetric_parameter (_type_): _description_
         source_matrix (_type_): _description_
+        fluxadding_solver (str): "scan" (sequential in layers, default) or "parallel" (associative scan in layers)
 
     Returns:
         _type_: _description_
@@ -417,13 +511,22 @@ def rtrun_emis_scat_fluxadding_toonhm(
         dtau, single_scattering_albedo, asymmetric_parameter, source_matrix
     )
 
-    _, spectrum = solve_fluxadding_twostream(
+    _, spectrum = _fluxadding_solver(fluxadding_solver)(
         trans_coeff, scat_coeff, reduced_piB, reflectivity_surface, source_surface
     )
 
     return spectrum
 
 
+def _fluxadding_solver(fluxadding_solver):
+    if fluxadding_solver == "scan":
+        return solve_fluxadding_twostream
+    elif fluxadding_solver == "parallel":
+        return solve_fluxadding_twostream_parallel
+    else:
+        raise ValueError("fluxadding_solver should be scan or parallel.")
+
+
 def setrt_toonhm(dtau, single_scattering_albedo, asymmetric_parameter, source_matrix):
     """sets some coefficients for rtrun assming Toon Hemispheric Mean
 
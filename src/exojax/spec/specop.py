@@ -1,6 +1,7 @@
 """Spectral Operators (Sop)
 
     The role of SOP is to apply various operators (essentially convolution) to a single spectrum, such as spin rotation, gaussian IP, RV shift etc.
+    The *_batch methods apply them to multiple spectra (Nspec, Nnu) at once, with per-spectrum parameters.
     There are several convolution methods:
     - "exojax.signal.convolve": regular FFT-based convolution
     - "exojax.signal.ola": Overlap-and-Add based convolution
@@ -11,20 +12,33 @@ from exojax.spec.spin_rotation import convolve_rigid_rotation
 from exojax.spec.spin_rotation import convolve_rigid_rotation_ola
 from exojax.spec.response import ipgauss, sampling
 from exojax.spec.response import ipgauss_ola, sampling
+from exojax.spec.spin_rotation import convolve_rigid_rotation_batch
+from exojax.spec.spin_rotation import convolve_rigid_rotation_ola_batch
+from exojax.spec.response import ipgauss_batch, ipgauss_ola_batch, sampling_batch
+from exojax.spec.response import ipgauss_variable_sampling_banded
+from exojax.spec.response import resampling_positions
+from exojax.spec.response import sampling_gather, sampling_pixel_integration
+from exojax.spec.response import sampling_gather_multi_rv
+from exojax.spec.response import sampling_pixel_integration_multi_rv
+from exojax.spec.spin_rotation import convolve_rigid_rotation_ipgauss
+from exojax.spec.spin_rotation import convolve_rigid_rotation_ipgauss_ola
 from exojax.utils.grids import grid_resolution
+from exojax.signal.ola import optimal_fft_length
+import jax.numpy as jnp
 
 
 class SopCommon():
     """Common Spectral Operator
     """
 
-    def __init__(self, nu_grid, vrmax, convolution_method):
+    def __init__(self, nu_grid, vrmax, convolution_method, ola_ndiv=None):
         """initialization of Sop
 
         Args:
             nu_grid (nd.array): wavenumber grid in cm-1
             resolution (float): wavenumber grid resolution, defined by nu/delta nu
             vrmax (float): velocity maximum to be applied in km/s
+            ola_ndiv (int, optional): the number of the divisions for OLA. Defaults to None (determined from the optimal FFT length).
         """
         self.convolution_method_list = [
             "exojax.signal.convolve", "exojax.signal.ola"]
@@ -33,16 +47,83 @@ class SopCommon():
         self.vrmax = vrmax
         self.resolution = grid_resolution('ESLOG', self.nu_grid)
         self.generate_vrarray()
-        self.ola_ndiv = 4
+        self._ola_ndiv = ola_ndiv
+        self._ola_plan = self.compute_ola_plan()
 
     def generate_vrarray(self):
         self.vrarray = velocity_grid(self.resolution, self.vrmax)
 
-    def check_ola_reducible(self, spectrum):
-        div_length = int(float(len(spectrum))/float(self.ola_ndiv))
-        if len(spectrum) != self.ola_ndiv*div_length:
-            raise ValueError("len(spectrum) can be reduced by self.ola_ndiv ="+str(self.ola_ndiv))
-        return div_length
+    @property
+    def ola_ndiv(self):
+        """the number of the divisions for OLA given at the initialization (None: determined from the optimal FFT length)"""
+        return self._ola_ndiv
+
+    @property
+    def ola_plan(self):
+        """OLA plan for len(nu_grid), computed at the initialization (a copy is returned)"""
+        return dict(self._ola_plan)
+
+    def compute_ola_plan(self, input_length=None):
+        """computes the OLA plan, i.e. the block length from the optimal FFT length for the kernel length
+
+        Args:
+            input_length (int, optional): the length of the spectrum. Defaults to None (len(nu_grid)).
+
+        Returns:
+            dict: OLA plan (input_length, filter_length, fft_length, div_length, ndiv, npad)
+
+        Notes:
+            The FFT length is given by signal.ola.optimal_fft_length(filter_length) and div_length = fft_length - filter_length + 1.
+            When ola_ndiv is given at the initialization, div_length = ceil(input_length/ola_ndiv) instead.
+            The spectrum is zero-padded by npad to ndiv*div_length, which does not change the convolved spectrum.
+            The plan depends only on input_length and the arguments at the initialization, i.e. this method does not change the Sop.
+        """
+        if input_length is None:
+            input_length = len(self.nu_grid)
+        filter_length = len(self.vrarray)
+        if self._ola_ndiv is None:
+            fft_length = optimal_fft_length(filter_length)
+            div_length = fft_length - filter_length + 1
+            ndiv = -(-input_length // div_length)
+        else:
+            ndiv = self._ola_ndiv
+            div_length = -(-input_length // ndiv)
+            fft_length = div_length + filter_length - 1
+        return {
+            "input_length": input_length,
+            "filter_length": filter_length,
+            "fft_length": fft_length,
+            "div_length": div_length,
+            "ndiv": ndiv,
+            "npad": ndiv * div_length - input_length,
+        }
+
+    def fold_spectra_ola(self, spectra, ola_plan=None):
+        """zero-pads and folds spectra (..., Nnu) to (..., ndiv, div_length) for OLA following the OLA plan
+
+        Args:
+            spectra (1D or 2D array): spectrum (Nnu) or spectra (Nspec, Nnu)
+            ola_plan (dict, optional): OLA plan by compute_ola_plan. Defaults to None (ola_plan, or compute_ola_plan(Nnu) when Nnu differs from len(nu_grid)).
+
+        Raises:
+            ValueError: input_length of ola_plan differs from Nnu
+
+        Returns:
+            folded spectra
+        """
+        input_length = jnp.shape(spectra)[-1]
+        if ola_plan is None:
+            if input_length == self._ola_plan["input_length"]:
+                ola_plan = self._ola_plan
+            else:
+                ola_plan = self.compute_ola_plan(input_length)
+        elif ola_plan["input_length"] != input_length:
+            raise ValueError("input_length of ola_plan differs from the spectrum length.")
+        ndiv = ola_plan["ndiv"]
+        div_length = ola_plan["div_length"]
+        pad_width = [(0, 0)] * (jnp.ndim(spectra) - 1) + [(0, ola_plan["npad"])]
+        spectra = jnp.pad(spectra, pad_width)
+        return spectra.reshape(jnp.shape(spectra)[:-1] + (ndiv, div_length))
 
 
 class SopRotation(SopCommon):
@@ -52,9 +133,10 @@ class SopRotation(SopCommon):
     def __init__(self,
                  nu_grid,
                  vsini_max=100.0,
-                 convolution_method="exojax.signal.convolve"
+                 convolution_method="exojax.signal.convolve",
+                 ola_ndiv=None
                  ):
-        super().__init__(nu_grid, vsini_max, convolution_method)
+        super().__init__(nu_grid, vsini_max, convolution_method, ola_ndiv)
 
     def rigid_rotation(self, spectrum, vsini, u1, u2):
         """apply a rigid rotation
@@ -74,9 +156,31 @@ class SopRotation(SopCommon):
         if self.convolution_method == self.convolution_method_list[0]:  # "exojax.signal.convolve"
             return convolve_rigid_rotation(spectrum, self.vrarray, vsini, u1, u2)
         elif self.convolution_method == self.convolution_method_list[1]:  # "exojax.signal.olaconv"
-            div_length = self.check_ola_reducible(spectrum)
-            folded_spectrum = spectrum.reshape((self.ola_ndiv, div_length))
-            return convolve_rigid_rotation_ola(folded_spectrum, self.vrarray, vsini, u1, u2)
+            folded_spectrum = self.fold_spectra_ola(spectrum)
+            return convolve_rigid_rotation_ola(folded_spectrum, self.vrarray, vsini, u1, u2)[:len(spectrum)]
+        else:
+            raise ValueError("No convolution_method.")
+
+    def rigid_rotation_batch(self, spectra, vsini, u1, u2):
+        """apply rigid rotations to multiple spectra
+
+        Args:
+            spectra (nd array): 2D spectra (Nspec, Nnu)
+            vsini (float or 1D array): V sini in km/s, common or per spectrum (Nspec)
+            u1 (float or 1D array): Limb darkening parameter u1, common or per spectrum (Nspec)
+            u2 (float or 1D array): Limb darkening parameter u2, common or per spectrum (Nspec)
+
+        Raises:
+            ValueError: _description_
+
+        Returns:
+            nd array: rotationally broaden spectra (Nspec, Nnu)
+        """
+        if self.convolution_method == self.convolution_method_list[0]:  # "exojax.signal.convolve"
+            return convolve_rigid_rotation_batch(spectra, self.vrarray, vsini, u1, u2)
+        elif self.convolution_method == self.convolution_method_list[1]:  # "exojax.signal.olaconv"
+            folded_spectra = self.fold_spectra_ola(spectra)
+            return convolve_rigid_rotation_ola_batch(folded_spectra, self.vrarray, vsini, u1, u2)[:, :spectra.shape[-1]]
         else:
             raise ValueError("No convolution_method.")
 
@@ -89,9 +193,10 @@ class SopInstProfile(SopCommon):
     def __init__(self,
                  nu_grid,
                  vrmax=100.0,
-                 convolution_method="exojax.signal.convolve"
+                 convolution_method="exojax.signal.convolve",
+                 ola_ndiv=None
                  ):
-        super().__init__(nu_grid, vrmax, convolution_method)
+        super().__init__(nu_grid, vrmax, convolution_method, ola_ndiv)
 
     def ipgauss(self, spectrum, standard_deviation):
         """Gaussian Instrumental Profile
@@ -109,12 +214,50 @@ class SopInstProfile(SopCommon):
         if self.convolution_method == self.convolution_method_list[0]:  # "exojax.signal.convolve"
             return ipgauss(spectrum, self.vrarray, standard_deviation)
         elif self.convolution_method == self.convolution_method_list[1]:  # "exojax.signal.olaconv"
-            div_length = self.check_ola_reducible(spectrum)
-            folded_spectrum = spectrum.reshape((self.ola_ndiv, div_length))
-            return ipgauss_ola(folded_spectrum, self.vrarray, standard_deviation)
+            folded_spectrum = self.fold_spectra_ola(spectrum)
+            return ipgauss_ola(folded_spectrum, self.vrarray, standard_deviation)[:len(spectrum)]
         else:
             raise ValueError("No convolution_method.")
 
+    def ipgauss_batch(self, spectra, standard_deviation):
+        """Gaussian Instrumental Profile for multiple spectra
+
+        Args:
+            spectra (nd array): 2D spectra (Nspec, Nnu)
+            standard_deviation (float or 1D array): standard deviation of Gaussian in km/s, common or per spectrum (Nspec)
+
+        Raises:
+            ValueError: _description_
+
+        Returns:
+            array: IP applied spectra (Nspec, Nnu)
+        """
+        if self.convolution_method == self.convolution_method_list[0]:  # "exojax.signal.convolve"
+            return ipgauss_batch(spectra, self.vrarray, standard_deviation)
+        elif self.convolution_method == self.convolution_method_list[1]:  # "exojax.signal.olaconv"
+            folded_spectra = self.fold_spectra_ola(spectra)
+            return ipgauss_ola_batch(folded_spectra, self.vrarray, standard_deviation)[:, :spectra.shape[-1]]
+        else:
+            raise ValueError("No convolution_method.")
+
+    def ipgauss_variable_sampling(self, spectrum, standard_deviation_variable, radial_velocity, nu_grid_sampling):
+        """Gaussian Instrumental Profile varying along the instrumental wavenumber grid + sampling (e.g. echelle spectrographs)
+
+        Args:
+            spectrum (nd array): 1D spectrum
+            standard_deviation_variable (1D array): standard deviation of Gaussian in km/s at each nu_grid_sampling
+            radial_velocity (float): radial velocity in km/s
+            nu_grid_sampling (array): instrumental wavenumber grid
+
+        Returns:
+            array: IP applied and sampled spectrum
+
+        Notes:
+            The kernel is evaluated within +/- vrmax around the kernel center, as for ipgauss.
+        """
+        nhalf = int((len(self.vrarray) - 1) / 2)
+        return ipgauss_variable_sampling_banded(nu_grid_sampling, self.nu_grid, spectrum, standard_deviation_variable, radial_velocity, nhalf)
+
     def sampling(self, spectrum, radial_velocity, nu_grid_sampling):
         """sampling to instrumental wavenumber grid (not necessary ESLOG nor ESLIN)
 
@@ -127,3 +270,136 @@ class SopInstProfile(SopCommon):
             array: inst sampled spectrum 
         """
         return sampling(nu_grid_sampling, self.nu_grid, spectrum, radial_velocity)
+
+    def set_resampling(self, nu_grid_sampling, pixel_integration=False):
+        """precomputes the resampling operator from nu_grid to the instrumental wavenumber grid, used in resample
+
+        Args:
+            nu_grid_sampling (array): instrumental wavenumber grid (ascending)
+            pixel_integration (bool, optional): if True, resample averages the spectrum over the instrumental pixels (flux-conserving). Defaults to False (linear interpolation).
+        """
+        self.nu_grid_sampling = nu_grid_sampling
+        self.pixel_integration = pixel_integration
+        self.resampling_positions, self.dlognu = resampling_positions(
+            nu_grid_sampling, self.nu_grid, pixel_integration)
+
+    def resample(self, spectrum, radial_velocity):
+        """sampling to the instrumental wavenumber grid set by set_resampling, using the precomputed operator
+
+        Args:
+            spectrum (nd array): 1D spectrum
+            radial_velocity (float): radial velocity in km/s
+
+        Returns:
+            array: inst sampled spectrum
+
+        Notes:
+            Unlike sampling (jnp.interp), this is a gather with the RV as an index offset on the ESLOG grid (linear interpolation in log wavenumber).
+        """
+        if self.pixel_integration:
+            return sampling_pixel_integration(self.resampling_positions, spectrum, radial_velocity, self.dlognu)
+        return sampling_gather(self.resampling_positions, spectrum, radial_velocity, self.dlognu)
+
+    def resample_multi_rv(self, spectrum, radial_velocities):
+        """sampling of a single spectrum with multiple radial velocities (e.g. multi-epoch data) to the instrumental wavenumber grid set by set_resampling
+
+        Args:
+            spectrum (nd array): 1D spectrum
+            radial_velocities (1D array): radial velocities in km/s (Nrv)
+
+        Returns:
+            array: inst sampled spectra (Nrv, len(nu_grid_sampling))
+        """
+        radial_velocities = jnp.atleast_1d(radial_velocities)
+        if self.pixel_integration:
+            return sampling_pixel_integration_multi_rv(self.resampling_positions, spectrum, radial_velocities, self.dlognu)
+        return sampling_gather_multi_rv(self.resampling_positions, spectrum, radial_velocities, self.dlognu)
+
+    def ipgauss_resample_multi_rv(self, spectrum, standard_deviation, radial_velocities):
+        """Gaussian Instrumental Profile + sampling with multiple radial velocities in one call
+
+        Args:
+            spectrum (nd array): 1D high-resolution spectrum
+            standard_deviation (float): standard deviation of Gaussian in km/s
+            radial_velocities (1D array): radial velocities in km/s (Nrv)
+
+        Returns:
+            array: IP applied and sampled spectra (Nrv, len(nu_grid_sampling))
+
+        Notes:
+            The IP convolution commutes with the Doppler shift on the ESLOG grid, so it is applied once and only the
+            sampling (the shift as an index offset, see resample) is done for each RV. Call set_resampling in advance.
+        """
+        return self.resample_multi_rv(self.ipgauss(spectrum, standard_deviation), radial_velocities)
+
+    def sampling_batch(self, spectra, radial_velocity, nu_grid_sampling):
+        """sampling of multiple spectra to instrumental wavenumber grid (not necessary ESLOG nor ESLIN)
+
+        Args:
+            spectra (nd array): 2D spectra (Nspec, Nnu)
+            radial_velocity (float or 1D array): radial velocity in km/s, common or per spectrum (Nspec)
+            nu_grid_sampling (array): instrumental wavenumber grid
+
+        Returns:
+            array: inst sampled spectra (Nspec, len(nu_grid_sampling))
+        """
+        return sampling_batch(nu_grid_sampling, self.nu_grid, spectra, radial_velocity)
+
+
+class SopRotationInstProfile(SopCommon):
+    """Spectral operator on rotation and Gaussian instrumental profile with a single combined kernel
+    """
+
+    def __init__(self,
+                 nu_grid,
+                 vrmax=100.0,
+                 convolution_method="exojax.signal.convolve",
+                 ola_ndiv=None
+                 ):
+        super().__init__(nu_grid, vrmax, convolution_method, ola_ndiv)
+
+    def rotation_ipgauss(self, spectrum, vsini, u1, u2, standard_deviation):
+        """apply a rigid rotation and Gaussian IP by a single convolution
+
+        Args:
+            spectrum (nd array): 1D spectrum
+            vsini (float): V sini in km/s
+            u1 (float): Limb darkening parameter u1
+            u2 (float): Limb darkening parameter u2
+            standard_deviation (float): standard deviation of Gaussian in km/s
+
+        Raises:
+            ValueError: _description_
+
+        Returns:
+            nd array: rotationally broaden and IP applied spectrum
+
+        Notes:
+            The rotation kernel and Gaussian are convolved on the velocity grid (vrarray), which should cover vsini + a few standard_deviation.
+            This is equivalent to SopRotation.rigid_rotation followed by SopInstProfile.ipgauss except for the edges of the spectrum, at half the cost.
+        """
+        if self.convolution_method == self.convolution_method_list[0]:  # "exojax.signal.convolve"
+            return convolve_rigid_rotation_ipgauss(spectrum, self.vrarray, vsini, u1, u2, standard_deviation)
+        elif self.convolution_method == self.convolution_method_list[1]:  # "exojax.signal.olaconv"
+            folded_spectrum = self.fold_spectra_ola(spectrum)
+            return convolve_rigid_rotation_ipgauss_ola(folded_spectrum, self.vrarray, vsini, u1, u2, standard_deviation)[:len(spectrum)]
+        else:
+            raise ValueError("No convolution_method.")
+
+    def rotation_ipgauss_sampling(self, spectrum, vsini, u1, u2, standard_deviation, radial_velocity, nu_grid_sampling):
+        """apply a rigid rotation and Gaussian IP by a single convolution, and sampling w/ RV to instrumental wavenumber grid
+
+        Args:
+            spectrum (nd array): 1D spectrum
+            vsini (float): V sini in km/s
+            u1 (float): Limb darkening parameter u1
+            u2 (float): Limb darkening parameter u2
+            standard_deviation (float): standard deviation of Gaussian in km/s
+            radial_velocity (float): radial velocity in km/s
+            nu_grid_sampling (array): instrumental wavenumber grid
+
+        Returns:
+            array: inst sampled spectrum
+        """
+        convolved = self.rotation_ipgauss(spectrum, vsini, u1, u2, standard_deviation)
+        return sampling(nu_grid_sampling, self.nu_grid, convolved, radial_velocity)
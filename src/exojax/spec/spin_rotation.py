@@ -3,6 +3,8 @@ import jax.numpy as jnp
 from jax import jit
 from exojax.signal.convolve import convolve_same
 from exojax.signal.ola import olaconv, ola_lengths, generate_zeropad
+from exojax.signal.convolve import convolve_same_batch
+from exojax.signal.ola import olaconv_same_batch
 
 
 @jit
@@ -60,6 +62,122 @@ def convolve_rigid_rotation(F0, vr_array, vsini, u1=0.0, u2=0.0):
     return convolved_signal
 
 
+def rotation_kernel(vr_array, vsini, u1=0.0, u2=0.0):
+    """normalized rotation kernel(s)
+
+    Args:
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s), float or 1D array (Nspec)
+        u1: Limb-darkening coefficient 1, float or 1D array (Nspec)
+        u2: Limb-darkening coefficient 2, float or 1D array (Nspec)
+
+    Returns:
+        normalized kernel (len(vr_array)) if all the parameters are float, otherwise kernels (Nspec, len(vr_array))
+    """
+    x = vr_array / jnp.asarray(vsini)[..., None]
+    x, u1, u2 = jnp.broadcast_arrays(
+        x, jnp.asarray(u1)[..., None], jnp.asarray(u2)[..., None]
+    )
+    kernel = rotkernel(x, u1, u2)
+    return kernel / jnp.sum(kernel, axis=-1, keepdims=True)
+
+
+@jit
+def convolve_rigid_rotation_batch(F0, vr_array, vsini, u1=0.0, u2=0.0):
+    """Apply the Rotation response to multiple spectra at once (batched FFT).
+
+    Args:
+        F0: original spectra (Nspec, Nnu)
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s), float or 1D array (Nspec)
+        u1: Limb-darkening coefficient 1, float or 1D array (Nspec)
+        u2: Limb-darkening coefficient 2, float or 1D array (Nspec)
+
+    Return:
+        response-applied spectra (Nspec, Nnu)
+    """
+    return convolve_same_batch(F0, rotation_kernel(vr_array, vsini, u1, u2))
+
+
+@jit
+def convolve_rigid_rotation_ola_batch(folded_F0, vr_array, vsini, u1=0.0, u2=0.0):
+    """Apply the Rotation response to multiple spectra at once using OLA.
+
+    Args:
+        folded_F0: original spectra folded to (Nspec, ndiv, div_length) form
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s), float or 1D array (Nspec)
+        u1: Limb-darkening coefficient 1, float or 1D array (Nspec)
+        u2: Limb-darkening coefficient 2, float or 1D array (Nspec)
+
+    Return:
+        response-applied spectra (Nspec, ndiv*div_length)
+    """
+    return olaconv_same_batch(folded_F0, rotation_kernel(vr_array, vsini, u1, u2))
+
+
+def rotation_ipgauss_kernel(vr_array, vsini, u1, u2, beta):
+    """normalized combined kernel of the rigid rotation and Gaussian IP on the velocity grid
+
+    Args:
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s)
+        u1: Limb-darkening coefficient 1
+        u2: Limb-darkening coefficient 2
+        beta: STD of a Gaussian broadening (IP+microturbulence) (km/s)
+
+    Returns:
+        normalized kernel (len(vr_array))
+
+    Notes:
+        The combined kernel is truncated at the edges of vr_array, so vr_array should cover vsini + a few beta.
+    """
+    from exojax.spec.response import ipgauss_kernel
+
+    kernel = convolve_same_batch(
+        rotation_kernel(vr_array, vsini, u1, u2), ipgauss_kernel(vr_array, beta)
+    )
+    return kernel / jnp.sum(kernel)
+
+
+@jit
+def convolve_rigid_rotation_ipgauss(F0, vr_array, vsini, u1, u2, beta):
+    """Apply the rigid rotation and Gaussian IP responses to a spectrum F by a single convolution with the combined kernel.
+
+    Args:
+        F0: original spectrum (F0)
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s)
+        u1: Limb-darkening coefficient 1
+        u2: Limb-darkening coefficient 2
+        beta: STD of a Gaussian broadening (IP+microturbulence) (km/s)
+
+    Return:
+        response-applied spectrum (F)
+    """
+    kernel = rotation_ipgauss_kernel(vr_array, vsini, u1, u2, beta)
+    return convolve_same_batch(F0, kernel)
+
+
+@jit
+def convolve_rigid_rotation_ipgauss_ola(folded_F0, vr_array, vsini, u1, u2, beta):
+    """Apply the rigid rotation and Gaussian IP responses to a spectrum F by a single OLA convolution with the combined kernel.
+
+    Args:
+        folded_F0: original spectrum (F0) folded to (ndiv, div_length) form
+        vr_array: fix-sized vr array for kernel, see utils.dvgrid_rigid_rotation
+        vsini: V sini for rotation (km/s)
+        u1: Limb-darkening coefficient 1
+        u2: Limb-darkening coefficient 2
+        beta: STD of a Gaussian broadening (IP+microturbulence) (km/s)
+
+    Return:
+        response-applied spectrum (F)
+    """
+    kernel = rotation_ipgauss_kernel(vr_array, vsini, u1, u2, beta)
+    return olaconv_same_batch(folded_F0[None, ...], kernel)[0]
+
+
 @custom_jvp
 def rotkernel(x, u1, u2):
     """rotation kernel w/ the quadratic limb darkening law, the numerator of (54) in Kawahara+2022
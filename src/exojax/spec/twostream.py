@@ -9,6 +9,8 @@
 
 import jax.numpy as jnp
 from jax.lax import scan
+from jax.lax import associative_scan
+from exojax.utils.jaxstatus import check_jax64bit
 
 
 def solve_fluxadding_twostream(trans_coeff, scat_coeff, reduced_source_function, reflectivity_bottom, source_bottom):
@@ -56,6 +58,62 @@ def solve_fluxadding_twostream(trans_coeff, scat_coeff, reduced_source_function,
     return RS
 
 
+def solve_fluxadding_twostream_parallel(trans_coeff, scat_coeff,
+                                        reduced_source_function,
+                                        reflectivity_bottom, source_bottom):
+    """Two-stream RT solver using flux adding, parallel in layers
+
+    Args:
+        trans_coeff (_type_): Transmission coefficient 
+        scat_coeff (_type_): Scattering coefficient 
+        reduced_source_function :  pi \mathcal{B} (Nlayer, Nnus)
+        reflectivity_bottom (_type_): R^+_N (Nnus)
+        source_bottom (_type_): S^+_N (Nnus)
+
+    Note:
+        The update of the effective reflectivity in solve_fluxadding_twostream, R <- S + T^2 R / (1 - S R), is a Moebius transform,
+        (S + (T^2 - S^2) R)/(1 - S R), i.e. the product of the 2x2 matrices [[T^2 - S^2, S], [-S, 1]]. Given the reflectivities,
+        the update of the effective source is affine. Both are computed by lax.associative_scan,
+        reducing the depth from O(Nlayer) to O(log Nlayer).
+
+    Returns:
+        Effective reflectivity (hat(R^plus)), Effective source (hat(S^plus))
+    """
+    nlayer, _ = trans_coeff.shape
+    pihatB = (1.0 - trans_coeff - scat_coeff)*reduced_source_function
+
+    # bottom reflection
+    Rphat0 = scat_coeff[nlayer-1, :] + trans_coeff[nlayer-1, :]**2 * \
+        reflectivity_bottom/(1.0 - scat_coeff[nlayer-1, :]*reflectivity_bottom)
+    Sphat0 = pihatB[nlayer-1, :] + trans_coeff[nlayer-1, :] * \
+        (source_bottom + pihatB[nlayer-1, :]*reflectivity_bottom) / \
+        (1.0 - scat_coeff[nlayer-1, :]*reflectivity_bottom)
+
+    # from the second bottom layer to the top layer
+    scat_coeff_up = scat_coeff[nlayer-2::-1]
+    trans_coeff_up = trans_coeff[nlayer-2::-1]
+    pihatB_up = pihatB[nlayer-2::-1]
+
+    # the first element maps any (R, 1) to (Rphat0, 1)
+    zeros = jnp.zeros_like(Rphat0)[None, :]
+    ones = jnp.ones_like(Rphat0)[None, :]
+    elems = (jnp.vstack([zeros, trans_coeff_up**2 - scat_coeff_up**2]),
+             jnp.vstack([Rphat0[None, :], scat_coeff_up]),
+             jnp.vstack([zeros, -scat_coeff_up]),
+             jnp.vstack([ones, jnp.ones_like(scat_coeff_up)]))
+    _, p, _, q = associative_scan(_compose_mobius, elems)
+    Rphat = p / q
+
+    Rphat_prev = Rphat[:-1]
+    denom = 1.0 - scat_coeff_up*Rphat_prev
+    alpha = trans_coeff_up/denom
+    beta = pihatB_up + trans_coeff_up*pihatB_up*Rphat_prev/denom
+    _, Sphat = associative_scan(_compose_affine,
+                                (jnp.vstack([zeros, alpha]),
+                                 jnp.vstack([Sphat0[None, :], beta])))
+    return [Rphat[-1], Sphat[-1]]
+
+
 def solve_lart_twostream(diagonal, lower_diagonal, upper_diagonal, vector,
                          flux_bottom):
     """Two-stream RT solver given tridiagonal system components (LART form)
@@ -106,11 +164,81 @@ def solve_lart_twostream(diagonal, lower_diagonal, upper_diagonal, vector,
     That = jnp.insert(jnp.array(That), 0, That0, axis=0)
     Qhat = jnp.insert(jnp.array(Qhat), 0, Qhat0, axis=0)
 
+    return _lart_spectrum(That, Qhat, flux_bottom)
+
+
+def solve_lart_twostream_parallel(diagonal, lower_diagonal, upper_diagonal,
+                                  vector, flux_bottom):
+    """Two-stream RT solver given tridiagonal system components (LART form), parallel in layers
+
+    Args:
+        diagonal (_type_): diagonal component of the tridiagonal system (bn)
+        lower_diagonal (_type_): lower diagonal component of the tridiagonal system (cn)
+        upper_diagonal (_type_): upper diagonal component of the tridiagonal system (an)
+        vector (_type_): right-hand side vector (dn)
+        flux_bottom: bottom flux FB
+
+    Note:
+        The forward sweep of solve_lart_twostream, That_n = a_n / (b_n - c_(n-1) That_(n-1)), is a Moebius transform,
+        i.e. That_n = p_n/q_n with (p_n, q_n) = M_n (p_(n-1), q_(n-1)), M_n = [[0, a_n], [-c_(n-1), b_n]].
+        The products of M_n are computed by lax.associative_scan (normalized to avoid overflow, which does not change p/q).
+        Then, Qhat_n = (d_n + c_(n-1) Qhat_(n-1))/gamma_n is an affine recurrence, also solved by associative_scan.
+        The depth of the computation is O(log Nlayer) instead of O(Nlayer).
+        The cumulative products of M_n approach rank one, so p/q loses precision in 32bit mode (errors of order unity for ~100 layers).
+        Therefore, this solver requires the 64bit mode of JAX. Use solve_lart_twostream in 32bit mode.
+
+    Raises:
+        ValueError: JAX is in 32bit mode
+
+    Returns:
+        _type_: cumlative hat{T}, hat{Q}, spectrum
+    """
+    check_jax64bit(allow_32bit=False)
+    zeros = jnp.zeros_like(diagonal[0:1, :])
+    lower_diagonal_prev = jnp.vstack([zeros, lower_diagonal[:-1, :]])  # c_(n-1)
+
+    # second columns of the cumulative products of M_n, i.e. M_n...M_0 (0,1)^T
+    elems = (jnp.zeros_like(diagonal), upper_diagonal, -lower_diagonal_prev,
+             diagonal)
+    _, p, _, q = associative_scan(_compose_mobius, elems)
+    That = p / q
+
+    That_prev = jnp.vstack([zeros, That[:-1, :]])
+    gamma = diagonal - lower_diagonal_prev * That_prev
+    _, Qhat = associative_scan(_compose_affine,
+                               (lower_diagonal_prev / gamma, vector / gamma))
+
+    return _lart_spectrum(That, Qhat, flux_bottom)
+
+
+def _compose_mobius(earlier, later):
+    """product (later @ earlier) of 2x2 matrices given as (m00, m01, m10, m11), normalized by the max abs element"""
+    a00, a01, a10, a11 = earlier
+    b00, b01, b10, b11 = later
+    c00 = b00 * a00 + b01 * a10
+    c01 = b00 * a01 + b01 * a11
+    c10 = b10 * a00 + b11 * a10
+    c11 = b10 * a01 + b11 * a11
+    norm = jnp.maximum(jnp.maximum(jnp.abs(c00), jnp.abs(c01)),
+                       jnp.maximum(jnp.abs(c10), jnp.abs(c11)))
+    norm = jnp.where(norm > 0.0, norm, 1.0)
+    return c00 / norm, c01 / norm, c10 / norm, c11 / norm
+
+
+def _compose_affine(earlier, later):
+    """composition of affine maps x -> alpha x + beta given as (alpha, beta)"""
+    alpha1, beta1 = earlier
+    alpha2, beta2 = later
+    return alpha2 * alpha1, alpha2 * beta1 + beta2
+
+
+def _lart_spectrum(That, Qhat, flux_bottom):
+    """cumulative hat{T}, hat{Q} with the bottom flux, and spectrum"""
+    Nnus = That.shape[1]
     # (no)surface term
     Qhat = jnp.vstack([Qhat, flux_bottom])
     cumThat = jnp.cumprod(jnp.vstack([jnp.ones(Nnus), That]), axis=0)
     spectrum = jnp.nansum(cumThat * Qhat, axis=0)
-
     return cumThat, Qhat, spectrum
 
 
@@ -38,3 +38,59 @@ def E1(x):
         (x4+C1*x3+C2*x2+C3*x+C4)
     ep = jnp.where(x <= 1.0, ep1A, ep1B)
     return ep
+
+
+@jit
+def E2(x):
+    """exponential integral of the second order, E2, derived from E1 by the
+    recurrence E2(x) = exp(-x) - x E1(x).
+
+    Note:
+        E2(0) = 1. The input is clipped at x = 1000, above which E2 is zero in float64.
+
+    Args:
+       x: input (x >= 0)
+
+    Returns:
+       The exponential integral of the second order, E2(x)
+    """
+    xc = jnp.clip(x, 0.0, 1.0e3)
+    xsafe = jnp.where(xc > 0.0, xc, 1.0)
+    xE1 = jnp.where(xc > 0.0, xsafe * E1(xsafe), 0.0)
+    return jnp.exp(-xc) - xE1
+
+
+@jit
+def E3(x):
+    """exponential integral of the third order, E3, derived from E2 by the
+    recurrence E3(x) = (exp(-x) - x E2(x))/2.
+
+    Note:
+        E3(0) = 1/2. The input is clipped at x = 1000, above which E3 is zero in float64.
+
+    Args:
+       x: input (x >= 0)
+
+    Returns:
+       The exponential integral of the third order, E3(x)
+    """
+    xc = jnp.clip(x, 0.0, 1.0e3)
+    return 0.5 * (jnp.exp(-xc) - xc * E2(xc))
+
+
+@jit
+def E4(x):
+    """exponential integral of the fourth order, E4, derived from E3 by the
+    recurrence E4(x) = (exp(-x) - x E3(x))/3.
+
+    Note:
+        E4(0) = 1/3. The input is clipped at x = 1000, above which E4 is zero in float64.
+
+    Args:
+       x: input (x >= 0)
+
+    Returns:
+       The exponential integral of the fourth order, E4(x)
+    """
+    xc = jnp.clip(x, 0.0, 1.0e3)
+    return (jnp.exp(-xc) - xc * E3(xc)) / 3.0
@@ -4,7 +4,10 @@ import pickle
 import pkg_resources
 import os
 import shutil
+from types import SimpleNamespace
+import numpy as np
 from exojax.spec import api
+from exojax.spec import atomllapi
 from exojax.test.data import TESTDATA_moldb_VALD
 from exojax.utils.grids import wavenumber_grid
 
@@ -43,8 +46,13 @@ def mock_wavenumber_grid():
     return nus, wav, res
 
 
-def mock_mdbExomol(crit=0.):
+def mock_mdbExomol(crit=0., gpu_transfer=True):
     """default mock mdb of the ExoMol form for unit test   
+
+    Args:
+        crit: line strength lower limit for extraction
+        gpu_transfer: gpu_transfer option of mdb, True, False, or "lazy"
+
     Returns:
         mdbExomol instance  
     """
@@ -59,15 +67,16 @@ def mock_mdbExomol(crit=0.):
                         nus,
                         crit=crit,
                         inherit_dataframe=True,
-                        gpu_transfer=True)
+                        gpu_transfer=gpu_transfer)
     return mdb
 
 
-def mock_mdbHitemp(multi_isotope=False):
+def mock_mdbHitemp(multi_isotope=False, gpu_transfer=True):
     """default mock mdb of the Hitemp form for unit test   
     
     Args:
         multi isotope: if True, use multi isotope mdb
+        gpu_transfer: gpu_transfer option of mdb, True, False, or "lazy"
     
     Returns:
         mdbHitemp instance  
@@ -86,7 +95,7 @@ def mock_mdbHitemp(multi_isotope=False):
                         isotope=isotope,
                         parfile=parfile,
                         inherit_dataframe=True,
-                        gpu_transfer=True)
+                        gpu_transfer=gpu_transfer)
     return mdb
 
 
@@ -102,6 +111,69 @@ def mock_mdbVALD():
     return mdb
 
 
+def mock_adbVALD_synthetic(nu_grid,
+                           shuffle=False,
+                           gamRad_range=None,
+                           vdWdamp_unsoeld=False):
+    """synthetic atomic database in the VALD form for unit test, without the line list file
+
+    Notes:
+        48 lines of Fe I (40), Na I (3), and Ti II (5) are randomly placed within nu_grid.
+        The instance has the attributes of AdbVald used by AdbSepVald, AdbRaggedVald, and OpaPremoditVald.
+
+    Args:
+        nu_grid: wavenumber grid (cm-1)
+        shuffle: if True, the lines of the species are mixed in the order
+        gamRad_range: if given, [min, max] of the uniform random gamRad, otherwise gamRad = 8.0
+        vdWdamp_unsoeld: if True, half of the lines have vdWdamp = 0, i.e. the Unsoeld approximation, otherwise vdWdamp = -7.5 (Barklem)
+
+    Returns:
+        SimpleNamespace instance of the synthetic adb
+    """
+    np.random.seed(1)
+    nlines = [40, 3, 5]  # Fe I dominates, Na I and Ti II are traces
+    species = [(26, 1, 55.847), (11, 1, 22.98981), (22, 2, 47.9)]
+    ielem = np.concatenate([[sp[0]] * n for sp, n in zip(species, nlines)])
+    iion = np.concatenate([[sp[1]] * n for sp, n in zip(species, nlines)])
+    mass = np.concatenate([[sp[2]] * n for sp, n in zip(species, nlines)])
+    nline = len(ielem)
+    if shuffle:
+        order = np.random.permutation(nline)
+        ielem, iion, mass = ielem[order], iion[order], mass[order]
+    pfTdat, pfdat = atomllapi.load_pf_Barklem2016()
+    T_gQT = np.array(pfTdat.columns[1:], dtype=float)
+    gQT_284species = pfdat.iloc[:, 1:].to_numpy(dtype=float)
+    QT_table_284 = atomllapi.make_QT_table_284(T_gQT, gQT_284species)
+    nu_lines = np.random.uniform(nu_grid[10], nu_grid[-10], nline)
+    logsij0 = np.log(10**np.random.uniform(-22, -20, nline))
+    elower = np.random.uniform(0.0, 20000.0, nline)
+    eupper = np.random.uniform(25000.0, 40000.0, nline)
+    if gamRad_range is None:
+        gamRad = np.full(nline, 8.0)
+    else:
+        gamRad = np.random.uniform(gamRad_range[0], gamRad_range[1], nline)
+    if vdWdamp_unsoeld:
+        vdWdamp = np.where(np.arange(nline) % 2 == 0, -7.5, 0.0)
+    else:
+        vdWdamp = np.full(nline, -7.5)
+    return SimpleNamespace(ielem=ielem,
+                           iion=iion,
+                           atomicmass=mass,
+                           nu_lines=nu_lines,
+                           QTmask=atomllapi.QTmask_lines(ielem, iion, pfdat),
+                           ionE=np.full(nline, 7.0),
+                           logsij0=logsij0,
+                           elower=elower,
+                           eupper=eupper,
+                           gamRad=gamRad,
+                           gamSta=np.full(nline, -6.0),
+                           vdWdamp=vdWdamp,
+                           QTref_284=QT_table_284[2][:, 295],
+                           gQT_284species=gQT_284species,
+                           T_gQT=T_gQT,
+                           QT_table_284=QT_table_284)
+
+
 #if __name__ == "__main__":
 #    mdb = mock_mdbExomol()
 #    mdb = mock_mdbHitemp()
@@ -1,6 +1,8 @@
 """multi d interpolation
 """
 
+import numpy as np
+import jax.numpy as jnp
 from exojax.utils.indexing import getix
 
 
@@ -26,3 +28,77 @@ def interp2d_bilinear(x, y, xp, yp, fp):
         + cx * cy * fp[ix + 1, iy + 1]
     )
     return val
+
+
+def cubic_loglog_uniform_table(xp, fp, dx=1.0):
+    """tabulates fp(xp) on a uniform x grid using a cubic spline in log-log space
+
+    Args:
+        xp (1D or 2D array): x grid(s), shape = (N,) or (M,N). Each row should be non-decreasing. Repeated x values at the tail (padding) are allowed.
+        fp (1D or 2D array): values at xp, same shape as xp
+        dx (float, optional): spacing of the uniform grid. Defaults to 1.0.
+
+    Notes:
+        The uniform grid starts at the smallest multiple of dx not below min(xp) and ends at max(xp).
+        The spline is cubic in (log x, log f) when xp and fp are positive, otherwise cubic in (x, f).
+        Beyond the range of each row, the table is clamped to the end values, as jnp.interp does.
+        The original values are kept exactly at the nodes of xp that fall on the uniform grid.
+
+    Returns:
+        float, float, nd array: x0 (start of the uniform grid), dx, table (shape = (Nx,) or (M,Nx))
+    """
+    from scipy.interpolate import CubicSpline
+
+    xp = np.atleast_2d(np.asarray(xp, dtype=np.float64))
+    fp_arr = np.asarray(fp, dtype=np.float64)
+    squeeze = fp_arr.ndim == 1
+    fp_arr = np.atleast_2d(fp_arr)
+    xp = np.broadcast_to(xp, fp_arr.shape)
+
+    x0 = dx * np.ceil(np.min(xp) / dx)
+    nx = int(np.floor((np.max(xp) - x0) / dx + 1.0e-8)) + 1
+    xgrid = x0 + dx * np.arange(nx)
+    table = np.empty((fp_arr.shape[0], nx))
+    for k, (xrow, frow) in enumerate(zip(xp, fp_arr)):
+        xrow, iuniq = np.unique(xrow, return_index=True)
+        frow = frow[iuniq]
+        xeval = np.clip(xgrid, xrow[0], xrow[-1])
+        if len(xrow) < 3:
+            table[k] = np.interp(xeval, xrow, frow)
+        elif np.all(xrow > 0.0) and np.all(frow > 0.0):
+            spline = CubicSpline(np.log(xrow), np.log(frow))
+            table[k] = np.exp(spline(np.log(xeval)))
+        else:
+            table[k] = CubicSpline(xrow, frow)(xeval)
+        # keeps the tabulated values exactly at the nodes
+        t = (xrow - x0) / dx
+        on_grid = (np.abs(t - np.round(t)) < 1.0e-8) & (t > -0.5) & (t < nx - 0.5)
+        table[k, np.round(t[on_grid]).astype(int)] = frow[on_grid]
+        table[k, xgrid < xrow[0]] = frow[0]
+        table[k, xgrid > xrow[-1]] = frow[-1]
+
+    if squeeze:
+        table = table[0]
+    return x0, dx, table
+
+
+def interp_uniform(x, x0, dx, fp):
+    """linear interpolation on a uniform grid by direct indexing (no search)
+
+    Args:
+        x (float or nD array): x (or x array) you want know the value
+        x0 (float): start of the uniform grid
+        dx (float): spacing of the uniform grid
+        fp (1D or 2D array): value table, shape = (N,) or (M,N)
+
+    Notes:
+        x outside the grid is clamped to the end values, as jnp.interp does.
+
+    Returns:
+        float or nD array: interpolated value(s), shape = x.shape or (M,)+x.shape
+    """
+    n = fp.shape[-1]
+    t = jnp.clip((x - x0) / dx, 0.0, n - 1)
+    i = jnp.clip(jnp.floor(t).astype(int), 0, n - 2)
+    w = t - i
+    return fp[..., i] * (1.0 - w) + fp[..., i + 1] * w
@@ -0,0 +1,48 @@
+"""Benchmark for OLA convolution (olaconv) compared with np_olaconv and convolve_same
+"""
+import time
+import numpy as np
+import jax.numpy as jnp
+from jax import jit
+from exojax.signal.ola import olaconv, generate_zeropad, np_olaconv
+from exojax.signal.ola import optimal_fft_length
+from exojax.signal.convolve import convolve_same
+
+
+def _timeit(func, Nc):
+    func().block_until_ready()  # compile
+    a = []
+    for i in range(0, Nc):
+        ts = time.time()
+        func().block_until_ready()
+        a.append(time.time() - ts)
+    a = np.array(a)
+    return np.mean(a), np.std(a)
+
+
+def bm(Nx, Nf, Nc=100):
+    np.random.seed(1)
+    g = np.linspace(-3, 3, Nf)
+    f = np.exp(-g * g / 2.0) / np.sqrt(2 * np.pi)
+    div_length = optimal_fft_length(Nf) - Nf + 1
+    ndiv = -(-Nx // div_length)
+    x = np.random.rand(ndiv * div_length)
+    xarr = x.reshape(ndiv, div_length)
+
+    xarr_hat, f_hat = generate_zeropad(jnp.array(xarr), jnp.array(f))
+    t_ola = _timeit(lambda: olaconv(xarr_hat, f_hat, ndiv, div_length, Nf), Nc)
+    conv = jit(convolve_same)
+    xj = jnp.array(x)
+    fj = jnp.array(f)
+    t_conv = _timeit(lambda: conv(xj, fj), Nc)
+    ts = time.time()
+    for i in range(0, Nc):
+        np_olaconv(xarr, f)
+    t_np = ((time.time() - ts) / Nc, 0.0)
+    print(Nx, ",", Nf, ",", t_ola[0], ",", t_conv[0], ",", t_np[0])
+
+
+if __name__ == "__main__":
+    print("Nx,Nf,t_olaconv_s,t_convolve_same_s,t_np_olaconv_s")
+    for Nx in [10**4, 10**5, 10**6]:
+        bm(Nx, 301)
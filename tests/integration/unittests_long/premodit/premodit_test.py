@@ -21,6 +21,7 @@ from exojax.spec.premodit import unbiased_lsd_zeroth
 from exojax.spec.premodit import unbiased_lsd_first
 from exojax.spec.premodit import unbiased_lsd_second
 from exojax.spec.premodit import reference_temperature_broadening_at_midpoint
+from exojax.spec.premodit import sum_isotopes_lsd
 
 
 def test_compute_dElower():
@@ -188,6 +189,31 @@ def test_unbiased_lsd():
     #print(np.sum(lsd))
     assert np.sum(lsd) == pytest.approx(ref[2])
 
+def test_unbiased_lsd_multi_isotope():
+    from jax import config
+    config.update("jax_enable_x64", True)
+
+    lbd_zeroth, lbd_first, lbd_second, nu_grid, elower_grid, qt = _example_lbd(
+    )
+    T = 1000.0
+    Tref = 500.0
+    lsd = unbiased_lsd_zeroth(lbd_zeroth, T, Tref, nu_grid, elower_grid, qt)
+    # two isotope slices stacked along the broadening axis
+    lbd_multi = np.concatenate([lbd_zeroth, lbd_zeroth], axis=1)
+    qt_isotopes = np.array([2.0, 4.0])
+    lsd_multi = unbiased_lsd_zeroth(lbd_multi, T, Tref, nu_grid, elower_grid,
+                                    qt_isotopes)
+    assert lsd_multi.shape == lsd.shape
+    assert np.sum(lsd_multi) == pytest.approx(np.sum(lsd) * (1.0 / 2.0 + 1.0 / 4.0))
+
+
+def test_sum_isotopes_lsd():
+    Slsd = np.arange(12.0).reshape((2, 6))
+    assert np.all(sum_isotopes_lsd(Slsd, 1.0) == Slsd)
+    summed = sum_isotopes_lsd(Slsd, np.array([1.0, 2.0]))
+    assert np.all(summed == Slsd[:, 0:3] + Slsd[:, 3:6] / 2.0)
+
+
 @pytest.mark.parametrize("db", ["exomol","hitemp"])
 def test_broadpar_grid_as_a_function_of_Tref_broadening(db):
     """ comparison of non-optimized and optimized broadening parameter grid in PreMODIT #366 
@@ -0,0 +1,72 @@
+"""test for the species/partition function lookups in atomll."""
+
+import pytest
+from types import SimpleNamespace
+import numpy as np
+import jax.numpy as jnp
+from jax import vmap
+from exojax.spec import atomll
+from exojax.spec import atomllapi
+from exojax.utils.interp import interp_uniform
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def test_get_unique_species_keeps_first_appearance():
+    adb = SimpleNamespace(ielem=np.array([26, 11, 26, 22, 11, 26]),
+                          iion=np.array([1, 1, 2, 2, 1, 1]))
+    uspecies = atomll.get_unique_species(adb)
+    assert np.all(np.asarray(uspecies) == [[26, 1], [11, 1], [26, 2], [22, 2]])
+    species_index = atomll.species_index_lines(adb.ielem, adb.iion, uspecies)
+    assert np.all(species_index == [0, 1, 2, 3, 1, 0])
+
+
+def test_interp_QT284():
+    pfTdat, pfdat = atomllapi.load_pf_Barklem2016()
+    T_gQT = np.array(pfTdat.columns[1:], dtype=float)
+    gQT_284species = pfdat.iloc[:, 1:].to_numpy(dtype=float)
+    Tarr = jnp.array([1.e-3, 150.0, 3456.7, 1.e4, 1.e6])
+    QT = vmap(atomll.interp_QT284, (0, None, None))(Tarr, T_gQT, gQT_284species)
+    T0, dT, QT_table = atomllapi.make_QT_table_284(T_gQT, gQT_284species)
+    ref = interp_uniform(Tarr, T0, dT, jnp.asarray(QT_table)).T
+    assert QT.shape == (len(Tarr), 284)
+    assert np.allclose(QT, ref, rtol=1.e-12)
+    # clamped to the end values outside the grid, as np.interp
+    assert np.allclose(QT[0], gQT_284species[:, 0], rtol=1.e-12)
+    assert np.allclose(QT[-1], gQT_284species[:, -1], rtol=1.e-12)
+    # exact on the nodes of the grid
+    nodes = (T_gQT >= dT) & (np.mod(T_gQT, dT) == 0.0)
+    QT_nodes = vmap(atomll.interp_QT284, (0, None, None))(jnp.array(T_gQT[nodes]), T_gQT, gQT_284species)
+    assert np.allclose(QT_nodes, gQT_284species[:, nodes].T, rtol=1.e-12)
+
+
+def test_get_VMR_uspecies():
+    uspecies = jnp.array([[26, 1], [11, 1], [26, 2]])
+    VMR = atomll.get_VMR_uspecies(uspecies)
+    assert VMR[2] == VMR[0] * 1.e-10
+    mods_ID = jnp.array([[26, 1], [11, 1]])
+    mods = jnp.array([0.5, -1.0])
+    VMR_mod = atomll.get_VMR_uspecies(uspecies, mods_ID, mods)
+    assert np.allclose(VMR_mod, VMR * 10**jnp.array([0.5, -1.0, 0.0]))
+    # callable under vmap, e.g. the abundance deviation of each layer
+    VMR_layers = vmap(atomll.get_VMR_uspecies, (None, None, 0))(
+        uspecies, mods_ID, jnp.array([[0.5, -1.0], [0.0, 0.0]]))
+    assert np.allclose(VMR_layers[0], VMR_mod)
+    assert np.allclose(VMR_layers[1], VMR)
+
+
+def test_uspecies_info():
+    uspecies = jnp.array([[26, 1], [11, 1], [26, 2]])
+    MMR, mass, mods_uspecies = atomll.uspecies_info(
+        uspecies, atomllapi.ielem_to_index_of_ipccd,
+        mods=jnp.array([0.3]), mods_id_trans=jnp.array([2]))
+    assert np.allclose(mass, [55.847, 22.98981, 55.847], rtol=1.e-3)
+    assert MMR[0] == MMR[2]
+    assert np.all(mods_uspecies == jnp.array([0.0, 0.0, 0.3]))
+    _, _, mods_default = atomll.uspecies_info(uspecies, atomllapi.ielem_to_index_of_ipccd)
+    assert np.all(mods_default == 0.0)
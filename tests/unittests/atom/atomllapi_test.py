@@ -0,0 +1,100 @@
+"""test for atomllapi (line list parsing and atomic data lookups)."""
+
+import numpy as np
+import pytest
+from exojax.spec import atomllapi
+
+
+def _write_kurucz_sample(path):
+    # wl(nm, air) loggf species elower(cm-1) jlower eupper(cm-1) jupper gamRad gamSta gamvdW
+    rows = [
+        (500.1234, -1.234, 26.00, 1000.0, 2.0, 21000.0, 3.0, 8.23, -6.01, -7.57),
+        (450.5000, -0.500, 26.01, 30000.0, 4.5, 5000.0, 3.5, 7.50, -5.50, -7.80),
+        (180.0000, 0.100, 11.00, 0.0, 0.5, 55555.0, 1.5, 7.00, -5.00, -7.00),
+    ]
+    with open(path, "w") as f:
+        for r in rows:
+            f.write("%11.4f%7.3f%6.2f%12.3f%5.1f %-10s%12.3f%5.1f %-10s%6.2f%6.2f%6.2fK94\n"
+                    % (r[0], r[1], r[2], r[3], r[4], "lowlabel", r[5], r[6], "uplabel", r[7], r[8], r[9]))
+
+
+def test_read_kurucz_and_hdf5_cache(tmp_path):
+    kuruczf = tmp_path / "gfsample.all"
+    _write_kurucz_sample(kuruczf)
+    A, nu_lines, elower, eupper, gupper, jlower, jupper, ielem, iion, gamRad, gamSta, gamvdW = atomllapi.read_kurucz(
+        kuruczf)
+    # lines are reversed into the wavenumber order
+    assert np.all(ielem == np.array([11, 26, 26]))
+    assert np.all(iion == np.array([1, 2, 1]))
+    assert nu_lines[0] == pytest.approx(1.e8 / 1800.0)  # vacuum for < 200 nm
+    # elower and eupper are swapped if eupper < elower
+    assert elower[1] == 5000.0 and eupper[1] == 30000.0
+    assert jlower[1] == 3.5 and gupper[1] == 10.0
+    assert gamvdW[2] == -7.57
+
+    # read_kurucz itself does not write the cache
+    assert not kuruczf.with_suffix(".hdf5").exists()
+    atomllapi.save_kurucz_hdf5(kuruczf.with_suffix(".hdf5"), (A, nu_lines, elower, eupper,
+                               gupper, jlower, jupper, ielem, iion, gamRad, gamSta, gamvdW))
+    cached = atomllapi.load_kurucz_hdf5(kuruczf.with_suffix(".hdf5"))
+    for arr, arr_cached in zip((A, nu_lines, elower, ielem, iion, gamvdW), np.array(cached, dtype=object)[[0, 1, 2, 7, 8, 11]]):
+        assert np.array_equal(arr, arr_cached)
+
+
+def test_adbkurucz_regenerates_stale_hdf5_cache(tmp_path):
+    import os
+    from exojax.spec.moldb import AdbKurucz
+    kuruczf = tmp_path / "gfsample.all"
+    _write_kurucz_sample(kuruczf)
+    adb = AdbKurucz(kuruczf, gpu_transfer=False)
+    assert kuruczf.with_suffix(".hdf5").exists()
+    assert len(adb.nu_lines) == 3
+
+    # the line list updated after the cache was made
+    with open(kuruczf) as f:
+        lines = f.readlines()
+    with open(kuruczf, "w") as f:
+        f.writelines(lines[:2])
+    mtime = kuruczf.with_suffix(".hdf5").stat().st_mtime + 10.0
+    os.utime(kuruczf, (mtime, mtime))
+    adb = AdbKurucz(kuruczf, gpu_transfer=False)
+    assert len(adb.nu_lines) == 2
+    # the regenerated cache is used from the next time
+    adb = AdbKurucz(kuruczf, gpu_transfer=False)
+    assert len(adb.nu_lines) == 2
+
+
+def test_QTmask_lines():
+    _, pfdat = atomllapi.load_pf_Barklem2016()
+    ielem = np.array([26, 26, 1, 26, 11])
+    iion = np.array([1, 2, 1, 1, 1])
+    QTmask = atomllapi.QTmask_lines(ielem, iion, pfdat)
+    names = pfdat["T[K]"].to_numpy()[QTmask]
+    assert list(names) == ["Fe_I", "Fe_II", "H_I", "Fe_I", "Na_I"]
+    assert QTmask[0] == 76
+
+
+def test_atomic_data_and_ionE_lines():
+    ielem = np.array([26, 1, 26])
+    iion = np.array([1, 1, 2])
+    assert np.allclose(atomllapi.atomic_data_lines(ielem, "mass"), [55.847, 1.008, 55.847])
+    assert np.allclose(atomllapi.atomic_data_lines(ielem, "solarA"), [-4.5, 0.0, -4.5])
+    ionE = atomllapi.ionE_lines(ielem, iion)
+    assert np.allclose(ionE, [7.9024681, 13.598434599702, 16.19921])
+
+
+def test_make_QT_table_284():
+    pfTdat, pfdat = atomllapi.load_pf_Barklem2016()
+    T_gQT = np.array(pfTdat.columns[1:], dtype=float)
+    gQT_284species = pfdat.iloc[:, 1:].to_numpy(dtype=float)
+    T0, dT, table = atomllapi.make_QT_table_284(T_gQT, gQT_284species)
+    assert table.shape == (284, int(T_gQT[-1] - T0) + 1)
+    # the original values are kept at the nodes on the uniform grid
+    inode = np.searchsorted(T_gQT, 1000.0)
+    assert np.array_equal(table[:, int(1000.0 - T0)], gQT_284species[:, inode])
+
+
+if __name__ == "__main__":
+    test_QTmask_lines()
+    test_atomic_data_and_ionE_lines()
+
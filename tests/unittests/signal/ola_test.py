@@ -1,5 +1,6 @@
 """Overlap-add convolve
 """
+import pytest
 from scipy.signal import oaconvolve
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,10 +8,16 @@ from exojax.signal.ola import olaconv, ola_lengths, generate_zeropad
 from exojax.signal.ola import generate_padding_matrix
 from exojax.signal.ola import np_olaconv
 from exojax.signal.ola import optimal_fft_length
+from exojax.signal.ola import overlap_and_add
 import jax.numpy as jnp
 from jax import config
+from jax.experimental import enable_x64
 
-config.update('jax_enable_x64', True)
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
 
 
 def test_optimal_div_length(fig=False):
@@ -142,7 +149,31 @@ def test_np_olaconv(fig=False):
         plt.show()
 
 
+def test_overlap_and_add_long_filter():
+    # fft_length > 2 div_length, i.e. each block overlaps with more than the next block
+    np.random.seed(2)
+    ndiv, div_length, filter_length = 7, 10, 25
+    fft_length = div_length + filter_length - 1
+    ftarr = np.random.rand(ndiv, fft_length)
+    output_length = ndiv * div_length + filter_length - 1
+    y = np.zeros(output_length)
+    for idiv in range(ndiv):
+        y[idiv * div_length:idiv * div_length + fft_length] += ftarr[idiv, :]
+    assert np.allclose(overlap_and_add(jnp.array(ftarr), output_length, div_length), y)
+
+
+def test_olaconv_odd_fft_length():
+    np.random.seed(3)
+    ndiv, div_length, filter_length = 5, 835, 111  # fft_length = 945
+    x = np.random.rand(ndiv * div_length)
+    f = np.random.rand(filter_length)
+    xarr_hat, f_hat = generate_zeropad(jnp.array(x.reshape(ndiv, div_length)), jnp.array(f))
+    ola = olaconv(xarr_hat, f_hat, ndiv, div_length, filter_length)
+    assert np.allclose(ola, oaconvolve(x, f))
+
+
 if __name__ == "__main__":
+    config.update("jax_enable_x64", True)
     #test_generate_padding_matrix()
     test_generate_padding_matrix_lbdlike()
     #test_generate_zeropad()
@@ -1,12 +1,20 @@
 from exojax.spec.api import _convert_proper_isotope
 from exojax.spec.api import _isotope_index_from_isotope_number
-from exojax.spec.api import _QT_interp
-from exojax.spec.api import _qr_interp
-from exojax.spec.api import _qr_interp_lines
 from exojax.test.emulate_mdb import mock_mdbHitemp
+from exojax.test.emulate_mdb import mock_mdbExomol
+from exojax.test.emulate_mdb import mock_wavenumber_grid
+from exojax.spec.api import MdbSnapshot
 from exojax.utils.constants import Tref_original
 import numpy as np
 import pytest
+from jax import config
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
 
 
 def test__convert_proper_isotope():
@@ -21,30 +29,43 @@ def test__isotope_index_from_isotope_number():
     assert _isotope_index_from_isotope_number(6, uniqiso) == 4
 
 
-def test__QT_interp():
+def test_QT_interp():
     mdb = mock_mdbHitemp(multi_isotope=True)
-    T = 1000.0
-    isotope_index = _isotope_index_from_isotope_number(1, mdb.uniqiso)
-    QT = _QT_interp(isotope_index, T, mdb.T_gQT, mdb.gQT)
-    assert QT == pytest.approx(380.297)
+    QT = mdb.QT_interp(1, 1000.0)
+    assert QT == pytest.approx(380.297)  # on the node
 
 
-def test__qr_interp():
+def test_qr_interp():
     mdb = mock_mdbHitemp(multi_isotope=True)
-    T = 1000.0
-    isotope_index = _isotope_index_from_isotope_number(1, mdb.uniqiso)
-    qr = _qr_interp(isotope_index, T, mdb.T_gQT, mdb.gQT, Tref_original)
-    assert qr == pytest.approx(3.5402815)
+    qr = mdb.qr_interp(1, 1000.0)
+    assert qr == pytest.approx(3.5402876)
 
 
-def test__qr_interp_lines():
+def test_qr_interp_lines():
     mdb = mock_mdbHitemp(multi_isotope=True)
-    T = 1000.0
-    val = np.mean(
-        _qr_interp_lines(T, mdb.isoid, mdb.uniqiso, mdb.T_gQT, mdb.gQT,
-                         Tref_original))
-    print(val)
-    assert val == pytest.approx(3.553517)
+    val = np.mean(mdb.qr_interp_lines(1000.0))
+    assert val == pytest.approx(3.5535236)
+
+
+def test_qr_interp_isotopes():
+    mdb = mock_mdbHitemp(multi_isotope=True)
+    Tarr = np.array([500.0, 1000.0, 1500.0])
+    qr = mdb.qr_interp_isotopes(Tarr)
+    assert qr.shape == (len(Tarr), len(mdb.uniqiso))
+    for i, isotope in enumerate(mdb.uniqiso):
+        assert np.allclose(qr[:, i], mdb.qr_interp(isotope, Tarr))
+    assert np.allclose(mdb.qr_interp_lines(1000.0), qr[1, mdb.isoid - 1])
+
+
+def test_partition_function_table():
+    mdb = mock_mdbHitemp(multi_isotope=True)
+    Tarr = np.array([500.0, 1000.0, 1500.0])
+    qr = mdb.qr_interp_isotopes(Tarr)
+    # the table is close to the linear interpolation of the original grid
+    for i in range(len(mdb.uniqiso)):
+        QT = np.interp(Tarr, mdb.T_gQT[i], mdb.gQT[i])
+        QTref = np.interp(Tref_original, mdb.T_gQT[i], mdb.gQT[i])
+        assert np.allclose(qr[:, i], QT / QTref, rtol=1.0e-4)
 
 
 def test__exact_isotope_name():
@@ -58,10 +79,147 @@ def test_molmass():
     #assert mdb.exact_isotope_name(1) == "(12C)(16O)"
 
 
+@pytest.mark.parametrize("db", ["exomol", "hitemp"])
+def test_lazy_device_transfer(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    if db == "exomol":
+        mdb = mock_mdbExomol(gpu_transfer="lazy")
+    else:
+        mdb = mock_mdbHitemp(gpu_transfer="lazy")
+    assert not hasattr(mdb, "dev_nu_lines")
+    resident = mdb.resident_bytes()
+    assert resident["elower"]["device"] == 0
+    assert resident["elower"]["host"] == mdb.elower.nbytes
+
+    mdb.to_device(fields=["nu_lines", "elower"])
+    resident = mdb.resident_bytes()
+    assert resident["elower"]["host"] == 0
+    assert resident["dev_nu_lines"]["device"] > 0
+    assert resident["A"]["device"] == 0
+
+    mdb.release_host()
+    assert not hasattr(mdb, "df")
+    # host nu_lines is a duplicate of dev_nu_lines
+    assert "nu_lines" not in mdb.resident_bytes()
+    with pytest.raises(AttributeError, match="dev_nu_lines"):
+        mdb.nu_lines
+    assert resident["A"]["host"] == mdb.resident_bytes()["A"]["host"]
+    mdb.release_host(fields=["A"])
+    assert not hasattr(mdb, "A")
+
+
+@pytest.mark.parametrize("db", ["exomol", "hitemp"])
+def test_lazy_device_transfer_by_opa(db, tmp_path, monkeypatch):
+    from exojax.spec.opacalc import OpaModit
+
+    monkeypatch.chdir(tmp_path)
+    if db == "exomol":
+        mdb = mock_mdbExomol(gpu_transfer="lazy")
+        mdb_ref = mock_mdbExomol()
+    else:
+        mdb = mock_mdbHitemp(gpu_transfer="lazy")
+        mdb_ref = mock_mdbHitemp(gpu_transfer=True)
+    assert not mdb.on_device(["nu_lines", "logsij0"])
+    nu_grid, wav, res = mock_wavenumber_grid()
+    opa = OpaModit(mdb, nu_grid, dit_grid_resolution=0.1)
+    assert mdb.on_device(["nu_lines", "logsij0", "elower", "A"])
+    opa_ref = OpaModit(mdb_ref, nu_grid, dit_grid_resolution=0.1)
+    assert np.allclose(opa.xsvector(1000.0, 1.0), opa_ref.xsvector(1000.0, 1.0))
+
+
+def test_modit_requires_device_arrays(tmp_path, monkeypatch):
+    from exojax.spec.opacalc import OpaModit
+
+    monkeypatch.chdir(tmp_path)
+    mdb = mock_mdbHitemp(gpu_transfer=False)
+    nu_grid, wav, res = mock_wavenumber_grid()
+    with pytest.raises(ValueError):
+        OpaModit(mdb, nu_grid)
+
+
+@pytest.mark.parametrize("method", ["direct", "modit"])
+def test_opa_after_release_host(method, tmp_path, monkeypatch):
+    from exojax.spec.opacalc import OpaDirect
+    from exojax.spec.opacalc import OpaModit
+
+    monkeypatch.chdir(tmp_path)
+    mdb = mock_mdbExomol()
+    nu_grid, wav, res = mock_wavenumber_grid()
+    if method == "direct":
+        opa_class, kwargs = OpaDirect, {}
+    else:
+        opa_class, kwargs = OpaModit, {"dit_grid_resolution": 0.1}
+    xsv_ref = opa_class(mdb, nu_grid, **kwargs).xsvector(1000.0, 1.0)
+    opa = opa_class(mdb, nu_grid, **kwargs)
+    mdb.release_host()
+    assert "nu_lines" not in mdb.resident_bytes()
+    assert "line_strength_ref" not in mdb.resident_bytes()
+    with pytest.raises(AttributeError, match="logsij0"):
+        mdb.line_strength_ref
+    # opa initialized before the release uses the device copies
+    assert np.allclose(opa.xsvector(1000.0, 1.0), xsv_ref)
+    # the initialization of opa needs the host arrays
+    with pytest.raises(AttributeError, match="dev_nu_lines"):
+        opa_class(mdb, nu_grid, **kwargs)
+
+
+def test_to_device_unknown_field():
+    mdb = mock_mdbHitemp(gpu_transfer="lazy")
+    with pytest.raises(ValueError):
+        mdb.to_device(fields=["unknown"])
+
+
+@pytest.mark.parametrize("db", ["exomol", "hitemp"])
+def test_snapshot(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    if db == "exomol":
+        mdb = mock_mdbExomol()
+    else:
+        mdb = mock_mdbHitemp(multi_isotope=True)
+    mdb.save_snapshot(tmp_path / "snapshot")
+    snapshot = MdbSnapshot.load(tmp_path / "snapshot")
+    assert snapshot.dbtype == mdb.dbtype
+    assert snapshot.molmass == pytest.approx(mdb.molmass)
+    assert isinstance(snapshot.nu_lines, np.memmap)
+    assert np.all(snapshot.nu_lines == mdb.nu_lines)
+    assert np.all(snapshot.elower == np.asarray(mdb.elower))
+    T = 1000.0
+    if db == "exomol":
+        assert snapshot.qr_interp(T) == pytest.approx(mdb.qr_interp(T))
+    else:
+        assert snapshot.qr_interp(1, T) == pytest.approx(mdb.qr_interp(1, T))
+        assert np.all(snapshot.qr_interp_lines(T) == mdb.qr_interp_lines(T))
+
+    snapshot.change_reference_temperature(500.0)
+    assert snapshot.Tref == 500.0
+
+
+@pytest.mark.parametrize("db", ["exomol", "hitemp"])
+def test_snapshot_qr_interp_in_jit_twice(db, tmp_path, monkeypatch):
+    import jax
+
+    monkeypatch.chdir(tmp_path)
+    if db == "exomol":
+        mdb = mock_mdbExomol()
+        qr = lambda s, T: s.qr_interp(T)
+    else:
+        mdb = mock_mdbHitemp(multi_isotope=True)
+        qr = lambda s, T: s.qr_interp(1, T)
+    mdb.save_snapshot(tmp_path / "snapshot")
+    snapshot = MdbSnapshot.load(tmp_path / "snapshot")
+    # the partition function table is first made within jit
+    val1 = jax.jit(lambda T: qr(snapshot, T))(1000.0)
+    val2 = jax.jit(lambda T: qr(snapshot, T))(1200.0)
+    assert val1 == pytest.approx(qr(mdb, 1000.0))
+    assert val2 == pytest.approx(qr(mdb, 1200.0))
+
+
 if __name__ == "__main__":
+        config.update("jax_enable_x64", True)
         test__convert_proper_isotope()
         test__isotope_index_from_isotope_number()
-        test__QT_interp()
-        test__qr_interp()
-        test__qr_interp_lines()
-        test_molmass()
\ No newline at end of file
+        test_QT_interp()
+        test_qr_interp()
+        test_qr_interp_lines()
+        test_molmass()
+        test_lazy_device_transfer("exomol")
\ No newline at end of file
@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from jax import grad
+from exojax.spec.atmrt import ArtEmisPure
+from exojax.spec.atmrt import ArtEmisScat
+from exojax.spec.atmrt import ArtTransPure
+from exojax.spec.nublock import nu_blocked_map
+from exojax.test.emulate_mdb import mock_wavenumber_grid
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def _sample_dtau(nlayer, nnu):
+    np.random.seed(2)
+    return jnp.array(
+        np.logspace(-5, 1, nlayer)[:, None] * (1.0 + np.random.rand(nlayer, nnu))
+    )
+
+
+def test_nu_blocked_map_with_padding():
+    x = jnp.arange(23.0)
+    y = jnp.outer(jnp.arange(3.0), x)
+    out = nu_blocked_map(lambda a, b: jnp.sum(a * b, axis=0), [y, x], 5)
+    assert np.array_equal(out, jnp.sum(y * x, axis=0))
+
+
+@pytest.mark.parametrize("rtsolver", ["ibased", "ibased_linsap", "fbased_e3"])
+def test_ArtEmisPure_nu_block_size(rtsolver):
+    nu_grid, wav, res = mock_wavenumber_grid()
+    art = ArtEmisPure(nlayer=30, nu_grid=nu_grid, rtsolver=rtsolver, nstream=8)
+    if rtsolver == "ibased_linsap":
+        temperature = art.powerlaw_temperature_boundary(1300.0, 0.1)
+    else:
+        temperature = art.powerlaw_temperature(1300.0, 0.1)
+    dtau = _sample_dtau(art.nlayer, len(nu_grid))
+    ref = art.run(dtau, temperature)
+    spec = art.run(dtau, temperature, nu_block_size=3000)
+    assert np.allclose(spec, ref, rtol=1.0e-13)
+
+    def f(T0, nu_block_size):
+        return jnp.sum(
+            art.run(dtau, art.powerlaw_temperature(T0, 0.1), nu_block_size=nu_block_size)
+        )
+
+    if rtsolver != "ibased_linsap":
+        assert grad(f)(1300.0, 3000) == pytest.approx(grad(f)(1300.0, None), rel=1.0e-12)
+
+
+@pytest.mark.parametrize(
+    "rtsolver", ["fluxadding_toon_hemispheric_mean", "lart_toon_hemispheric_mean"]
+)
+def test_ArtEmisScat_nu_block_size(rtsolver):
+    nu_grid, wav, res = mock_wavenumber_grid()
+    art = ArtEmisScat(nlayer=30, nu_grid=nu_grid, rtsolver=rtsolver)
+    temperature = art.powerlaw_temperature(1300.0, 0.1)
+    dtau = _sample_dtau(art.nlayer, len(nu_grid))
+    ssa = 0.3 * jnp.ones_like(dtau)
+    g = 0.1 * jnp.ones_like(dtau)
+    ref = art.run(dtau, ssa, g, temperature)
+    spec = art.run(dtau, ssa, g, temperature, nu_block_size=4000)
+    assert np.allclose(spec, ref, rtol=1.0e-12)
+
+
+@pytest.mark.parametrize("integration", ["simpson", "trapezoid"])
+def test_ArtTransPure_nu_block_size(integration):
+    nu_grid, wav, res = mock_wavenumber_grid()
+    art = ArtTransPure(nlayer=30, integration=integration)
+    temperature = art.powerlaw_temperature(1300.0, 0.1)
+    mmw = 2.33 * jnp.ones(art.nlayer)
+    dtau = _sample_dtau(art.nlayer, len(nu_grid))
+    ref = art.run(dtau, temperature, mmw, 7.0e9, 2478.57)
+    spec = art.run(dtau, temperature, mmw, 7.0e9, 2478.57, nu_block_size=2500)
+    assert np.allclose(spec, ref, rtol=1.0e-13)
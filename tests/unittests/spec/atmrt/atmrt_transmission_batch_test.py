@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from exojax.spec.atmrt import ArtTransPure
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def _setting(integration):
+    art = ArtTransPure(nlayer=30, integration=integration)
+    np.random.seed(4)
+    dtau = jnp.array(
+        np.logspace(-6, 1, art.nlayer)[None, :, None] * np.random.rand(3, art.nlayer, 50)
+    )
+    temperature = jnp.array(
+        [art.powerlaw_temperature(T0, 0.1) for T0 in [1000.0, 1300.0, 1600.0]]
+    )
+    mmw = 2.33 * jnp.ones(art.nlayer)
+    return art, dtau, temperature, mmw
+
+
+@pytest.mark.parametrize("integration", ["simpson", "trapezoid"])
+def test_ArtTransPure_run_batch(integration):
+    art, dtau, temperature, mmw = _setting(integration)
+    spectra = art.run_batch(dtau, temperature, mmw, 7.0e9, 2478.57)
+    ref = jnp.array(
+        [art.run(dtau[k], temperature[k], mmw, 7.0e9, 2478.57) for k in range(3)]
+    )
+    assert spectra.shape == (3, 50)
+    assert np.allclose(spectra, ref, rtol=1.0e-13)
+    averaged = art.run_batch(dtau, temperature, mmw, 7.0e9, 2478.57, average=True)
+    assert np.allclose(averaged, jnp.mean(ref, axis=0), rtol=1.0e-13)
+
+
+def test_ArtTransPure_run_batch_shared_geometry():
+    art, dtau, temperature, mmw = _setting("simpson")
+    spectra = art.run_batch(dtau, temperature[1], mmw, 7.0e9, 2478.57, nu_block_size=16)
+    ref = jnp.array(
+        [art.run(dtau[k], temperature[1], mmw, 7.0e9, 2478.57) for k in range(3)]
+    )
+    assert np.allclose(spectra, ref, rtol=1.0e-13)
+
+
+@pytest.mark.parametrize("integration", ["simpson", "trapezoid"])
+def test_ArtTransPure_run_with_geometry(integration):
+    from jax import jit
+
+    art, dtau, temperature, mmw = _setting(integration)
+    geometry = art.chord_geometry(temperature[0], mmw, 7.0e9, 2478.57)
+    run = jit(art.run_with_geometry)
+    for k in range(3):
+        ref = art.run(dtau[k], temperature[0], mmw, 7.0e9, 2478.57)
+        assert np.allclose(run(dtau[k], geometry), ref, rtol=1.0e-13)
+
+
+def test_ArtTransPure_run_with_trapezoid_geometry_fails_for_simpson():
+    art, dtau, temperature, mmw = _setting("trapezoid")
+    geometry = art.chord_geometry(temperature[0], mmw, 7.0e9, 2478.57)
+    art.set_integration_scheme("simpson")
+    with pytest.raises(ValueError):
+        art.run_with_geometry(dtau[0], geometry)
@@ -0,0 +1,98 @@
+import pytest
+import jax.numpy as jnp
+import numpy as np
+from scipy.special import expn
+from exojax.special.expn import E2
+from exojax.special.expn import E3
+from exojax.spec.rtransfer import initialize_gaussian_quadrature
+from exojax.spec.rtransfer import rtrun_emis_pureabs_ibased
+from exojax.spec.rtransfer import rtrun_emis_pureabs_ibased_linsap
+from exojax.spec.rtransfer import rtrun_emis_pureabs_fbased_e3
+from exojax.spec.rtransfer import rtrun_emis_pureabs_fbased_e3_linsap
+from exojax.spec.rtransfer import coeffs_linsap
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def _sample_dtau_source(Nlayer=30, Nnu=7):
+    np.random.seed(1)
+    dtau = jnp.array(np.logspace(-4, 1, Nlayer)[:, None] * np.random.rand(Nlayer, Nnu))
+    source = jnp.array(np.linspace(1.0, 3.0, Nlayer + 1)[:, None] * np.ones((1, Nnu)))
+    return dtau, source
+
+
+def _ibased_loop(dtau, source_matrix, mus, weights):
+    tau = jnp.cumsum(dtau, axis=0)
+    spec = jnp.zeros(dtau.shape[1])
+    for mu, w in zip(mus, weights):
+        dtrans = -jnp.diff(jnp.exp(-tau / mu), prepend=1.0, axis=0)
+        spec = spec + w * 2.0 * mu * jnp.sum(source_matrix * dtrans, axis=0)
+    return spec
+
+
+def _ibased_linsap_loop(dtau, source_matrix_boundary, mus, weights):
+    Nnus = dtau.shape[1]
+    source_p1 = jnp.roll(source_matrix_boundary, -1, axis=0)
+    spec = jnp.zeros(Nnus)
+    for mu, w in zip(mus, weights):
+        trans = jnp.exp(-dtau / mu)
+        beta, gamma = coeffs_linsap(dtau / mu, trans)
+        beta = jnp.vstack([beta, jnp.ones(Nnus)])
+        gamma = jnp.vstack([gamma, jnp.zeros(Nnus)])
+        dI = beta * source_matrix_boundary + gamma * source_p1
+        att = jnp.cumprod(jnp.vstack([jnp.ones(Nnus), trans]), axis=0)
+        spec = spec + 2.0 * mu * w * jnp.sum(dI * att, axis=0)
+    return spec
+
+
+def test_expn_E2_E3():
+    x = np.logspace(-4, 1.9, 1000)
+    assert np.max(np.abs(E2(x) - expn(2, x))) < 2.0e-7
+    assert np.max(np.abs(E3(x) - expn(3, x))) < 2.0e-7
+    assert E2(0.0) == pytest.approx(1.0)
+    assert E3(0.0) == pytest.approx(0.5)
+    assert E3(1.0e12) == 0.0
+
+
+def test_rtrun_emis_pureabs_ibased_equals_to_loop():
+    dtau, source = _sample_dtau_source()
+    mus, weights = initialize_gaussian_quadrature(8)
+    spec = rtrun_emis_pureabs_ibased(dtau, source[:-1], mus, weights)
+    ref = _ibased_loop(dtau, source[:-1], mus, weights)
+    assert np.allclose(spec, ref, rtol=1.0e-12)
+
+
+def test_rtrun_emis_pureabs_ibased_linsap_equals_to_loop():
+    dtau, source = _sample_dtau_source()
+    mus, weights = initialize_gaussian_quadrature(8)
+    spec = rtrun_emis_pureabs_ibased_linsap(dtau, source, mus, weights)
+    ref = _ibased_linsap_loop(dtau, source, mus, weights)
+    assert np.allclose(spec, ref, rtol=1.0e-10)
+
+
+def test_rtrun_emis_pureabs_fbased_e3_is_ibased_limit():
+    dtau, source = _sample_dtau_source()
+    mus, weights = initialize_gaussian_quadrature(64)
+    spec = rtrun_emis_pureabs_fbased_e3(dtau, source[:-1])
+    ref = rtrun_emis_pureabs_ibased(dtau, source[:-1], mus, weights)
+    assert np.allclose(spec, ref, rtol=1.0e-5)
+
+
+def test_rtrun_emis_pureabs_fbased_e3_linsap_is_ibased_linsap_limit():
+    dtau, source = _sample_dtau_source()
+    mus, weights = initialize_gaussian_quadrature(64)
+    spec = rtrun_emis_pureabs_fbased_e3_linsap(dtau, source)
+    ref = rtrun_emis_pureabs_ibased_linsap(dtau, source, mus, weights)
+    assert np.allclose(spec, ref, rtol=1.0e-5)
+
+
+def test_rtrun_emis_pureabs_fbased_e3_linsap_isothermal():
+    dtau, _ = _sample_dtau_source()
+    source = 2.0 * jnp.ones((dtau.shape[0] + 1, dtau.shape[1]))
+    spec = rtrun_emis_pureabs_fbased_e3_linsap(dtau, source)
+    assert np.allclose(spec, 2.0)
@@ -0,0 +1,43 @@
+"""test for the batched DIT grid matrix of the species-separated atomic database"""
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from exojax.spec.moldb import AdbSepVald
+from exojax.spec.modit import set_ditgrid_matrix_vald_all
+from exojax.spec.modit import set_ditgrid_matrix_vald_each
+from exojax.utils.grids import wavenumber_grid
+from exojax.test.emulate_mdb import mock_adbVALD_synthetic
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def test_set_ditgrid_matrix_vald_all():
+    nu_grid, wav, R = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="modit")
+    adb = mock_adbVALD_synthetic(nu_grid, shuffle=True)
+    adb.dev_nu_lines = jnp.array(adb.nu_lines)
+    asdb = AdbSepVald(adb)
+    Parr = np.logspace(-4, 1, 5)
+    PH = PHe = PHH = Parr * 0.3
+    fT = lambda T0, alpha: T0[:, None] * (Parr[None, :] / 1.0)**alpha[:, None]
+    T0 = np.array([3000.0, 4000.0, 5000.0])
+    alpha = np.array([0.1, 0.05, 0.02])
+    dgm = set_ditgrid_matrix_vald_all(asdb, PH, PHe, PHH, R, fT, 0.2, T0, alpha)
+
+    # reference: the loop over the species
+    refs = [
+        set_ditgrid_matrix_vald_each(
+            asdb.ielem[i], asdb.iion[i], asdb.atomicmass[i], asdb.ionE[i], asdb.dev_nu_lines[i],
+            asdb.logsij0[i], asdb.elower[i], asdb.eupper[i], asdb.gamRad[i], asdb.gamSta[i],
+            asdb.vdWdamp[i], asdb.Tref, asdb.QTmask[i], asdb.T_gQT, asdb.gQT_284species, PH, PHe,
+            PHH, R, fT, 0.2, T0, alpha) for i in range(asdb.N_usp)
+    ]
+    Lmax = max(ref.shape[1] for ref in refs)
+    assert dgm.shape == (asdb.N_usp, len(Parr), Lmax)
+    for i, ref in enumerate(refs):
+        ref = np.pad(ref, ((0, 0), (0, Lmax - ref.shape[1])), mode="maximum")
+        assert np.allclose(dgm[i], ref, rtol=1.e-10)
@@ -0,0 +1,97 @@
+"""test for the ragged (segment-based) atomic line layout in MODIT"""
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from jax import config
+from jax.experimental import enable_x64
+from exojax.spec.moldb import AdbRaggedVald
+from exojax.spec.moldb import AdbSepVald
+from exojax.spec.initspec import init_modit_vald
+from exojax.spec.initspec import init_modit
+from exojax.spec.initspec import init_modit_vald_ragged
+from exojax.spec.modit import vald_ragged
+from exojax.spec.modit import vald_all
+from exojax.spec.modit import xsmatrix_vald
+from exojax.spec.modit import nsigmaD_matrix_mass_grid
+from exojax.spec.modit import xsmatrix_vald_ragged
+from exojax.spec.modit import xsmatrix
+from exojax.spec.set_ditgrid import ditgrid_matrix
+from exojax.spec import normalized_doppler_sigma
+from exojax.utils.grids import wavenumber_grid
+from exojax.test.emulate_mdb import mock_adbVALD_synthetic
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def test_xsmatrix_vald_ragged():
+    nu_grid, wav, res = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="modit")
+    adb = mock_adbVALD_synthetic(nu_grid, shuffle=True)
+    ardb = AdbRaggedVald(adb)
+    assert ardb.N_usp == 3
+    assert ardb.offsets[-1] == 48
+    for i in range(ardb.N_usp):
+        sl = slice(ardb.offsets[i], ardb.offsets[i + 1])
+        assert np.all(np.asarray(ardb.species_index[sl]) == i)
+        assert np.all(np.asarray(ardb.ielem[sl]) == ardb.uspecies[i][0])
+
+    Tarr = np.array([3000.0, 4000.0])
+    PH = PHe = PHH = np.array([0.1, 1.0])
+    cnu, indexnu, R, pmarray, cmass, imass, mass_grid = init_modit_vald_ragged(ardb, nu_grid)
+    SijM, ngammaLM = vald_ragged(ardb, Tarr, PH, PHe, PHH, R)
+    nsigmaDM = nsigmaD_matrix_mass_grid(Tarr, mass_grid, R)
+    dgm_ngammaL = ditgrid_matrix(ngammaLM, 0.2)
+    VMR_uspecies = jnp.array([[1.e-4, 2.e-4], [1.e-6, 1.e-6], [1.e-7, 3.e-7]])
+    xsm_vmr = xsmatrix_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray, nsigmaDM, ngammaLM, SijM,
+                                   nu_grid, dgm_ngammaL, ardb.species_index, VMR_uspecies)
+
+    # reference: MODIT for each species separately
+    ref = np.zeros_like(xsm_vmr)
+    for i in range(ardb.N_usp):
+        sl = slice(ardb.offsets[i], ardb.offsets[i + 1])
+        cnu_i, indexnu_i, _, _ = init_modit(ardb.nu_lines[sl], nu_grid)
+        nsigmaDl = normalized_doppler_sigma(Tarr, ardb.atomicmass_uspecies[i], R)[:, None]
+        xsm_i = xsmatrix(cnu_i, indexnu_i, R, pmarray, nsigmaDl, ngammaLM[:, sl], SijM[:, sl], nu_grid, dgm_ngammaL)
+        ref = ref + np.abs(xsm_i) * VMR_uspecies[i][:, None]
+    assert np.max(np.abs(xsm_vmr - ref)) < 1.e-8 * np.max(ref)
+
+
+
+def test_xsmatrix_vald_all_vs_ragged():
+    nu_grid, wav, res = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="modit")
+    adb = mock_adbVALD_synthetic(nu_grid, shuffle=True)
+    adb.dev_nu_lines = jnp.array(adb.nu_lines)
+    asdb = AdbSepVald(adb)
+    ardb = AdbRaggedVald(adb)
+
+    Tarr = np.array([3000.0, 4000.0])
+    PH = PHe = PHH = np.array([0.1, 1.0])
+    cnu, indexnu, R, pmarray, cmass, imass, mass_grid = init_modit_vald_ragged(ardb, nu_grid)
+    SijM, ngammaLM = vald_ragged(ardb, Tarr, PH, PHe, PHH, R)
+    nsigmaDM = nsigmaD_matrix_mass_grid(Tarr, mass_grid, R)
+    dgm_ngammaL = ditgrid_matrix(ngammaLM, 0.2)
+    VMR_uspecies = jnp.ones((ardb.N_usp, len(Tarr)))
+    xsm_ragged = xsmatrix_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray, nsigmaDM, ngammaLM, SijM,
+                                      nu_grid, dgm_ngammaL, ardb.species_index, VMR_uspecies)
+
+    cnuS, indexnuS, R, pmarray = init_modit_vald(asdb.nu_lines, nu_grid, asdb.N_usp)
+    SijMS, ngammaLMS, nsigmaDlS = vald_all(asdb, Tarr, PH, PHe, PHH, R)
+    # the line strengths of each species agree with the ragged layout, i.e. both use Q(T)/Q(Tref)
+    for i in range(asdb.N_usp):
+        sl = slice(ardb.offsets[i], ardb.offsets[i + 1])
+        nline = ardb.offsets[i + 1] - ardb.offsets[i]
+        assert np.allclose(SijMS[i][:, :nline], SijM[:, sl], rtol=1.e-10)
+
+    dgm_ngammaLS = jnp.array([dgm_ngammaL] * asdb.N_usp)
+    xsmS = xsmatrix_vald(cnuS, indexnuS, R, pmarray, nsigmaDlS, ngammaLMS, SijMS, nu_grid, dgm_ngammaLS)
+    xsm_all = np.sum(np.asarray(xsmS), axis=0)
+    assert np.max(np.abs(xsm_all - xsm_ragged)) < 1.e-8 * np.max(xsm_ragged)
+
+
+if __name__ == "__main__":
+    config.update("jax_enable_x64", True)
+    test_xsmatrix_vald_ragged()
+    test_xsmatrix_vald_all_vs_ragged()
@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+from exojax.test.emulate_mdb import mock_mdb
+from exojax.utils.grids import wavenumber_grid
+from exojax.spec.opacalc import OpaDirect
+from exojax.spec.atmrt import ArtEmisPure
+from exojax.spec.pipeline import OpaArtPipeline
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+@pytest.mark.parametrize("layer_block_size, nu_block_size", [(None, None), (7, 600)])
+def test_OpaArtPipeline_equals_to_sum_of_dtau(
+    layer_block_size, nu_block_size, tmp_path, monkeypatch
+):
+    # mock_mdb("exomol") copies the sample database to the current directory
+    monkeypatch.chdir(tmp_path)
+    nu_grid, wav, res = wavenumber_grid(
+        22920.0, 23100.0, 2000, unit="AA", xsmode="lpf", wavelength_order="ascending"
+    )
+    art = ArtEmisPure(nlayer=20, nu_grid=nu_grid, pressure_top=1.0e-5, pressure_btm=1.0e1)
+    temperature = art.powerlaw_temperature(1300.0, 0.1)
+    gravity = 2478.57
+    mdb = mock_mdb("exomol")
+    opa_list = [OpaDirect(mdb, nu_grid), OpaDirect(mdb, nu_grid)]
+    mmr_list = [art.constant_mmr_profile(0.01), art.constant_mmr_profile(0.003)]
+    continuum = lambda T: 1.0e-3 * np.ones((art.nlayer, len(nu_grid))) * (T[:, None] / 1000.0)
+
+    dtau_ref = continuum(temperature)
+    for opa, mmr in zip(opa_list, mmr_list):
+        xs = opa.xsmatrix(temperature, art.pressure)
+        dtau_ref = dtau_ref + art.opacity_profile_xs(xs, mmr, opa.mdb.molmass, gravity)
+    spec_ref = art.run(dtau_ref, temperature)
+
+    pipe = OpaArtPipeline(
+        art,
+        opa_list,
+        continuum_list=[continuum],
+        layer_block_size=layer_block_size,
+        nu_block_size=nu_block_size,
+    )
+    assert np.allclose(pipe.dtau(temperature, mmr_list, gravity), dtau_ref, rtol=1.0e-12)
+    assert np.allclose(pipe.run(temperature, mmr_list, gravity), spec_ref, rtol=1.0e-12)
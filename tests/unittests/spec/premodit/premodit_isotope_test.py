@@ -0,0 +1,72 @@
+"""test for PreMODIT with all the isotopes (isotope=0) of HITEMP
+
+    The cross sections are compared with those by LPF using the isotope-dependent partition function ratio of each line (qr_interp_lines).
+
+"""
+import pytest
+import numpy as np
+from jax import vmap
+from exojax.spec.opacalc import OpaPremodit
+from exojax.spec.initspec import init_lpf
+from exojax.spec.lpf import xsvector as xsvector_lpf
+from exojax.spec import gamma_natural
+from exojax.spec import doppler_sigma
+from exojax.spec.hitran import gamma_hitran
+from exojax.spec.hitran import line_strength
+from exojax.test.emulate_mdb import mock_mdbHitemp
+from exojax.utils.grids import wavenumber_grid
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def _xsvector_lpf_isotopes(mdb, numatrix, T, P):
+    qt = mdb.qr_interp_lines(T)
+    gammaL = gamma_hitran(
+        P, T, 0.0, mdb.n_air, mdb.gamma_air, mdb.gamma_self
+    ) + gamma_natural(mdb.A)
+    sigmaD = doppler_sigma(mdb.nu_lines, T, mdb.molmass)
+    Sij = line_strength(T, mdb.logsij0, mdb.nu_lines, mdb.elower, qt, mdb.Tref)
+    return xsvector_lpf(numatrix, sigmaD, gammaL, Sij)
+
+
+@pytest.fixture(scope="module")
+def opa_and_reference():
+    mdb = mock_mdbHitemp(multi_isotope=True)
+    assert mdb.isotope == 0
+    assert len(mdb.uniqiso) > 1
+    # a narrow band with a fine grid (R ~ 4e6) to resolve the Doppler cores
+    nu_grid, wav, res = wavenumber_grid(4340.0, 4344.0, 4000, unit="cm-1", xsmode="premodit")
+    opa = OpaPremodit(mdb=mdb, nu_grid=nu_grid, manual_params=[300.0, 700.0, 1300.0])
+    numatrix = init_lpf(mdb.nu_lines, nu_grid)
+    return mdb, opa, numatrix
+
+
+def _residual(xs, xs_ref):
+    # relative to the peak, to avoid the line wings where xs ~ 0
+    return np.max(np.abs(xs - xs_ref)) / np.max(xs_ref)
+
+
+def test_xsvector_premodit_all_isotopes(opa_and_reference):
+    mdb, opa, numatrix = opa_and_reference
+    T, P = 1000.0, 1.0
+    xsv = opa.xsvector(T, P)
+    xsv_ref = _xsvector_lpf_isotopes(mdb, numatrix, T, P)
+    assert _residual(xsv, xsv_ref) < 0.01
+
+
+def test_xsmatrix_premodit_all_isotopes(opa_and_reference):
+    mdb, opa, numatrix = opa_and_reference
+    Tarr = np.array([700.0, 1000.0, 1400.0])
+    Parr = np.array([0.1, 1.0, 3.0])
+    xsm = opa.xsmatrix(Tarr, Parr)
+    xsm_ref = vmap(_xsvector_lpf_isotopes, (None, None, 0, 0))(
+        mdb, numatrix, Tarr, Parr
+    )
+    assert xsm.shape == xsm_ref.shape
+    for xs, xs_ref in zip(xsm, xsm_ref):
+        assert _residual(xs, xs_ref) < 0.01
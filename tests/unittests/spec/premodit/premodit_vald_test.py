@@ -0,0 +1,80 @@
+"""test for PreMODIT of atomic lines (OpaPremoditVald)"""
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from jax import config
+from jax.experimental import enable_x64
+from exojax.spec.atomll import gamma_vald3
+from exojax.spec.moldb import AdbRaggedVald
+from exojax.spec.opacalc import OpaPremoditVald
+from exojax.spec.premodit import broadpar_vald
+from exojax.spec.premodit import vald_effective_pressure
+from exojax.spec.initspec import init_modit_vald_ragged
+from exojax.spec.modit import vald_ragged
+from exojax.spec.modit import nsigmaD_matrix_mass_grid
+from exojax.spec.modit import xsmatrix_vald_ragged
+from exojax.spec.set_ditgrid import ditgrid_matrix
+from exojax.utils.grids import wavenumber_grid
+from exojax.test.emulate_mdb import mock_adbVALD_synthetic
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+
+def test_broadpar_vald_reproduces_gamma_vald3():
+    nu_grid, wav, R = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="premodit")
+    adb = mock_adbVALD_synthetic(nu_grid, gamRad_range=[7.5, 8.5], vdWdamp_unsoeld=True)
+    Tref_broadening = 3500.0
+    ngamma_pressure_ref, n_Texp, ngamma_natural = broadpar_vald(adb, Tref_broadening, R)
+    assert np.allclose(np.unique(n_Texp), [0.62, 0.7])
+    T, PH, PHe, PHH = 4200.0, 0.3, 0.05, 0.01
+    gamma = gamma_vald3(T, PH, PHH, PHe, adb.ielem, adb.iion, adb.nu_lines, adb.elower,
+                        adb.eupper, adb.atomicmass, adb.ionE, adb.gamRad, adb.gamSta,
+                        adb.vdWdamp)
+    ngamma = ngamma_pressure_ref * (T / Tref_broadening)**(-n_Texp) * vald_effective_pressure(
+        PH, PHe, PHH) + ngamma_natural
+    assert np.allclose(ngamma, gamma / (adb.nu_lines / R), rtol=1.e-10)
+
+
+def test_xsmatrix_premodit_vald():
+    nu_grid, wav, res = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="premodit")
+    adb = mock_adbVALD_synthetic(nu_grid, gamRad_range=[7.5, 8.5], vdWdamp_unsoeld=True)
+    Tarr = np.array([3000.0, 4000.0])
+    PH = PHe = PHH = np.array([0.1, 1.0])
+    VMR_uspecies = jnp.array([[1.e-4, 2.e-4], [1.e-6, 1.e-6], [1.e-7, 3.e-7]])
+
+    opa = OpaPremoditVald(adb, nu_grid, diffmode=2, manual_params=[300.0, 3500.0, 3500.0], allow_32bit=True)
+    xsm = opa.xsmatrix(Tarr, PH, PHe, PHH, VMR_uspecies)
+
+    # reference: MODIT with the ragged layout
+    ardb = AdbRaggedVald(adb)
+    cnu, indexnu, R, pmarray, cmass, imass, mass_grid = init_modit_vald_ragged(ardb, nu_grid)
+    SijM, ngammaLM = vald_ragged(ardb, Tarr, PH, PHe, PHH, R)
+    nsigmaDM = nsigmaD_matrix_mass_grid(Tarr, mass_grid, R)
+    dgm_ngammaL = ditgrid_matrix(ngammaLM, 0.1)
+    ref = xsmatrix_vald_ragged(cnu, indexnu, cmass, imass, R, pmarray, nsigmaDM, ngammaLM, SijM,
+                               nu_grid, dgm_ngammaL, ardb.species_index, VMR_uspecies)
+    assert np.max(np.abs(xsm - ref)) < 1.e-3 * np.max(ref)
+    assert np.abs(np.sum(xsm) / np.sum(ref) - 1.0) < 1.e-3
+
+
+def test_atomicmass_uspecies_premodit_vald():
+    nu_grid, wav, res = wavenumber_grid(16000.0, 16050.0, 2000, unit="cm-1", xsmode="premodit")
+    adb = mock_adbVALD_synthetic(nu_grid, shuffle=True)
+    ardb = AdbRaggedVald(adb)
+    opa = OpaPremoditVald(adb, nu_grid, allow_32bit=True)
+    opa_ragged = OpaPremoditVald(ardb, nu_grid, allow_32bit=True)
+    mass = {26: 55.847, 11: 22.98981, 22: 47.9}
+    assert np.allclose(opa.atomicmass_uspecies, [mass[ielem] for ielem in opa.uspecies[:, 0]], rtol=1.e-5)
+    assert np.array_equal(opa_ragged.atomicmass_uspecies, ardb.atomicmass_uspecies)
+    assert np.allclose(opa.atomicmass_uspecies, opa_ragged.atomicmass_uspecies, rtol=1.e-5)
+
+
+if __name__ == "__main__":
+    config.update("jax_enable_x64", True)
+    test_broadpar_vald_reproduces_gamma_vald3()
+    test_xsmatrix_premodit_vald()
+    test_atomicmass_uspecies_premodit_vald()
@@ -1,3 +1,4 @@
+import pytest
 import numpy as np
 import jax.numpy as jnp
 from jax import jit
@@ -5,6 +6,7 @@ from exojax.utils.grids import wavenumber_grid
 from exojax.spec.response import ipgauss_sampling
 from exojax.spec.response import ipgauss_ola_sampling
 from exojax.spec.response import ipgauss_variable_sampling
+from exojax.spec.response import ipgauss_variable_sampling_banded
 from exojax.utils.grids import velocity_grid
 
 from exojax.utils.constants import c
@@ -155,6 +157,43 @@ def test_ipgauss_variable_sampling_using_constant_beta_array(fig=False):
         plt.show()
 
 
+def test_ipgauss_variable_sampling_banded():
+    nus, wav, resolution = wavenumber_grid(4000.0, 4010.0, 1000, xsmode="premodit")
+    F0 = np.ones_like(nus)
+    F0[500 - 5:500 + 5] = 0.5
+    RV = 10.0
+    nusd, wav, resolution_inst = wavenumber_grid(4003.0, 4007.0, 250, xsmode="lpf")
+    beta_variable = np.linspace(10.0, 20.0, len(nusd))
+    F = ipgauss_variable_sampling(nusd, nus, F0, beta_variable, RV)
+    nhalf = int(6.0 * 20.0 / (c / resolution)) + 1
+    F_banded = ipgauss_variable_sampling_banded(nusd, nus, F0, beta_variable, RV, nhalf)
+    assert np.max(np.abs(F_banded - F)) < 1.e-6
+
+
+def test_SopInstProfile_resample():
+    from exojax.spec.specop import SopInstProfile
+
+    nus, wav, resolution = wavenumber_grid(4000.0, 4010.0, 10000, xsmode="premodit")
+    F0 = 1.0 - 0.5 * np.exp(-((nus - 4005.0) / 0.05) ** 2)
+    nusd = np.linspace(4002.0, 4008.0, 300)
+    sop = SopInstProfile(nus)
+    sop.set_resampling(nusd)
+    for RV in [-100.0, 0.0, 30.0]:
+        F = sop.resample(F0, RV)
+        # float64 reference, the interpolation in log nu is close to the linear one on the fine grid
+        F_ref = np.interp(nusd * (1.0 + RV / c), nus, F0)
+        assert np.max(np.abs(F - F_ref)) < 1.e-4
+
+    # pixel integration conserves the flux
+    sop.set_resampling(nusd, pixel_integration=True)
+    F = sop.resample(F0, 30.0)
+    nus_shift = nusd * (1.0 + 30.0 / c)
+    dense = np.linspace(nus_shift[0], nus_shift[-1], 200001)
+    Fdense = np.interp(dense, nus, F0)
+    assert np.sum((1.0 - F)[1:-1]) * (nusd[1] - nusd[0]) == pytest.approx(
+        np.trapz(1.0 - Fdense, dense) / (1.0 + 30.0 / c), rel=1.e-3)
+
+
 def test_SopInstProfile_ola(fig=False):
     from exojax.spec.specop import SopInstProfile
     
@@ -0,0 +1,148 @@
+import pytest
+import numpy as np
+import jax.numpy as jnp
+from exojax.utils.grids import wavenumber_grid
+from exojax.spec.specop import SopRotation
+from exojax.spec.specop import SopInstProfile
+from jax.experimental import enable_x64
+
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
+
+METHODS = ["exojax.signal.convolve", "exojax.signal.ola"]
+
+
+def _spectra(nspec=3):
+    nu_grid, wav, res = wavenumber_grid(
+        4000.0, 4100.0, 4000, unit="cm-1", xsmode="premodit"
+    )
+    np.random.seed(5)
+    spectra = jnp.array(1.0 - 0.5 * np.random.rand(nspec, len(nu_grid)) ** 8)
+    return nu_grid, spectra
+
+
+@pytest.mark.parametrize("convolution_method", METHODS)
+def test_rigid_rotation_batch(convolution_method):
+    nu_grid, spectra = _spectra()
+    sos = SopRotation(nu_grid, vsini_max=50.0, convolution_method=convolution_method)
+    vsini = jnp.array([10.0, 20.0, 30.0])
+    u1 = jnp.array([0.1, 0.2, 0.3])
+    batch = sos.rigid_rotation_batch(spectra, vsini, u1, 0.1)
+    for k in range(3):
+        ref = sos.rigid_rotation(spectra[k], vsini[k], u1[k], 0.1)
+        assert np.allclose(batch[k], ref, atol=1.0e-12)
+    shared = sos.rigid_rotation_batch(spectra, 20.0, 0.2, 0.1)
+    assert np.allclose(shared[0], sos.rigid_rotation(spectra[0], 20.0, 0.2, 0.1), atol=1.0e-12)
+
+
+@pytest.mark.parametrize("convolution_method", METHODS)
+def test_ipgauss_and_sampling_batch(convolution_method):
+    nu_grid, spectra = _spectra()
+    sop = SopInstProfile(nu_grid, vrmax=50.0, convolution_method=convolution_method)
+    beta = jnp.array([2.0, 3.0, 4.0])
+    rv = jnp.array([-10.0, 0.0, 10.0])
+    nu_sampling = jnp.linspace(4010.0, 4090.0, 500)
+    batch = sop.sampling_batch(sop.ipgauss_batch(spectra, beta), rv, nu_sampling)
+    for k in range(3):
+        ref = sop.sampling(sop.ipgauss(spectra[k], beta[k]), rv[k], nu_sampling)
+        assert np.allclose(batch[k], ref, atol=1.0e-12)
+
+
+# vsini_max = 30, 80, 100 give odd fft_length (245, 735, 945) for nnu=4000
+@pytest.mark.parametrize(
+    "nnu, vsini_max",
+    [(4000, 50.0), (4002, 50.0), (3994, 50.0), (4000, 30.0), (4000, 80.0), (4000, 100.0)],
+)
+def test_ola_plan_padding_equals_to_fft_convolution(nnu, vsini_max):
+    nu_grid, wav, res = wavenumber_grid(4000.0, 4100.0, nnu, unit="cm-1", xsmode="premodit")
+    np.random.seed(6)
+    spectrum = jnp.array(1.0 - 0.5 * np.random.rand(len(nu_grid)) ** 8)
+    sos_ola = SopRotation(nu_grid, vsini_max=vsini_max, convolution_method="exojax.signal.ola")
+    sos_fft = SopRotation(nu_grid, vsini_max=vsini_max, convolution_method="exojax.signal.convolve")
+    plan = sos_ola.ola_plan
+    assert plan["div_length"] + plan["filter_length"] - 1 == plan["fft_length"]
+    assert plan["ndiv"] * plan["div_length"] == nnu + plan["npad"]
+    ola = sos_ola.rigid_rotation(spectrum, 20.0, 0.1, 0.1)
+    fft = sos_fft.rigid_rotation(spectrum, 20.0, 0.1, 0.1)
+    assert ola.shape == spectrum.shape
+    assert np.allclose(ola, fft, atol=1.0e-12)
+
+
+def test_ola_ndiv_set_by_user():
+    nu_grid, spectra = _spectra(1)
+    sop_ola = SopInstProfile(nu_grid, vrmax=50.0, convolution_method="exojax.signal.ola", ola_ndiv=4)
+    sop_fft = SopInstProfile(nu_grid, vrmax=50.0, convolution_method="exojax.signal.convolve")
+    ola = sop_ola.ipgauss(spectra[0], 3.0)
+    assert sop_ola.ola_plan["ndiv"] == 4
+    assert np.allclose(ola, sop_fft.ipgauss(spectra[0], 3.0), atol=1.0e-12)
+    # the user-set ndiv is kept for a spectrum of a different length
+    plan = sop_ola.compute_ola_plan(len(nu_grid) - 7)
+    assert plan["ndiv"] == 4
+    ola = sop_ola.ipgauss(spectra[0][:-7], 3.0)
+    assert ola.shape == (len(nu_grid) - 7,)
+    assert np.allclose(ola, sop_fft.ipgauss(spectra[0][:-7], 3.0), atol=1.0e-12)
+
+
+def test_ola_plan_is_not_changed_by_calls():
+    nu_grid, spectra = _spectra(1)
+    sop_ola = SopInstProfile(nu_grid, vrmax=50.0, convolution_method="exojax.signal.ola")
+    plan = sop_ola.ola_plan
+    sop_ola.ipgauss(spectra[0][:-7], 3.0)
+    assert sop_ola.ola_plan == plan
+    sop_ola.ola_plan["ndiv"] = 1
+    assert sop_ola.ola_plan == plan
+    with pytest.raises(AttributeError):
+        sop_ola.ola_ndiv = 4
+    with pytest.raises(ValueError):
+        sop_ola.fold_spectra_ola(spectra[0][:-7], plan)
+
+
+@pytest.mark.parametrize("vrmax", [30.0, 80.0, 100.0])
+def test_ipgauss_ola_odd_fft_length(vrmax):
+    nu_grid, spectra = _spectra(1)
+    sop_ola = SopInstProfile(nu_grid, vrmax=vrmax, convolution_method="exojax.signal.ola")
+    sop_fft = SopInstProfile(nu_grid, vrmax=vrmax, convolution_method="exojax.signal.convolve")
+    assert sop_ola.ola_plan["fft_length"] % 2 == 1
+    ola = sop_ola.ipgauss(spectra[0], 3.0)
+    fft = sop_fft.ipgauss(spectra[0], 3.0)
+    assert np.allclose(ola, fft, atol=1.0e-12)
+
+
+@pytest.mark.parametrize("convolution_method", METHODS)
+def test_rotation_ipgauss_single_kernel(convolution_method):
+    from exojax.spec.specop import SopRotationInstProfile
+
+    nu_grid, spectra = _spectra(1)
+    spectrum = spectra[0]
+    sos = SopRotation(nu_grid, vsini_max=100.0, convolution_method=convolution_method)
+    sop = SopInstProfile(nu_grid, vrmax=100.0, convolution_method=convolution_method)
+    sori = SopRotationInstProfile(nu_grid, vrmax=100.0, convolution_method=convolution_method)
+    ref = sop.ipgauss(sos.rigid_rotation(spectrum, 20.0, 0.1, 0.1), 3.0)
+    combined = sori.rotation_ipgauss(spectrum, 20.0, 0.1, 0.1, 3.0)
+    # the edges (within vrmax) differ because the intermediate spectrum is cropped in the two-step convolution
+    nedge = len(sori.vrarray)
+    assert np.allclose(combined[nedge:-nedge], ref[nedge:-nedge], atol=1.0e-10)
+
+    nu_sampling = jnp.linspace(4010.0, 4090.0, 500)
+    sampled = sori.rotation_ipgauss_sampling(spectrum, 20.0, 0.1, 0.1, 3.0, 5.0, nu_sampling)
+    assert np.allclose(sampled, sop.sampling(ref, 5.0, nu_sampling), atol=1.0e-10)
+
+
+@pytest.mark.parametrize("pixel_integration", [False, True])
+def test_ipgauss_resample_multi_rv(pixel_integration):
+    nu_grid, spectra = _spectra(1)
+    nusd = jnp.linspace(4010.0, 4090.0, 500)
+    radial_velocities = jnp.array([-30.0, 0.0, 12.5, 40.0])
+    sop = SopInstProfile(nu_grid, vrmax=50.0)
+    sop.set_resampling(nusd, pixel_integration=pixel_integration)
+    F = sop.ipgauss_resample_multi_rv(spectra[0], 3.0, radial_velocities)
+    assert F.shape == (len(radial_velocities), len(nusd))
+    Fip = sop.ipgauss(spectra[0], 3.0)
+    for i, rv in enumerate(radial_velocities):
+        assert F[i] == pytest.approx(sop.resample(Fip, rv))
+    if not pixel_integration:
+        Fref = sop.sampling_batch(jnp.array([Fip] * 4), radial_velocities, nusd)
+        assert np.max(np.abs(F - Fref)) < 1.0e-4
@@ -5,11 +5,17 @@ from exojax.atm.atmprof import normalized_layer_height
 from exojax.spec.opachord import chord_geometric_matrix
 from exojax.spec.opachord import chord_geometric_matrix_lower
 from exojax.spec.opachord import chord_optical_depth
+from exojax.spec.opachord import chord_optical_depth_triangular
 
 from exojax.spec.rtransfer import rtrun_trans_pureabs_trapezoid
 from jax import config
+from jax.experimental import enable_x64
 
-config.update("jax_enable_x64", True)
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
 
 
 def test_transmission_pure_absorption_equals_to_Rp_sqaured_for_opaque():
@@ -91,7 +97,25 @@ def test_first_layer_height_from_compute_normalized_radius_profile():
     assert normalized_radius_lower[-1] == 1.0
 
 
+@pytest.mark.parametrize("nlayer, nblock", [(13, 4), (13, 20), (40, 8)])
+def test_chord_optical_depth_triangular(nlayer, nblock):
+    np.random.seed(3)
+    height = jnp.array(0.01 + 0.01 * np.random.rand(nlayer))
+    radius_lower = 1.0 + jnp.cumsum(height[::-1])[::-1] - height
+    cgm_lower = chord_geometric_matrix_lower(height, radius_lower)
+    cgm_midpoint = chord_geometric_matrix(height, radius_lower)
+    dtau = jnp.array(np.random.rand(nlayer, 5))
+    tauchord_lower, tauchord_midpoint = chord_optical_depth_triangular(
+        [cgm_lower, cgm_midpoint], dtau, nblock=nblock
+    )
+    assert np.allclose(tauchord_lower, chord_optical_depth(cgm_lower, dtau), rtol=1.0e-13)
+    assert np.allclose(
+        tauchord_midpoint, chord_optical_depth(cgm_midpoint, dtau), rtol=1.0e-13
+    )
+
+
 if __name__ == "__main__":
+    config.update("jax_enable_x64", True)
     #test_check_parallel_Ax_tauchord()
     test_first_layer_height_from_compute_normalized_radius_profile()
     #test_chord_geometric_matrix_lower()
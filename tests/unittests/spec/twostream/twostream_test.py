@@ -1,9 +1,21 @@
 from exojax.spec.twostream import compute_tridiag_diagonals_and_vector
+from exojax.spec.twostream import solve_lart_twostream
+from exojax.spec.twostream import solve_lart_twostream_parallel
+from exojax.spec.rtransfer import rtrun_emis_scat_lart_toonhm
+from exojax.spec.twostream import solve_fluxadding_twostream
+from exojax.spec.twostream import solve_fluxadding_twostream_parallel
+from exojax.spec.rtransfer import rtrun_reflect_fluxadding_toonhm
 import jax.numpy as jnp
 import numpy as np
+import pytest
 from jax import config
+from jax.experimental import enable_x64
 
-config.update("jax_enable_x64", True)
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with enable_x64():
+        yield
 
 
 def samples_fluxadding_flux2st():
@@ -52,9 +64,80 @@ def test_scat_lart_flux2st_tridiag_coefficients():
     assert np.array_equal(ref_diag_arr, diagonal)
 
 
+def test_solve_lart_twostream_parallel():
+    np.random.seed(1)
+    nlayer, nnus = 200, 30
+    dtau = jnp.array(np.logspace(-4, 1, nlayer)[:, None] * np.random.uniform(0.5, 2.0, (nlayer, nnus)))
+    ssa = jnp.array(np.random.uniform(0.0, 0.95, (nlayer, nnus)))
+    g = jnp.array(np.random.uniform(0.0, 0.6, (nlayer, nnus)))
+    piB = jnp.array(np.linspace(1.0, 10.0, nlayer)[:, None] * np.ones((nlayer, nnus)))
+
+    spectrum, cumT, Q, _, _, _ = rtrun_emis_scat_lart_toonhm(dtau, ssa, g, piB)
+    spectrum_p, cumT_p, Q_p, _, _, _ = rtrun_emis_scat_lart_toonhm(dtau, ssa, g, piB, tridiagonal_solver="parallel")
+    assert np.allclose(spectrum_p, spectrum, rtol=1.e-7)
+    assert np.allclose(cumT_p, cumT, rtol=1.e-7, atol=0.0)
+    assert np.allclose(Q_p, Q, rtol=1.e-7, atol=1.e-12 * np.max(np.abs(Q)))
+
+
+def test_solve_lart_twostream_parallel_requires_64bit():
+    from jax.experimental import disable_x64
+    S, T, upper_diagonal_top, diagonal_top, vector_top, piB, scat_coeff, trans_coeff = samples_lart_flux2st(
+    )
+    with disable_x64():
+        diagonal, lower_diagonal, upper_diagonal, vector = compute_tridiag_diagonals_and_vector(
+            scat_coeff, trans_coeff, piB, upper_diagonal_top, diagonal_top,
+            vector_top)
+        flux_bottom = jnp.array([0.5, 1.0, 2.0])
+        with pytest.raises(ValueError):
+            solve_lart_twostream_parallel(diagonal, lower_diagonal, upper_diagonal, vector, flux_bottom)
+        # the scan solver is available in 32bit mode
+        solve_lart_twostream(diagonal, lower_diagonal, upper_diagonal, vector, flux_bottom)
+
+
+def test_solve_lart_twostream_parallel_small_system():
+    S, T, upper_diagonal_top, diagonal_top, vector_top, piB, scat_coeff, trans_coeff = samples_lart_flux2st(
+    )
+    diagonal, lower_diagonal, upper_diagonal, vector = compute_tridiag_diagonals_and_vector(
+        scat_coeff, trans_coeff, piB, upper_diagonal_top, diagonal_top,
+        vector_top)
+    flux_bottom = jnp.array([0.5, 1.0, 2.0])
+    ref = solve_lart_twostream(diagonal, lower_diagonal, upper_diagonal, vector, flux_bottom)
+    res = solve_lart_twostream_parallel(diagonal, lower_diagonal, upper_diagonal, vector, flux_bottom)
+    for x, y in zip(res, ref):
+        assert np.allclose(x, y, rtol=1.e-12)
+
+
+def test_solve_fluxadding_twostream_parallel():
+    piB, scat_coeff, trans_coeff = samples_fluxadding_flux2st()
+    reflectivity_bottom = jnp.array([0.1, 0.5, 0.9])
+    source_bottom = jnp.array([1.0, 2.0, 0.0])
+    ref = solve_fluxadding_twostream(trans_coeff, scat_coeff, piB, reflectivity_bottom, source_bottom)
+    res = solve_fluxadding_twostream_parallel(trans_coeff, scat_coeff, piB, reflectivity_bottom, source_bottom)
+    for x, y in zip(res, ref):
+        assert np.allclose(x, y, rtol=1.e-12)
+
+
+def test_rtrun_reflect_fluxadding_parallel():
+    np.random.seed(2)
+    nlayer, nnus = 200, 30
+    dtau = jnp.array(np.logspace(-4, 1, nlayer)[:, None] * np.random.uniform(0.5, 2.0, (nlayer, nnus)))
+    ssa = jnp.array(np.random.uniform(0.0, 0.99, (nlayer, nnus)))
+    g = jnp.array(np.random.uniform(0.0, 0.6, (nlayer, nnus)))
+    piB = jnp.array(np.linspace(1.0, 10.0, nlayer)[:, None] * np.ones((nlayer, nnus)))
+    reflectivity_surface = jnp.array(np.random.uniform(0.0, 0.5, nnus))
+    source_surface = jnp.ones(nnus)
+    incoming_flux = jnp.ones(nnus) * 3.0
+    args = (dtau, ssa, g, piB, source_surface, reflectivity_surface, incoming_flux)
+    ref = rtrun_reflect_fluxadding_toonhm(*args)
+    res = rtrun_reflect_fluxadding_toonhm(*args, fluxadding_solver="parallel")
+    assert np.allclose(res, ref, rtol=1.e-8)
+
+
 if __name__ == "__main__":
+    config.update("jax_enable_x64", True)
     
     test_scat_lart_flux2st_tridiag_coefficients()
+    test_solve_lart_twostream_parallel()
     # test_solve_lart_twostream_numpy()
     # test_solve_lart_twostream_by_comparing_with_numpy_version()
 
@@ -1,11 +1,19 @@
 """interp test
 
 """
+import pytest
 import numpy as np
 from exojax.utils.interp import interp2d_bilinear
+from exojax.utils.interp import cubic_loglog_uniform_table
+from exojax.utils.interp import interp_uniform
 from jax import config
+from jax.experimental import disable_x64
 
-config.update("jax_enable_x64", False)
+
+@pytest.fixture(scope="module", autouse=True)
+def x64_mode():
+    with disable_x64():
+        yield
 
 
 def test_interp2d():
@@ -24,5 +32,30 @@ def test_interp2d():
     assert f[0] == 2.5
 
 
+def test_cubic_loglog_uniform_table():
+    # power law is exact in log-log space
+    xp = np.array([1.0, 3.0, 10.0, 20.0, 50.0, 50.0, 50.0])  # padded at the tail
+    fp = 2.0 * xp**1.5
+    x0, dx, table = cubic_loglog_uniform_table(xp, fp, dx=1.0)
+    assert x0 == 1.0
+    assert len(table) == 50
+    assert table[9] == fp[2]  # kept exactly at the node
+    x = np.arange(1.0, 51.0)
+    assert np.allclose(table, 2.0 * x**1.5, rtol=1.e-5)
+
+
+def test_interp_uniform():
+    x0, dx = 1.0, 0.5
+    fp = np.array([[1.0, 3.0, 5.0, 7.0], [2.0, 2.0, 4.0, 4.0]])
+    x = np.array([0.0, 1.25, 2.0, 3.0])
+    f = interp_uniform(x, x0, dx, fp)
+    assert f.shape == (2, 4)
+    assert np.allclose(f[0], [1.0, 2.0, 5.0, 7.0])
+    assert np.allclose(f[1], np.interp(x, x0 + dx * np.arange(4), fp[1]))
+
+
 if __name__ == "__main__":
+    config.update("jax_enable_x64", False)
     test_interp2d()
+    test_cubic_loglog_uniform_table()
+    test_interp_uniform()